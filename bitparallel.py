@@ -0,0 +1,393 @@
+"""Simulate many stimulus vectors at once with bit-parallel logic.
+
+Used in the Logic Simulator project to run the same network under many
+switch settings in a single pass, storing each signal as an integer whose
+bits are the signal levels in the independent vectors (lanes).
+
+Classes
+-------
+BitParallelNetwork - executes a network for many vectors at once.
+"""
+
+
+class BitParallelNetwork:
+    """Execute a network for many independent stimulus vectors at once.
+
+    Every output signal is stored as a word: an integer whose bit i is the
+    signal level (0 for LOW, 1 for HIGH) in lane i. Gates are evaluated with
+    bitwise operations, so one evaluation covers every lane. Python integers
+    have no fixed width, so any number of lanes can be used.
+
+    Signals only take the levels LOW and HIGH. Each cycle, the clocks are
+    updated and the gates settle. D-types latch the DATA signal from the end
+    of the previous cycle on a rising edge of their CLK input, and SET and
+    CLEAR act as soon as they are HIGH.
+
+    Parameters
+    ----------
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+    lanes: number of stimulus vectors simulated at once.
+
+    Public methods
+    --------------
+    reset(self): Loads the signals, clocks and D-type memories from the
+                 devices into every lane. Returns False if some inputs are
+                 unconnected.
+
+    set_switch(self, device_id, word): Sets the switch to the levels in the
+                                       bits of word, one bit per lane.
+
+    add_fault(self, device_id, port_id, stuck_level, lanes): Holds a port of
+                              a logic gate at a signal level in some lanes.
+
+    get_output_word(self, device_id, output_id): Returns the word holding the
+                                                 signal in every lane.
+
+    get_lane_signal(self, device_id, output_id, lane): Returns the signal
+                                                       level in one lane.
+
+    settle_network(self): Settles the signals in every lane without
+                          advancing the clocks.
+
+    execute_network(self): Executes the network for one simulation cycle in
+                           every lane.
+
+    Non-public methods
+    ------------------
+    _build_gates(self): Builds the list of gates to evaluate, including the
+                        faults.
+
+    _store_previous_inputs(self): Stores the CLK and DATA words of every
+                                  D-type at the end of a cycle.
+
+    _settle(self): Evaluates the gates until their outputs stop changing.
+
+    _apply_set_clear(self): Applies the SET and CLEAR inputs of the D-types.
+    """
+
+    def __init__(self, devices, network, lanes=64):
+        """Initialise the lane mask and the signal words."""
+        self.devices = devices
+        self.network = network
+        self.lanes = lanes
+        self.mask = (1 << lanes) - 1  # all lanes HIGH
+
+        # netlist.Netlist of the network being simulated
+        self.netlist = None
+        # words stores the signal word of every net, indexed by net ID
+        self.words = []
+
+        # gates stores [(device_kind, output_net, [input_nets])] in the order
+        # they are evaluated. Fault entries store [input_net, fault_key]
+        # instead of the input nets, where fault_key is a key of faults.
+        self.gates = []
+        # gate_order stores the netlist indices of the gates in the order
+        # they are evaluated
+        self.gate_order = []
+        # faults dictionary stores {(device_id, port_id): [keep, force]}:
+        # the signal at the port is (word & keep) | force
+        self.faults = {}
+        self.faults_changed = False  # True if gates must be rebuilt
+        self.FAULT = -1  # kind of the gates entries that apply faults
+        # memory stores the D-type memory words, indexed like the D-types in
+        # the netlist
+        self.memory = []
+        # previous_clocks and previous_data store the CLK and DATA words of
+        # every D-type at the end of the last cycle
+        self.previous_clocks = []
+        self.previous_data = []
+        # clocks stores [[device, output_net, counter]]
+        self.clocks = []
+        # switches dictionary stores {device_id: output_net}
+        self.switches = {}
+
+        self.iteration_limit = 20
+
+    def reset(self):
+        """Load the state of the devices into every lane.
+
+        Return False if some inputs are unconnected.
+        """
+        self.netlist = self.network.get_netlist()
+        if self.netlist is None:
+            return False
+        netlist = self.netlist
+
+        self.words = []
+        for signal in netlist.signals:
+            if signal in [self.devices.HIGH, self.devices.RISING]:
+                self.words.append(self.mask)
+            else:
+                self.words.append(0)
+
+        # Evaluate the gates in level order if possible, so that the gates
+        # settle in a single pass
+        if self.network.levelize():
+            self.gate_order = [
+                netlist.gate_indices[device_id]
+                for level in self.network.levels
+                for device_id in level
+            ]
+        else:
+            self.gate_order = range(len(netlist.gate_ids))
+        self.faults = {}
+        self._build_gates()
+
+        self.memory = []
+        for q_net in netlist.dtype_q_nets:
+            if netlist.owners[q_net].dtype_memory == self.devices.HIGH:
+                self.memory.append(self.mask)
+            else:
+                self.memory.append(0)
+        self.clocks = [
+            [netlist.owners[net], net, netlist.owners[net].clock_counter]
+            for net in netlist.clock_nets
+        ]
+        self.switches = {}
+        for net in netlist.switch_nets:
+            device = netlist.owners[net]
+            self.switches[device.device_id] = net
+            if device.switch_state == self.devices.HIGH:
+                self.words[net] = self.mask
+            else:
+                self.words[net] = 0
+        self._store_previous_inputs()
+        return True
+
+    def set_switch(self, device_id, word):
+        """Set the switch to the levels in the bits of word, one per lane.
+
+        Return True if successful.
+        """
+        if device_id not in self.switches:
+            return False
+        self.words[self.switches[device_id]] = word & self.mask
+        return True
+
+    def add_fault(self, device_id, port_id, stuck_level, lanes):
+        """Hold a port of a logic gate at stuck_level in the specified lanes.
+
+        port_id is the output ID or an input ID of the gate, and lanes is a
+        word with a bit set for every faulty lane. Faults are cleared by
+        reset. Return True if successful.
+        """
+        if self.netlist is None:
+            return False
+        device = self.devices.get_device(device_id)
+        if (
+            device is None
+            or device.device_kind not in self.devices.gate_types
+            or (port_id not in device.outputs and port_id not in device.inputs)
+        ):
+            return False
+        lanes &= self.mask
+        keep, force = self.faults.get((device_id, port_id), [self.mask, 0])
+        keep &= ~lanes
+        if stuck_level == self.devices.HIGH:
+            force |= lanes
+        else:
+            force &= ~lanes
+        self.faults[(device_id, port_id)] = [keep, force]
+        self.faults_changed = True
+        return True
+
+    def get_output_word(self, device_id, output_id):
+        """Return the word holding the signal in every lane.
+
+        Return None if either of the specified IDs is invalid.
+        """
+        if self.netlist is None:
+            return None
+        net = self.netlist.get_net(device_id, output_id)
+        if net is None:
+            return None
+        return self.words[net]
+
+    def get_lane_signal(self, device_id, output_id, lane):
+        """Return the signal level of the specified output in one lane.
+
+        Return None if either of the specified IDs is invalid.
+        """
+        word = self.get_output_word(device_id, output_id)
+        if word is None:
+            return None
+        if word >> lane & 1:
+            return self.devices.HIGH
+        return self.devices.LOW
+
+    def _build_gates(self):
+        """Build the gates list from the netlist and the faults.
+
+        A faulty input is read through a fault entry that drives a new net,
+        and a gate with a faulty output drives a new net that a fault entry
+        copies to the real output net.
+        """
+        netlist = self.netlist
+        self.faults_changed = False
+        del self.words[len(netlist.signals):]
+        words = self.words
+
+        self.gates = []
+        for gate_index in self.gate_order:
+            device_id = netlist.gate_ids[gate_index]
+            output_net = netlist.gate_nets[gate_index]
+            input_nets = list(netlist.get_gate_inputs(gate_index))
+            input_ids = self.devices.get_device(device_id).inputs
+            for position, input_id in enumerate(input_ids):
+                if (device_id, input_id) in self.faults:
+                    fault_net = len(words)
+                    keep, force = self.faults[(device_id, input_id)]
+                    words.append(words[input_nets[position]] & keep | force)
+                    self.gates.append((
+                        self.FAULT, fault_net,
+                        [input_nets[position], (device_id, input_id)],
+                    ))
+                    input_nets[position] = fault_net
+
+            if (device_id, None) in self.faults:
+                fault_net = len(words)
+                words.append(words[output_net])
+                self.gates.append((
+                    netlist.gate_kinds[gate_index], fault_net, input_nets
+                ))
+                self.gates.append((
+                    self.FAULT, output_net, [fault_net, (device_id, None)]
+                ))
+            else:
+                self.gates.append((
+                    netlist.gate_kinds[gate_index], output_net, input_nets
+                ))
+
+    def _store_previous_inputs(self):
+        """Store the CLK and DATA words of every D-type."""
+        words = self.words
+        self.previous_clocks = [
+            words[net] for net in self.netlist.dtype_clock_inputs
+        ]
+        self.previous_data = [
+            words[net] for net in self.netlist.dtype_data_inputs
+        ]
+
+    def _settle(self):
+        """Evaluate the gates until their outputs stop changing.
+
+        Return True if the outputs settle.
+        """
+        if self.faults_changed:
+            self._build_gates()
+        words = self.words
+        mask = self.mask
+        AND = self.devices.AND
+        OR = self.devices.OR
+        NAND = self.devices.NAND
+        NOR = self.devices.NOR
+        XOR = self.devices.XOR
+        NOT = self.devices.NOT
+        faults = self.faults
+
+        for iteration in range(self.iteration_limit):
+            changed = False
+            for device_kind, output_net, input_nets in self.gates:
+                if device_kind == AND or device_kind == NAND:
+                    word = mask
+                    for net in input_nets:
+                        word &= words[net]
+                    if device_kind == NAND:
+                        word ^= mask
+                elif device_kind == OR or device_kind == NOR:
+                    word = 0
+                    for net in input_nets:
+                        word |= words[net]
+                    if device_kind == NOR:
+                        word ^= mask
+                elif device_kind == XOR:
+                    word = words[input_nets[0]]
+                    word ^= words[input_nets[1]]
+                elif device_kind == NOT:
+                    word = words[input_nets[0]] ^ mask
+                else:  # fault, input_nets holds the faulty port
+                    keep, force = faults[input_nets[1]]
+                    word = words[input_nets[0]] & keep | force
+                if word != words[output_net]:
+                    words[output_net] = word
+                    changed = True
+            if not changed:
+                return True
+        return False
+
+    def _apply_set_clear(self):
+        """Apply the SET and CLEAR inputs of the D-types to their outputs.
+
+        The gates are settled again after every change of a D-type output.
+        Return True if the signals settle in every lane.
+        """
+        words = self.words
+        mask = self.mask
+        netlist = self.netlist
+        q_nets = netlist.dtype_q_nets
+        qbar_nets = netlist.dtype_qbar_nets
+        set_inputs = netlist.dtype_set_inputs
+        clear_inputs = netlist.dtype_clear_inputs
+
+        for iteration in range(self.iteration_limit):
+            changed = False
+            for index in range(len(q_nets)):
+                memory = self.memory[index] | words[set_inputs[index]]
+                memory &= ~words[clear_inputs[index]] & mask
+                self.memory[index] = memory
+                q_net = q_nets[index]
+                qbar_net = qbar_nets[index]
+                if words[q_net] != memory or words[qbar_net] != memory ^ mask:
+                    words[q_net] = memory
+                    words[qbar_net] = memory ^ mask
+                    changed = True
+            if not changed:
+                return True
+            if not self._settle():
+                return False
+        return False
+
+    def settle_network(self):
+        """Settle the signals in every lane without advancing the clocks.
+
+        The gates settle and the D-types apply SET and CLEAR, but no clock
+        edges occur. Return True if the signals settle in every lane.
+        """
+        if not self._settle():
+            return False
+        return self._apply_set_clear()
+
+    def execute_network(self):
+        """Execute the network for one simulation cycle in every lane.
+
+        Return True if the signals settle in every lane.
+        """
+        words = self.words
+        mask = self.mask
+        netlist = self.netlist
+
+        # Clocks switch state after clock_half_period cycles
+        for clock in self.clocks:
+            device, net, counter = clock
+            if counter == device.clock_half_period:
+                counter = 0
+                words[net] ^= mask
+            clock[2] = counter + 1
+
+        if not self._settle():
+            return False
+
+        # D-types latch the data from the end of the previous cycle on a
+        # rising clock edge
+        for index, net in enumerate(netlist.dtype_clock_inputs):
+            rising = words[net] & ~self.previous_clocks[index]
+            if rising:
+                self.memory[index] = (
+                    (self.previous_data[index] & rising)
+                    | (self.memory[index] & ~rising)
+                )
+
+        steady = self._apply_set_clear()
+        self._store_previous_inputs()
+        return steady
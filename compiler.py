@@ -0,0 +1,238 @@
+"""Generate Python code that executes the network.
+
+Used in the Logic Simulator project to turn a built network into a single
+generated Python function, so that executing the network avoids looking up
+devices, ports and signals at run time.
+
+Classes
+-------
+Compiler - generates and compiles the execution function for a network.
+"""
+
+
+class Compiler:
+    """Generate and compile the execution function for a network.
+
+    The generated function executes one simulation cycle as
+    network.Network.execute_network does, with the same result in every
+    cycle that settles: it updates the clocks, then executes every device in
+    every iteration, in the same order, until the signals settle. Signals
+    are held in local variables while the cycle is executed, and written
+    back to the devices at the end of the cycle.
+
+    Parameters
+    ----------
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+
+    Public methods
+    --------------
+    generate_source(self): Returns the source code of the execution function,
+                           or None if some inputs are unconnected.
+
+    compile_network(self): Returns the compiled execution function, or None
+                           if some inputs are unconnected.
+
+    Non-public methods
+    ------------------
+    _signal(self, net): Returns the local variable name holding the signal
+                        of the specified net.
+
+    _update(self, variable, target): Returns the lines that update the
+                                     signal in variable towards target.
+
+    _gate_target(self, gate_index): Returns the expression for the output
+                                    the specified gate is moving towards.
+    """
+
+    def __init__(self, devices, network):
+        """Initialise the device and signal variable names."""
+        self.devices = devices
+        self.network = network
+
+        # netlist.Netlist the source is generated from
+        self.netlist = None
+
+        self.iteration_limit = 20
+
+    def _signal(self, net):
+        """Return the local variable name holding the signal of net."""
+        return "s{}".format(net)
+
+    def _update(self, variable, target):
+        """Return the lines that update the signal in variable towards target.
+
+        The lines behave as network.Network.update_signal: a signal that is
+        not yet at the target moves to RISING or FALLING first, and the cycle
+        is not steady while any signal changes.
+        """
+        return [
+            "if {} != {}:".format(variable, target),
+            "    {0} = transitions[{0}][{1}]".format(variable, target),
+            "    steady = False",
+        ]
+
+    def _gate_target(self, gate_index):
+        """Return the expression for the output the gate is moving towards.
+
+        The rule is the same as in network.Network.execute_gate: if all its
+        inputs are x, then its output is y, else its output is the inverse
+        of y.
+        """
+        inputs = [
+            self._signal(net)
+            for net in self.netlist.get_gate_inputs(gate_index)
+        ]
+        device_kind = self.netlist.gate_kinds[gate_index]
+        if device_kind == self.devices.XOR:
+            return "{} if {} == {} else {}".format(
+                self.devices.LOW, inputs[0], inputs[1], self.devices.HIGH
+            )
+        x, y = self.network.gate_rules[device_kind]
+        condition = " and ".join(
+            "{} == {}".format(variable, x) for variable in inputs
+        )
+        return "{} if {} else {}".format(
+            y, condition, self.network.invert_signal(y)
+        )
+
+    def generate_source(self):
+        """Return the source code of the execution function.
+
+        The source defines make_execute(device_objects, transitions,
+        update_clocks), which returns the function that executes one
+        simulation cycle. Return None if some inputs are unconnected.
+        """
+        self.netlist = self.network.get_netlist()
+        if self.netlist is None:
+            return None
+        netlist = self.netlist
+
+        LOW = self.devices.LOW
+        HIGH = self.devices.HIGH
+        RISING = self.devices.RISING
+        FALLING = self.devices.FALLING
+
+        # device_objects holds the Device object driving each net, so the
+        # signals are loaded from and stored to the devices by net ID
+        bind_lines = []  # executed once, when the function is made
+        # The clocks that switch state are set to RISING or FALLING by
+        # update_clocks before the signals are loaded
+        load_lines = ["update_clocks()"]  # executed at the start of a cycle
+        iteration_lines = []
+        store_lines = []
+        for net, (device_id, output_id) in enumerate(netlist.net_outputs):
+            s = self._signal(net)
+            bind_lines.append(
+                "o{} = device_objects[{}].outputs".format(net, net)
+            )
+            load_lines.append("{} = o{}[{!r}]".format(s, net, output_id))
+            store_lines.append("o{}[{!r}] = {}".format(net, output_id, s))
+
+        for net in netlist.switch_nets:
+            d = "d{}".format(net)
+            bind_lines.append("{} = device_objects[{}]".format(d, net))
+            iteration_lines.append("target = {}.switch_state".format(d))
+            iteration_lines.extend(self._update(self._signal(net), "target"))
+
+        for index in range(len(netlist.dtype_ids)):
+            q_net = netlist.dtype_q_nets[index]
+            d = "d{}".format(q_net)
+            m = "m{}".format(index)
+            clock = self._signal(netlist.dtype_clock_inputs[index])
+            data = self._signal(netlist.dtype_data_inputs[index])
+            set_signal = self._signal(netlist.dtype_set_inputs[index])
+            clear = self._signal(netlist.dtype_clear_inputs[index])
+            q = self._signal(q_net)
+            qbar = self._signal(netlist.dtype_qbar_nets[index])
+            bind_lines.append("{} = device_objects[{}]".format(d, q_net))
+            load_lines.append("{} = {}.dtype_memory".format(m, d))
+            store_lines.append("{}.dtype_memory = {}".format(d, m))
+            iteration_lines.extend([
+                "if {} == {}:".format(clock, RISING),
+                "    if {0} == {1} or {0} == {2}:".format(
+                    data, HIGH, FALLING
+                ),
+                "        {} = {}".format(m, HIGH),
+                "    elif {0} == {1} or {0} == {2}:".format(
+                    data, LOW, RISING
+                ),
+                "        {} = {}".format(m, LOW),
+                "if {} == {}:".format(set_signal, HIGH),
+                "    {} = {}".format(m, HIGH),
+                "if {} == {}:".format(clear, HIGH),
+                "    {} = {}".format(m, LOW),
+            ])
+            iteration_lines.extend(self._update(q, m))
+            iteration_lines.extend(
+                self._update(qbar, "{} - {}".format(HIGH, m))
+            )
+
+        for net in netlist.clock_nets:
+            s = self._signal(net)
+            iteration_lines.extend([
+                "if {} == {}:".format(s, RISING),
+                "    {} = {}".format(s, HIGH),
+                "    steady = False",
+                "elif {} == {}:".format(s, FALLING),
+                "    {} = {}".format(s, LOW),
+                "    steady = False",
+            ])
+
+        for gate_index, net in enumerate(netlist.gate_nets):
+            iteration_lines.append(
+                "target = {}".format(self._gate_target(gate_index))
+            )
+            iteration_lines.extend(self._update(self._signal(net), "target"))
+
+        indent = "    "
+        lines = [
+            "def make_execute(device_objects, transitions, update_clocks):"
+        ]
+        lines.extend(indent + line for line in bind_lines)
+        lines.append("")
+        lines.append(indent + "def execute():")
+        body = []
+        body.extend(load_lines)
+        body.append("steady = False")
+        body.append("iterations = 0")
+        body.append("while iterations < {}:".format(self.iteration_limit))
+        body.append(indent + "iterations += 1")
+        body.append(indent + "steady = True")
+        body.extend(indent + line for line in iteration_lines)
+        body.append(indent + "if steady:")
+        body.append(indent + indent + "break")
+        body.extend(store_lines)
+        body.append("return steady")
+        lines.extend(indent * 2 + line for line in body)
+        lines.append("")
+        lines.append(indent + "return execute")
+        return "\n".join(lines) + "\n"
+
+    def compile_network(self):
+        """Return the compiled function that executes one simulation cycle.
+
+        The function returns True if the signals settle, like
+        network.Network.execute_network. Return None if some inputs are
+        unconnected.
+        """
+        source = self.generate_source()
+        if source is None:
+            return None
+
+        # transitions[signal][target] is the signal after update_signal
+        LOW = self.devices.LOW
+        HIGH = self.devices.HIGH
+        RISING = self.devices.RISING
+        FALLING = self.devices.FALLING
+        transitions = [None] * len(self.devices.signal_types)
+        transitions[LOW] = {LOW: LOW, HIGH: RISING}
+        transitions[FALLING] = {LOW: LOW, HIGH: RISING}
+        transitions[HIGH] = {LOW: FALLING, HIGH: HIGH}
+        transitions[RISING] = {LOW: FALLING, HIGH: HIGH}
+
+        namespace = {}
+        code = compile(source, "<compiled network>", "exec")
+        exec(code, namespace)
+        return namespace["make_execute"](self.netlist.owners, transitions,
+                                         self.network.update_clocks)
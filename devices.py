@@ -8,24 +8,38 @@ Classes
 Device - stores device properties.
 Devices - makes and stores all the devices in the logic network.
 """
+import heapq
 import random
 
 
 class Device:
     """Store device properties.
 
+    The clock counter of a clock is not stored, as it would have to be
+    incremented every cycle. Instead, clock_edge stores the cycle in which
+    the clock next switches state, and clock_counter is found from it and
+    the number of cycles the clocks of the owning Devices have been updated
+    for. A device that does not belong to a Devices counts from cycle 0.
+
     Parameters
     ----------
     device_id: device ID.
+    devices: instance of the Devices() class the device belongs to.
 
     Public methods
     --------------
     No public methods.
+
+    Non-public methods
+    ------------------
+    _get_clock_cycle(self): Returns the number of cycles the clocks have
+                            been updated for.
     """
 
-    def __init__(self, device_id):
+    def __init__(self, device_id, devices=None):
         """Initialise device properties."""
         self.device_id = device_id
+        self.devices = devices
 
         # inputs dictionary stores
         # {input_id: (connected_output_device_id, connected_output_port_id)}
@@ -36,10 +50,38 @@ class Device:
 
         self.device_kind = None
         self.clock_half_period = None
-        self.clock_counter = None
+        self.clock_edge = None
         self.switch_state = None
         self.dtype_memory = None
 
+    @property
+    def clock_counter(self):
+        """Return the number of cycles since the clock last switched state.
+
+        The clock switches state in the cycle its counter reaches
+        clock_half_period.
+        """
+        if self.clock_edge is None:
+            return None
+        return (
+            self.clock_half_period - self.clock_edge + self._get_clock_cycle()
+        )
+
+    @clock_counter.setter
+    def clock_counter(self, counter):
+        """Set the number of cycles since the clock last switched state."""
+        self.clock_edge = (
+            self._get_clock_cycle() + self.clock_half_period - counter
+        )
+        if self.devices is not None:
+            self.devices.clock_edges_valid = False
+
+    def _get_clock_cycle(self):
+        """Return the number of cycles the clocks have been updated for."""
+        if self.devices is None:
+            return 0
+        return self.devices.clock_cycle
+
 
 class Devices:
     """Make and store devices.
@@ -59,6 +101,10 @@ class Devices:
     find_devices(self, device_kind=None): Returns a list of device_ids of
                                           the specified device_kind.
 
+    iter_devices(self, device_kind=None): Returns an iterator over the Device
+                                          objects of the specified
+                                          device_kind.
+
     add_device(self, device_id, device_kind): Adds the specified device to the
                                               network.
 
@@ -88,7 +134,27 @@ class Devices:
 
     make_d_type(self, device_id): Makes a D-type device.
 
-    cold_startup(self): Simulates cold start-up of D-types and clocks.
+    begin_build(self): Defers cold start-up until end_build is called.
+
+    end_build(self, seed=None): Simulates cold start-up of all the devices
+                                made since begin_build.
+
+    cold_startup(self, seed=None): Simulates cold start-up of D-types and
+                                   clocks.
+
+    update_clock_edges(self): Returns the clocks that switch state in this
+                              cycle and moves on to the next cycle.
+
+    get_cycles_to_edge(self): Returns the number of cycles before the next
+                              clock switches state.
+
+    skip_clock_cycles(self, cycles): Moves the clocks on by cycles in which
+                                     no clock switches state.
+
+    Non-public methods
+    ------------------
+    _build_clock_edges(self): Builds the heap of clock edges again if a
+                              clock counter was set.
 
     make_device(self, device_id, device_kind, device_property=None): Creates
                        the specified device and returns errors if unsuccessful.
@@ -99,6 +165,26 @@ class Devices:
         self.names = names
 
         self.devices_list = []
+        # device_index dictionary stores {device_id: Device}
+        self.device_index = {}
+        # kind_buckets dictionary stores {device_kind: [Device]}, with the
+        # devices of each kind in the order they were added
+        self.kind_buckets = {}
+
+        # Incremented whenever devices are added or their simulation state is
+        # reset, so that the network knows to rebuild its execution schedule
+        self.generation = 0
+
+        # True between begin_build and end_build, while cold start-up is
+        # deferred
+        self.building = False
+
+        self.clock_cycle = 0  # number of cycles the clocks were updated for
+        # clock_edges heap stores (clock_edge, device_id, Device) for every
+        # clock, so the clocks that switch state next are found first
+        self.clock_edges = []
+        # False if a clock counter was set since the heap was built
+        self.clock_edges_valid = True
 
         gate_strings = ["AND", "OR", "NAND", "NOR", "XOR", "NOT"]
         device_strings = ["CLOCK", "SWITCH", "DTYPE"]
@@ -148,10 +234,7 @@ class Devices:
 
     def get_device(self, device_id):
         """Return the Device object corresponding to device_id."""
-        for device in self.devices_list:
-            if device.device_id == device_id:
-                return device
-        return None
+        return self.device_index.get(device_id)
 
     def find_devices(self, device_kind=None):
         """Return a list of device IDs of the specified device_kind.
@@ -159,19 +242,27 @@ class Devices:
         Return a list of all device IDs in the network if no device_kind is
         specified.
         """
-        device_id_list = []
-        for device in self.devices_list:
-            if device_kind is None:
-                device_id_list.append(device.device_id)
-            elif device.device_kind == device_kind:
-                device_id_list.append(device.device_id)
-        return device_id_list
+        return [device.device_id for device in self.iter_devices(device_kind)]
+
+    def iter_devices(self, device_kind=None):
+        """Return an iterator over the Device objects of device_kind.
+
+        Iterate over all the devices in the network if no device_kind is
+        specified. The devices are not copied, so no devices may be added
+        while iterating.
+        """
+        if device_kind is None:
+            return iter(self.devices_list)
+        return iter(self.kind_buckets.get(device_kind, ()))
 
     def add_device(self, device_id, device_kind):
         """Add the specified device to the network."""
-        new_device = Device(device_id)
+        new_device = Device(device_id, self)
         new_device.device_kind = device_kind
         self.devices_list.append(new_device)
+        self.device_index[device_id] = new_device
+        self.kind_buckets.setdefault(device_kind, []).append(new_device)
+        self.generation += 1
 
     def add_input(self, device_id, input_id):
         """Add the specified input to the specified device.
@@ -257,9 +348,12 @@ class Devices:
         cycles before the clock switches state.
         """
         self.add_device(device_id, self.CLOCK)
+        self.add_output(device_id, output_id=None)
         device = self.get_device(device_id)
         device.clock_half_period = clock_half_period
-        self.cold_startup()  # clock initialised to a random point in its cycle
+        if not self.building:
+            # Clock initialised to a random point in its cycle
+            self.cold_startup()
 
     def make_gate(self, device_id, device_kind, no_of_inputs):
         """Make logic gates with the specified number of inputs."""
@@ -278,28 +372,104 @@ class Devices:
             self.add_input(device_id, input_id)
         for output_id in self.dtype_output_ids:
             self.add_output(device_id, output_id)
-        self.cold_startup()  # D-type initialised to a random state
+        if not self.building:
+            self.cold_startup()  # D-type initialised to a random state
+
+    def begin_build(self):
+        """Defer cold start-up until end_build is called.
+
+        Making a clock or a D-type normally simulates cold start-up of every
+        device, so building a circuit with n of them takes O(n^2) time. The
+        clocks and D-types made before end_build have no random state yet.
+        """
+        self.building = True
+
+    def end_build(self, seed=None):
+        """Simulate cold start-up once for all the devices made.
+
+        If seed is given, the random state is drawn from a generator seeded
+        with it, so the same circuit always starts in the same state.
+        """
+        self.building = False
+        self.cold_startup(seed)
 
-    def cold_startup(self):
+    def cold_startup(self, seed=None):
         """Simulate cold start-up of D-types and clocks.
 
         Set the memory of the D-types to a random state and make the clocks
-        begin from a random point in their cycles.
+        begin from a random point in their cycles. If seed is given, the
+        states are drawn from a generator seeded with it instead of the
+        random module.
         """
+        if seed is None:
+            generator = random
+        else:
+            generator = random.Random(seed)
+        self.generation += 1
         for device in self.devices_list:
             if device.device_kind == self.D_TYPE:
-                device.dtype_memory = random.choice([self.LOW, self.HIGH])
+                device.dtype_memory = generator.choice([self.LOW, self.HIGH])
 
             elif device.device_kind == self.CLOCK:
-                clock_signal = random.choice([self.LOW, self.HIGH])
+                clock_signal = generator.choice([self.LOW, self.HIGH])
                 self.add_output(
                     device.device_id, output_id=None, signal=clock_signal
                 )
                 # Initialise it to a random point in its cycle.
-                device.clock_counter = random.randrange(
+                device.clock_counter = generator.randrange(
                     device.clock_half_period
                 )
 
+    def update_clock_edges(self):
+        """Return the clocks that switch state in this cycle.
+
+        Their next edges are scheduled clock_half_period cycles later, and
+        the clocks move on to the next cycle. Only the clocks that switch
+        state are visited.
+        """
+        self._build_clock_edges()
+        clock_edges = self.clock_edges
+        cycle = self.clock_cycle
+        switched = []
+        while clock_edges and clock_edges[0][0] <= cycle:
+            device_id, device = clock_edges[0][1:]
+            device.clock_edge = cycle + device.clock_half_period
+            heapq.heapreplace(clock_edges,
+                              (device.clock_edge, device_id, device))
+            switched.append(device)
+        self.clock_cycle = cycle + 1
+        return switched
+
+    def get_cycles_to_edge(self):
+        """Return the number of cycles before the next clock switches state.
+
+        Return 0 if a clock switches state in this cycle, or None if there
+        are no clocks.
+        """
+        self._build_clock_edges()
+        if not self.clock_edges:
+            return None
+        return max(self.clock_edges[0][0] - self.clock_cycle, 0)
+
+    def skip_clock_cycles(self, cycles):
+        """Move the clocks on by cycles in which no clock switches state.
+
+        The clock counters advance as if update_clock_edges was called once
+        per cycle.
+        """
+        self.clock_cycle += cycles
+
+    def _build_clock_edges(self):
+        """Build the heap of clock edges again if a clock counter was set."""
+        if self.clock_edges_valid:
+            return
+        self.clock_edges[:] = [
+            (device.clock_edge, device.device_id, device)
+            for device in self.kind_buckets.get(self.CLOCK, [])
+        ]
+        heapq.heapify(self.clock_edges)
+        self.clock_edges_valid = True
+
     def make_device(self, device_id, device_kind, device_property=None):
         """Create the specified device.
 
@@ -0,0 +1,298 @@
+"""Find the stuck-at faults that a stimulus sequence detects.
+
+Used in the Logic Simulator project to measure the fault coverage of a
+sequence of switch settings: each logic gate output and input is in turn
+held at LOW or HIGH, and a fault is detected if a monitored signal differs
+from the fault-free circuit in some cycle.
+
+Classes
+-------
+Fault - a stuck-at fault on a port of a logic gate.
+FaultSimulator - simulates many faults at once on a circuit in memory.
+FaultCampaign - simulates the faults of a circuit definition file in a pool
+                of worker processes.
+"""
+import collections
+import concurrent.futures
+import os
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import Scanner
+from parse import Parser
+from bitparallel import BitParallelNetwork
+
+# device_id and port_id identify the port of the logic gate (port_id is None
+# for the output), and stuck_level is the level the port is held at
+Fault = collections.namedtuple(
+    "Fault", ["device_id", "port_id", "stuck_level"]
+)
+
+# fault simulator of the circuit parsed by each worker process
+worker_simulator = None
+# stimulus sequence simulated by each worker process
+worker_stimulus = None
+
+
+def _discard_output(text):
+    """Discard parser messages, which are already shown by the main process."""
+
+
+def _initialise_worker(path, stimulus, lanes, seed):
+    """Parse the circuit once in a new worker process."""
+    global worker_simulator, worker_stimulus
+    campaign = FaultCampaign(path, lanes=lanes, seed=seed)
+    campaign.parse(output_cmd=_discard_output)
+    worker_simulator = campaign.simulator
+    worker_stimulus = stimulus
+
+
+def _simulate_in_worker(faults):
+    """Simulate a batch of faults on the circuit parsed by the worker.
+
+    The faults and the fault-free circuit are checked once by the main
+    process.
+    """
+    return worker_simulator.simulate_faults(faults, worker_stimulus)
+
+
+class FaultSimulator:
+    """Simulate many stuck-at faults at once on a circuit in memory.
+
+    The faults are simulated with a BitParallelNetwork: lane 0 holds the
+    fault-free circuit and every other lane holds the circuit with one
+    fault, so a batch of lanes - 1 faults takes one pass over the stimulus.
+    Every lane starts from the current state of the devices.
+
+    A stimulus is a list with one {switch_id: level} dictionary per cycle,
+    holding the switches that change before that cycle. A fault is detected
+    if a monitored signal in its lane differs from lane 0 at the end of a
+    cycle, or if the faulty circuit does not settle.
+
+    Parameters
+    ----------
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+    monitors: instance of the monitors.Monitors() class.
+    lanes: number of lanes in each batch, including the fault-free lane.
+
+    Public methods
+    --------------
+    list_faults(self): Returns the stuck-at LOW and HIGH faults of every
+                       logic gate output and input.
+
+    check(self, faults, stimulus): Returns True if the faults are on logic
+                                   gate ports and the fault-free circuit
+                                   settles with the stimulus.
+
+    simulate(self, faults, stimulus): Returns whether each fault is detected
+                                      by the stimulus.
+
+    simulate_faults(self, faults, stimulus): Returns whether each fault is
+                                             detected, without checking the
+                                             faults and the circuit.
+
+    Non-public methods
+    ------------------
+    _simulate_batch(self, faults, stimulus): Simulates up to lanes - 1
+                                             faults in one pass.
+    """
+
+    def __init__(self, devices, network, monitors, lanes=64):
+        """Initialise the batch size."""
+        self.devices = devices
+        self.network = network
+        self.monitors = monitors
+        self.lanes = max(lanes, 2)
+
+    def list_faults(self):
+        """Return the stuck-at faults of every logic gate output and input."""
+        faults = []
+        for device in self.devices.iter_devices():
+            if device.device_kind not in self.devices.gate_types:
+                continue
+            for port_id in [None] + list(device.inputs):
+                for stuck_level in [self.devices.LOW, self.devices.HIGH]:
+                    faults.append(
+                        Fault(device.device_id, port_id, stuck_level)
+                    )
+        return faults
+
+    def check(self, faults, stimulus):
+        """Return True if the faults and the stimulus can be simulated.
+
+        Return False if some inputs are unconnected, a fault is not on a
+        logic gate port, or the fault-free circuit does not settle.
+        """
+        fault_sites = set(self.list_faults())
+        if not fault_sites.issuperset(faults):
+            return False
+        return self._simulate_batch([], stimulus) is not None
+
+    def simulate(self, faults, stimulus):
+        """Return a list of whether each fault is detected by the stimulus.
+
+        Return None if the fault-free circuit cannot be simulated: some
+        inputs are unconnected, a fault is not on a logic gate port, or the
+        fault-free circuit does not settle.
+        """
+        if not self.check(faults, stimulus):
+            return None
+        return self.simulate_faults(faults, stimulus)
+
+    def simulate_faults(self, faults, stimulus):
+        """Return a list of whether each fault is detected by the stimulus.
+
+        The faults and the fault-free circuit must have been checked, so
+        that batches of faults can be simulated without checking them again.
+        """
+        detected = []
+        batch_size = self.lanes - 1
+        for start in range(0, len(faults), batch_size):
+            batch = faults[start:start + batch_size]
+            result = self._simulate_batch(batch, stimulus)
+            if result is None:
+                # A faulty circuit that does not settle stops every lane, so
+                # simulate the batch one fault at a time
+                result = []
+                for fault in batch:
+                    single = self._simulate_batch([fault], stimulus)
+                    if single is None:
+                        single = [True]
+                    result.extend(single)
+            detected.extend(result)
+        return detected
+
+    def _simulate_batch(self, faults, stimulus):
+        """Simulate up to lanes - 1 faults in one pass over the stimulus.
+
+        Return a list of whether each fault is detected, or None if some
+        lane does not settle.
+        """
+        simulator = BitParallelNetwork(self.devices, self.network,
+                                       len(faults) + 1)
+        if not simulator.reset():
+            return None
+        for lane, fault in enumerate(faults, 1):
+            simulator.add_fault(fault.device_id, fault.port_id,
+                                fault.stuck_level, 1 << lane)
+
+        mask = simulator.mask
+        undetected = mask ^ 1  # every faulty lane
+        for changes in stimulus:
+            for switch_id, level in changes.items():
+                if level == self.devices.HIGH:
+                    simulator.set_switch(switch_id, mask)
+                else:
+                    simulator.set_switch(switch_id, 0)
+            if not simulator.execute_network():
+                return None
+            for device_id, output_id in self.monitors.monitors_dictionary:
+                word = simulator.get_output_word(device_id, output_id)
+                if word & 1:  # compare every lane with lane 0
+                    word ^= mask
+                undetected &= ~word
+            if not undetected:
+                break
+        return [
+            not undetected >> lane & 1 for lane in range(1, len(faults) + 1)
+        ]
+
+
+class FaultCampaign:
+    """Simulate the faults of a circuit definition file in parallel.
+
+    The faults are split into batches that are simulated by a pool of
+    processes, each of which parses the file once. The faults and the
+    fault-free circuit are checked once, before the batches are simulated.
+    Every batch starts from the same cold start-up state.
+
+    Parameters
+    ----------
+    path: path of the circuit definition file.
+    processes: number of worker processes (default: number of CPUs).
+    lanes: number of lanes in each batch, including the fault-free lane.
+    seed: seed of the random cold start-up state.
+
+    Public methods
+    --------------
+    parse(self, output_cmd=None): Parses the definition file. Returns True
+                                  if successful.
+
+    run(self, stimulus, faults=None): Simulates the faults in the process
+                                      pool and returns the faults detected.
+    """
+
+    def __init__(self, path, processes=None, lanes=64, seed=0):
+        """Initialise the campaign settings."""
+        self.path = path
+        if processes is None:
+            processes = os.cpu_count()
+        self.processes = processes
+        self.lanes = lanes
+        self.seed = seed
+
+        self.names = None
+        self.devices = None
+        self.network = None
+        self.monitors = None
+        self.simulator = None
+        self.parsed = False
+
+    def parse(self, output_cmd=None):
+        """Parse the circuit definition file.
+
+        Parser messages are printed, or passed to output_cmd if given. Return
+        True if successful.
+        """
+        self.names = Names()
+        self.devices = Devices(self.names)
+        self.network = Network(self.names, self.devices)
+        self.monitors = Monitors(self.names, self.devices, self.network)
+        scanner = Scanner(self.path, self.names)
+        if output_cmd is None:
+            parser = Parser(self.names, self.devices, self.network,
+                            self.monitors, scanner)
+        else:
+            parser = Parser(self.names, self.devices, self.network,
+                            self.monitors, scanner, mode="gui",
+                            output_cmd=output_cmd)
+        self.parsed = parser.parse_network()
+        self.devices.cold_startup(self.seed)
+        self.simulator = FaultSimulator(self.devices, self.network,
+                                        self.monitors, self.lanes)
+        return self.parsed
+
+    def run(self, stimulus, faults=None):
+        """Simulate the faults in the process pool.
+
+        Every gate output and input fault is simulated if none are given.
+        Return a {Fault: detected} dictionary in the order of the faults, or
+        None if the file does not parse or the fault-free circuit cannot be
+        simulated.
+        """
+        if not self.parsed and not self.parse():
+            return None
+        if faults is None:
+            faults = self.simulator.list_faults()
+        if not self.simulator.check(faults, stimulus):
+            return None
+        batch_size = self.simulator.lanes - 1
+        batches = [
+            faults[start:start + batch_size]
+            for start in range(0, len(faults), batch_size)
+        ]
+
+        detected = {}
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.processes,
+            initializer=_initialise_worker,
+            initargs=(self.path, stimulus, self.lanes, self.seed),
+        ) as executor:
+            for batch, result in zip(
+                batches, executor.map(_simulate_in_worker, batches)
+            ):
+                detected.update(zip(batch, result))
+        return detected
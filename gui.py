@@ -41,6 +41,7 @@ class Gui(wx.Frame):
     Parameters
     ----------
     title: title of the window.
+    engine: simulation engine selected with network.Network.set_engine().
 
     Public methods
     --------------
@@ -55,7 +56,7 @@ class Gui(wx.Frame):
     on_text_box(self, event): Event handler for when the user enters text.
     """
 
-    def __init__(self, title, names, devices, network, monitors):
+    def __init__(self, title, names, devices, network, monitors, engine=None):
         """Initialise widgets and layout."""
         super().__init__(parent=None, title=title, size=(1200, 600))
 
@@ -74,6 +75,7 @@ class Gui(wx.Frame):
         self.devices = devices
         self.network = network
         self.monitors = monitors
+        self.engine = engine
 
         self.cycles_completed = 0
         self.spin_value = 10
@@ -417,6 +419,12 @@ class Gui(wx.Frame):
             self.push_status(text)
             parse = self.parser.parse_network()
             if parse:
+                if self.engine is not None:
+                    if not self.network.set_engine(self.engine):
+                        self.output_cmd(
+                            _("Cannot use the simulation engine on this "
+                              "circuit, using the default engine.")
+                        )
                 self.monitor_sidebar.update_checklist()
                 self.switches_sidebar.update_list()
                 self.connections_sidebar.update_dropdown_find()
@@ -167,7 +167,23 @@ class ConnectionsSidebarPanel(wx.Panel):
                 second_signal_name,
             )
         )
-        self.network.replace_connection(
+        history = self.network.history
+        if history is None:
+            self.network.replace_connection(
+                second_device_id, second_port_id, third_device_id,
+                third_port_id
+            )
+            # Record the next runs, so that the next connections replaced
+            # do not need a new run
+            self.parent.userint.record_history = True
+            if self.parent.userint.cycles_completed:
+                self.output_cmd(
+                    _("Run the simulation again to see the change."))
+        elif history.replace_connection(
             second_device_id, second_port_id, third_device_id, third_port_id
-        )
+        ):
+            # The recorded run has been updated for the new connection
+            self.parent.refresh_canvas()
+        else:
+            self.output_cmd(_("Run the simulation again to see the change."))
         self.update_dropdown_find()
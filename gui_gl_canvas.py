@@ -86,6 +86,10 @@ class MyGLCanvas(wxcanvas.GLCanvas):
         # Initialise variables for zooming
         self.zoom = 1
 
+        # Width of one cycle, and offset of the first cycle, of the signals
+        self.one_cycle = 20
+        self.signal_x_offset = 30
+
         # Bind events to the canvas
         self.Bind(wx.EVT_PAINT, self.on_paint)
         self.Bind(wx.EVT_SIZE, self.on_size)
@@ -117,16 +121,31 @@ class MyGLCanvas(wxcanvas.GLCanvas):
         # Clear everything
         GL.glClear(GL.GL_COLOR_BUFFER_BIT)
 
+        # Only the cycles in view are read from the traces
+        size = self.GetClientSize()
+        start = int(
+            (-self.pan_x / self.zoom - self.signal_x_offset) // self.one_cycle
+        )
+        stop = int(
+            ((size.width - self.pan_x) / self.zoom - self.signal_x_offset)
+            // self.one_cycle
+        ) + 1
+        start = max(start, 0)
+
         # Draw the monitor signals
         index = 0
         for device_id, output_id in self.monitors.monitors_dictionary:
             monitor_name = self.devices.get_signal_name(device_id, output_id)
-            signal_list = self.monitors.monitors_dictionary[
+            signal_trace = self.monitors.monitors_dictionary[
                 (device_id, output_id)
             ]
-            if len(signal_list) > 0:
-                signal_list_bin = self.convert_signal(signal_list)
-                self.draw_signal(monitor_name, signal_list_bin, index)
+            if len(signal_trace) > 0:
+                signal_runs_bin = self.convert_signal(
+                    signal_trace, start, stop
+                )
+                self.draw_signal(monitor_name, signal_runs_bin, index,
+                                 len(signal_trace), start,
+                                 signal_trace.first_cycle)
             index += 1
 
         # We have been drawing to the back buffer, flush the graphics pipeline
@@ -217,75 +236,89 @@ class MyGLCanvas(wxcanvas.GLCanvas):
             else:
                 GLUT.glutBitmapCharacter(font, ord(character))
 
-    def convert_signal(self, signal_list):
-        """Convert signal from output type of network module to 1s and 0s."""
-        output_signal = []
-        for i in range(len(signal_list) - 1):
-            current_sig = signal_list[i]
-            # HIGH
-            if current_sig == self.devices.HIGH:
-                output_signal.append(1)
-            # LOW
-            elif current_sig == self.devices.LOW:
-                output_signal.append(0)
-            elif current_sig == self.devices.BLANK:
-                output_signal.append(None)
+    def convert_signal(self, signal_trace, start=0, stop=None):
+        """Convert signal from output type of network module to 1s and 0s.
+
+        Return a list of (level, length) runs of the cycles from start to
+        stop, where the level is 1, 0 or None for blank cycles. RISING and
+        FALLING cycles are dropped.
+        """
+        output_runs = []
+        for signal, length in signal_trace.runs(start, stop):
+            if signal == self.devices.HIGH:
+                level = 1
+            elif signal == self.devices.LOW:
+                level = 0
+            elif signal == self.devices.BLANK:
+                level = None
             else:
                 continue
+            if output_runs and output_runs[-1][0] == level:
+                output_runs[-1] = (level, output_runs[-1][1] + length)
+            else:
+                output_runs.append((level, length))
 
-        if signal_list[-1] == self.devices.HIGH:
-            output_signal.append(1)
-        elif signal_list[-1] == self.devices.LOW:
-            output_signal.append(0)
-
-        return output_signal
+        # Blank cycles at the end are not drawn
+        if output_runs and output_runs[-1][0] is None:
+            output_runs.pop()
+        return output_runs
 
-    def draw_signal(self, monitor_name, signal_list_bin, index):
+    def draw_signal(self, monitor_name, signal_runs_bin, index,
+                    signal_length, start=0, first_cycle=0):
         """Draw a signal to the canvas.
 
         Parameters
         ----------
         monitor_name
             the signal name of the monitor, for the label
-        signal_list_bin
-            signal values as list of binary numbers
+        signal_runs_bin
+            signal values as list of (binary number, length) runs
         index
             the position of the signal in the list of monitored signals
+        signal_length
+            the number of cycles in the signal
+        start
+            the cycle of the first run
+        first_cycle
+            the absolute cycle number of the first cycle in the signal,
+            which is not 0 for monitors that only keep the recent cycles
         """
         v_space = 60
-        one_cycle = 20
+        one_cycle = self.one_cycle
         text_x_offset = 10
         signal_height = v_space * 2 // 3
-        signal_x_offset = 30
+        signal_x_offset = self.signal_x_offset
         signal_y_offset = v_space - signal_height
         tick_length = 10
         tick_y_offset = v_space - signal_height - tick_length
-        signal_length = len(signal_list_bin)
+        window_length = sum(length for level, length in signal_runs_bin)
 
         bottom_left = coord(0, (index + 1) * v_space)
         y_low = bottom_left.y + v_space - signal_height
         y_high = bottom_left.y + v_space
 
-        # Draw the tickmarks
+        # Draw the tickmarks, labelled with the absolute cycle numbers
         tick_start = coord()
         tick_end = coord()
-        for i in range(signal_length + 1):
-            if i % 5 == 0:
-                tick_start.x = signal_x_offset + (i * one_cycle)
-                tick_start.y = bottom_left.y + tick_y_offset
-                tick_end.x = signal_x_offset + (i * one_cycle)
-                tick_end.y = bottom_left.y + tick_y_offset + tick_length
-                GL.glColor3f(
-                    180.0 / 256.0, 180.0 / 256.0, 180.0 / 256.0
-                )  # tick marks are grey
-                GL.glBegin(GL.GL_LINE_STRIP)
-                GL.glVertex2f(tick_start.x, tick_start.y)
-                GL.glVertex2f(tick_end.x, tick_end.y)
-                GL.glEnd()
-                self.render_text(str(i), tick_start.x + 1, tick_start.y)
+        first_tick = start + (-(first_cycle + start)) % 5
+        for i in range(first_tick, start + window_length + 1, 5):
+            tick_start.x = signal_x_offset + (i * one_cycle)
+            tick_start.y = bottom_left.y + tick_y_offset
+            tick_end.x = signal_x_offset + (i * one_cycle)
+            tick_end.y = bottom_left.y + tick_y_offset + tick_length
+            GL.glColor3f(
+                180.0 / 256.0, 180.0 / 256.0, 180.0 / 256.0
+            )  # tick marks are grey
+            GL.glBegin(GL.GL_LINE_STRIP)
+            GL.glVertex2f(tick_start.x, tick_start.y)
+            GL.glVertex2f(tick_end.x, tick_end.y)
+            GL.glEnd()
+            self.render_text(
+                str(first_cycle + i), tick_start.x + 1, tick_start.y
+            )
 
         # Draw the last tick
-        if signal_length % 5 != 0:
+        if (first_cycle + signal_length) % 5 != 0:
             tick_start.x = signal_x_offset + (signal_length * one_cycle)
             tick_start.y = bottom_left.y + tick_y_offset
             tick_end.x = signal_x_offset + (signal_length * one_cycle)
@@ -298,7 +331,8 @@ class MyGLCanvas(wxcanvas.GLCanvas):
             GL.glVertex2f(tick_end.x, tick_end.y)
             GL.glEnd()
             self.render_text(
-                str(signal_length), tick_start.x + 1, tick_start.y
+                str(first_cycle + signal_length), tick_start.x + 1,
+                tick_start.y
             )
 
         # Draw the horizontal tickmarks for 1 and 0
@@ -342,27 +376,24 @@ class MyGLCanvas(wxcanvas.GLCanvas):
         GL.glBegin(GL.GL_LINE_STRIP)
         sig_current = coord()
         sig_next = coord()
-        just_blank = False
-        for i in range(signal_length):
-            if just_blank:
-                GL.glBegin(GL.GL_LINE_STRIP)
-                just_blank = not (just_blank)
+        # Each run is drawn as one line, however long it is
+        i = start
+        for level, length in signal_runs_bin:
             sig_current.x = signal_x_offset + (i * one_cycle)
-            sig_next.x = signal_x_offset + ((i + 1) * one_cycle)
-            if signal_list_bin[i] == 0:
-                sig_current.y = y_low
-                sig_next.y = y_low
-                GL.glVertex2f(sig_current.x, sig_current.y)
-                GL.glVertex2f(sig_next.x, sig_next.y)
-            elif signal_list_bin[i] == 1:
-                sig_current.y = y_high
-                sig_next.y = y_high
-                GL.glVertex2f(sig_current.x, sig_current.y)
-                GL.glVertex2f(sig_next.x, sig_next.y)
-            elif signal_list_bin is None:
+            sig_next.x = signal_x_offset + ((i + length) * one_cycle)
+            i += length
+            if level is None:
+                # Leave a gap for blank cycles
                 GL.glEnd()
-                just_blank = not (just_blank)
+                GL.glBegin(GL.GL_LINE_STRIP)
                 continue
+            if level == 0:
+                sig_current.y = y_low
+            else:
+                sig_current.y = y_high
+            sig_next.y = sig_current.y
+            GL.glVertex2f(sig_current.x, sig_current.y)
+            GL.glVertex2f(sig_next.x, sig_next.y)
         GL.glEnd()
         GL.glLineWidth(1)
 
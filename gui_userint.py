@@ -7,6 +7,7 @@ Classes:
 --------
 GuiUserInterface - reads and parses user commands.
 """
+from history import History
 
 
 class GuiUserInterface:
@@ -24,6 +25,11 @@ class GuiUserInterface:
     network: instance of the network.Network() class.
     monitors: instance of the monitors.Monitors() class.
 
+    Runs are only recorded in a history.History() once record_history is
+    set, which the connections sidebar does when a connection is first
+    replaced. Recording uses the event-driven engine and executes every
+    cycle.
+
     Public methods:
     ---------------
     command_interface(self): Reads in the commands and calls the corresponding
@@ -74,6 +80,9 @@ class GuiUserInterface:
         self.refresh_canvas = refresh_canvas
 
         self.cycles_completed = 0  # number of simulation cycles completed
+        # record_history is True if runs are recorded so that connections
+        # can be replaced without running them again
+        self.record_history = False
 
         self.character = ""  # current character
         self.line = ""  # current string entered by the user
@@ -241,12 +250,21 @@ class GuiUserInterface:
 
         Return True if successful.
         """
-        for _ in range(cycles):
-            if self.network.execute_network():
-                self.monitors.record_signals()
-            else:
-                self.output_cmd(_("Error! Network oscillating."))
-                return False
+        engine = self.network.engine
+        status = self.network.run(cycles, self.monitors, skip_idle=True)
+        if self.network.engine != engine:
+            self.output_cmd(_("Error: cannot use the simulation engine on "
+                              "this circuit, using the default engine."))
+        if status.oscillation_cycle is not None:
+            self.output_cmd(_("Error! Network oscillating."))
+            if status.oscillating_devices:
+                self.output_cmd(_("Oscillating devices: {}").format(
+                    ", ".join(
+                        self.names.get_name_string(device_id)
+                        for device_id in status.oscillating_devices
+                    )
+                ))
+            return False
         # self.monitors.display_signals()
         self.refresh_canvas()
         return True
@@ -262,6 +280,8 @@ class GuiUserInterface:
                 "".join([_("Running for "), str(cycles), _(" cycles")])
             )
             self.devices.cold_startup()
+            if self.record_history:
+                History(self.network, self.monitors).start()
             if self.run_network(cycles):
                 self.cycles_completed += cycles
 
@@ -0,0 +1,428 @@
+"""Record a simulation so that edited connections can be re-simulated.
+
+Used in the Logic Simulator project to update a simulation after a
+connection is replaced, re-simulating only the devices that the edit can
+affect instead of running the whole network again from the first cycle.
+
+Classes
+-------
+History - records checkpoints and output changes, and replays edits.
+"""
+import array
+import bisect
+import heapq
+
+
+class History:
+    """Record checkpoints and output changes, and replay edits.
+
+    While a history is recorded, the network uses the event-driven engine
+    and logs every output change together with the cycle, iteration and
+    rank of the device that made it. A snapshot of the network is kept as a
+    checkpoint every interval cycles. When checkpoint_limit checkpoints are
+    kept, every other checkpoint is dropped and the interval doubles, so the
+    number of checkpoints stays bounded. Recording stops once more than
+    log_limit changes are logged.
+
+    When the input of a device is connected to a different output, only
+    that device and the devices it drives, directly or indirectly (its
+    fanout cone), can behave differently. The cone is re-simulated from the
+    last checkpoint before the old and new outputs first differ. The
+    devices driving the cone from outside are not executed: their logged
+    changes are applied in the order they were made, so the cone sees the
+    same signals as in a full run of the edited network. The traces of the
+    monitors outside the cone are kept as they are.
+
+    Parameters
+    ----------
+    network: instance of the network.Network() class.
+    monitors: instance of the monitors.Monitors() class.
+    interval: number of cycles between checkpoints.
+    checkpoint_limit: maximum number of checkpoints kept.
+    log_limit: maximum number of changes logged.
+
+    Public methods
+    --------------
+    start(self): Starts recording from the current state of the network.
+
+    stop(self): Stops recording.
+
+    get_log_base(self, iteration): Returns the log entry of the first rank
+                                   in the iteration of the current cycle.
+
+    end_cycle(self, steady): Ends the current cycle, and takes a
+                             checkpoint if it is time to do so.
+
+    replace_connection(self, input_device_id, input_id, output_device_id,
+                       output_id): Connects the input to the output and
+                                   re-simulates its fanout cone.
+
+    Non-public methods
+    ------------------
+    _get_cone(self, device_id): Returns the ranks of the devices driven by
+                                the device, and the device itself.
+
+    _get_first_change(self, outputs): Returns the first cycle in which one
+                                      of the outputs changes.
+
+    _restore_checkpoint(self, index): Restores the state of the network at
+                                      a checkpoint.
+
+    _replay(self, cone, start_cycle, traces): Re-simulates the cone from the
+                                              start cycle.
+    """
+
+    def __init__(self, network, monitors, interval=64, checkpoint_limit=64,
+                 log_limit=1 << 24):
+        """Initialise the logs and checkpoints."""
+        self.network = network
+        self.devices = network.devices
+        self.monitors = monitors
+        self.initial_interval = interval
+        self.interval = interval
+        self.checkpoint_limit = checkpoint_limit
+        self.log_limit = log_limit
+
+        # Each change is logged as one integer:
+        # ((cycle * ITERATION_STEP + iteration) * rank_count + rank)
+        # * RANK_STEP + port * PORT_STEP + signal, where port is the position
+        # of the output in the outputs of the device
+        self.ITERATION_STEP = 32  # more than the iteration limit
+        self.PORT_STEP = len(self.devices.signal_types)
+        self.RANK_STEP = 16  # more than two ports of PORT_STEP signals
+
+        self.cycles = 0  # number of cycles recorded
+        self.rank_count = 0  # number of devices in the schedule
+        # logs stores an array of logged changes for each rank
+        self.logs = []
+        # checkpoints stores [[snapshot, overlay]] every interval cycles,
+        # where the overlay dictionary stores {device_id: (outputs,
+        # dtype_memory)} for the devices re-simulated since the snapshot
+        self.checkpoints = []
+
+    def start(self):
+        """Start recording from the current state of the network.
+
+        The current state is cycle 0 of the history.
+        """
+        self.network.get_execution_order()  # make sure the ranks are known
+        self.rank_count = len(self.network.schedule)
+        self.logs = [array.array("q") for rank in range(self.rank_count)]
+        self.cycles = 0
+        self.interval = self.initial_interval
+        self.checkpoints = [[self.network.snapshot(), {}]]
+        self.network.history = self
+
+    def stop(self):
+        """Stop recording."""
+        if self.network.history is self:
+            self.network.history = None
+
+    def get_log_base(self, iteration):
+        """Return the log entry of rank 0 in the iteration of this cycle.
+
+        The change of a device is logged by adding its rank times RANK_STEP
+        and its port and signal to this entry.
+        """
+        return (
+            (self.cycles * self.ITERATION_STEP + iteration)
+            * self.rank_count * self.RANK_STEP
+        )
+
+    def end_cycle(self, steady):
+        """End the current cycle, and take a checkpoint if it is time to.
+
+        Recording stops if the network did not settle, or if the logs are
+        longer than the limit.
+        """
+        if not steady:
+            self.stop()
+            return
+        self.cycles += 1
+        if self.cycles % self.interval != 0:
+            return
+        if sum(len(log) for log in self.logs) > self.log_limit:
+            self.stop()
+            return
+        if len(self.checkpoints) >= self.checkpoint_limit:
+            # Keep every other checkpoint, twice as many cycles apart
+            del self.checkpoints[1::2]
+            self.interval *= 2
+        if self.cycles % self.interval == 0:
+            self.checkpoints.append([self.network.snapshot(), {}])
+
+    def replace_connection(
+        self, input_device_id, input_id, output_device_id, output_id
+    ):
+        """Connect the input to the output and re-simulate its fanout cone.
+
+        The connection is always replaced. Return True if the devices and
+        the monitors now hold the results of the edited network, or False
+        if the network must be run again from the start, because the
+        history is not being recorded or the edited network oscillates.
+        """
+        network = self.network
+        old_output = network.get_connected_output(input_device_id, input_id)
+        network.replace_connection(
+            input_device_id, input_id, output_device_id, output_id
+        )
+        if network.history is not self:
+            return False
+        new_output = (output_device_id, output_id)
+        network.get_execution_order()  # rebuild the schedule
+        if len(network.schedule) != self.rank_count:
+            self.stop()
+            return False
+
+        if old_output is None:
+            start_cycle = 0
+        else:
+            start_cycle = self._get_first_change([old_output, new_output])
+        if start_cycle is None:
+            # Neither output ever changes, so the input only sees a
+            # different signal if they start at different levels
+            if network.get_output_signal(*old_output) == \
+                    network.get_output_signal(*new_output):
+                return True
+            start_cycle = 0
+
+        end_state = network.snapshot()
+        index = start_cycle // self.interval
+        self._restore_checkpoint(index)
+        if index > 0 and network.get_output_signal(*old_output) != \
+                network.get_output_signal(*new_output):
+            # The outputs differ from the start
+            index = 0
+            self._restore_checkpoint(index)
+
+        cone = self._get_cone(input_device_id)
+        # traces dictionary stores {(device_id, output_id): [signal_list]}
+        # for the monitors in the cone, with the signals from the start
+        # cycle
+        traces = {}
+        for device_id, output_id in self.monitors.monitors_dictionary:
+            if network.ranks[device_id] in cone:
+                traces[(device_id, output_id)] = []
+        steady = self._replay(cone, index * self.interval, traces)
+
+        cone_state = [
+            (device, dict(device.outputs), device.dtype_memory)
+            for device in [network.schedule[rank][0] for rank in cone]
+        ]
+        network.restore(end_state)
+        if not steady:
+            self.stop()
+            return False
+        for device, outputs, dtype_memory in cone_state:
+            device.outputs.update(outputs)
+            device.dtype_memory = dtype_memory
+
+        for (device_id, output_id), signal_list in traces.items():
+            trace = self.monitors.monitors_dictionary[(device_id, output_id)]
+            start = len(trace) - self.cycles + index * self.interval
+            # Windowed traces may not keep the first cycles replayed
+            position = max(-start, 0)
+            start = max(start, 0)
+            old_runs = list(trace.runs(start))
+            trace.truncate(start)
+            for signal, length in old_runs:
+                if signal == self.devices.BLANK:
+                    # Monitors made during the history start with blank
+                    # signals
+                    trace.append_run(signal, length)
+                else:
+                    trace.extend(signal_list[position:position + length])
+                position += length
+        return True
+
+    def _get_cone(self, device_id):
+        """Return the ranks of the device and of the devices it drives.
+
+        Devices driven indirectly, through other devices, are included.
+        """
+        network = self.network
+        cone = set()
+        stack = [device_id]
+        while stack:
+            device_id = stack.pop()
+            rank = network.ranks[device_id]
+            if rank in cone:
+                continue
+            cone.add(rank)
+            for output_id in self.devices.get_device(device_id).outputs:
+                for input_device_id, input_id in network.iter_fanout(
+                    device_id, output_id
+                ):
+                    stack.append(input_device_id)
+        return cone
+
+    def _get_first_change(self, outputs):
+        """Return the first cycle in which one of the outputs changes.
+
+        outputs is a list of (device_id, output_id). Return None if none of
+        the outputs change in the history.
+        """
+        first_cycle = None
+        for device_id, output_id in outputs:
+            rank = self.network.ranks[device_id]
+            port = list(self.devices.get_device(device_id).outputs).index(
+                output_id
+            )
+            for entry in self.logs[rank]:
+                if entry % self.RANK_STEP // self.PORT_STEP == port:
+                    cycle = entry // (
+                        self.ITERATION_STEP * self.rank_count * self.RANK_STEP
+                    )
+                    if first_cycle is None or cycle < first_cycle:
+                        first_cycle = cycle
+                    break
+        return first_cycle
+
+    def _restore_checkpoint(self, index):
+        """Restore the state of the network at the specified checkpoint."""
+        snapshot, overlay = self.checkpoints[index]
+        self.network.restore(snapshot)
+        for device_id, (outputs, dtype_memory) in overlay.items():
+            device = self.devices.get_device(device_id)
+            device.outputs.update(outputs)
+            device.dtype_memory = dtype_memory
+
+    def _replay(self, cone, start_cycle, traces):
+        """Re-simulate the cone from the start cycle to the last cycle.
+
+        The network must hold the state at the start cycle. The devices in
+        the cone are executed as the event-driven engine would execute
+        them, and the logged changes of the devices driving the cone are
+        applied in between. The logs of the cone and the checkpoints after
+        the start cycle are updated, and the monitor signals of every cycle
+        are appended to traces. Return True if the cone settles in every
+        cycle.
+        """
+        network = self.network
+        schedule = network.schedule
+        ranks = network.ranks
+        fanout = network.fanout
+        logs = self.logs
+        transient_signals = [self.devices.RISING, self.devices.FALLING]
+        RANK_STEP = self.RANK_STEP
+        PORT_STEP = self.PORT_STEP
+        iteration_size = self.rank_count * RANK_STEP
+        cycle_size = self.ITERATION_STEP * iteration_size
+        start_entry = start_cycle * cycle_size
+
+        # Only the changes of the devices driving the cone are replayed
+        boundary = set()
+        for rank in cone:
+            device_id = schedule[rank][0].device_id
+            for input_id, connected_output in network.iter_fanin(device_id):
+                if ranks[connected_output[0]] not in cone:
+                    boundary.add(ranks[connected_output[0]])
+        events = heapq.merge(*[
+            logs[rank][bisect.bisect_left(logs[rank], start_entry):]
+            for rank in boundary
+        ])
+        event = next(events, None)
+        for rank in cone:
+            del logs[rank][bisect.bisect_left(logs[rank], start_entry):]
+        output_ids = {
+            rank: list(schedule[rank][0].outputs)
+            for rank in cone | boundary
+        }
+        monitored = [
+            (schedule[ranks[device_id]][0].outputs, output_id, signal_list)
+            for (device_id, output_id), signal_list in traces.items()
+        ]
+
+        # Number of iterations to wait for the signals to settle before
+        # declaring the network unstable
+        iteration_limit = 20
+
+        pending = set(cone)  # nothing is known about the cone yet
+        for cycle in range(start_cycle, self.cycles):
+            active = pending
+            cycle_entry = cycle * cycle_size
+            next_cycle_entry = cycle_entry + cycle_size
+            for iteration in range(iteration_limit + 1):
+                log_base = cycle_entry + iteration * iteration_size
+                iteration_end = log_base + iteration_size
+                if iteration == 0:
+                    queue = []  # only clocks change before the iterations
+                else:
+                    queue = sorted(active)
+                next_active = set()
+                steady = True
+                while True:
+                    if event is not None and event < iteration_end and (
+                        not queue
+                        or (event - log_base) // RANK_STEP < queue[0]
+                    ):
+                        # A device outside the cone changed
+                        rank, change = divmod(event - log_base, RANK_STEP)
+                        port, signal = divmod(change, PORT_STEP)
+                        device = schedule[rank][0]
+                        changes = [(output_ids[rank][port], signal)]
+                        event = next(events, None)
+                    elif queue:
+                        rank = heapq.heappop(queue)
+                        device, execute_function, arguments = schedule[rank]
+                        previous_signals = list(device.outputs.values())
+                        if not execute_function(
+                            device.device_id, *arguments
+                        ):
+                            return False
+                        changes = []
+                        for port, ((output_id, signal),
+                                   previous_signal) in enumerate(
+                            zip(device.outputs.items(), previous_signals)
+                        ):
+                            if signal == previous_signal:
+                                continue
+                            changes.append((output_id, signal))
+                            logs[rank].append(
+                                log_base + rank * RANK_STEP
+                                + port * PORT_STEP + signal
+                            )
+                            if signal in transient_signals:
+                                next_active.add(rank)
+                    else:
+                        break
+
+                    for output_id, signal in changes:
+                        device.outputs[output_id] = signal
+                        steady = False
+                        for input_device_id, input_id in fanout.get(
+                            (device.device_id, output_id), ()
+                        ):
+                            input_rank = ranks[input_device_id]
+                            if input_rank not in cone:
+                                continue
+                            if iteration == 0:
+                                # Clocks changed before the first iteration
+                                active.add(input_rank)
+                            elif input_rank <= rank:
+                                next_active.add(input_rank)
+                            elif input_rank not in active:
+                                active.add(input_rank)
+                                heapq.heappush(queue, input_rank)
+
+                if iteration == 0:
+                    continue
+                active = next_active
+                # Devices outside the cone may keep changing after the cone
+                # settles, so the cycle only ends once their changes stop
+                if steady and (event is None or event >= next_cycle_entry):
+                    break
+            else:
+                return False  # the cone does not settle
+            pending = active
+
+            for outputs, output_id, signal_list in monitored:
+                signal_list.append(outputs[output_id])
+            if (cycle + 1) % self.interval == 0:
+                overlay = self.checkpoints[(cycle + 1) // self.interval][1]
+                for rank in cone:
+                    device = schedule[rank][0]
+                    overlay[device.device_id] = (
+                        dict(device.outputs), device.dtype_memory
+                    )
+        return True
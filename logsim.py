@@ -9,6 +9,11 @@ Usage
 Show help: logsim.py -h
 Command line user interface: logsim.py -c <file path>
 Graphical user interface: logsim.py <file path>
+Simulation engine: logsim.py -e <event|levelized|compiled|vectorized> ...
+Truth table: logsim.py -t <table path> -c <file path>
+VCD file: logsim.py -v <vcd path> -n <cycles> -c <file path>
+Trace store: logsim.py -s <store path> ...
+Recent cycles only: logsim.py -w <cycles> ...
 """
 import getopt
 import sys
@@ -22,6 +27,9 @@ from monitors import Monitors
 from scanner import Scanner
 from parse import Parser
 from userint import UserInterface
+from truthtable import TruthTable
+from vcd import VcdWriter
+from traces import TraceStore
 from gui import Gui
 import builtins
 
@@ -46,60 +54,143 @@ def main(arg_list):
         "Command line user interface: logsim.py -c <file path>\n"
         "Graphical user interface: logsim.py\n"
         "This will bring up a file dialog where you can choose the "
-        "file you wish to run."
+        "file you wish to run.\n"
+        "Simulation engine: "
+        "logsim.py -e <event|levelized|compiled|vectorized> ...\n"
+        "Truth table: logsim.py -t <table path> -c <file path>\n"
+        "VCD file: logsim.py -v <vcd path> -n <cycles> -c <file path>\n"
+        "Trace store: logsim.py -s <store path> ...\n"
+        "Recent cycles only: logsim.py -w <cycles> ..."
     )
     try:
-        options, arguments = getopt.getopt(arg_list, "hc:")
+        options, arguments = getopt.getopt(arg_list, "hc:e:t:v:n:s:w:")
     except getopt.GetoptError:
         print(_("Error: invalid command line arguments\n"))
         print(usage_message)
         sys.exit()
 
-    # Initialise instances of the four inner simulator classes
+    # Initialise instances of the inner simulator classes. The monitors are
+    # made once the options are read.
     names = Names()
     devices = Devices(names)
     network = Network(names, devices)
-    monitors = Monitors(names, devices, network)
 
     # names = None
     # devices = None
     # network = None
     # monitors = None
 
-    for option, path in options:
+    engines = {
+        "event": network.EVENT_DRIVEN,
+        "levelized": network.LEVELIZED,
+        "compiled": network.COMPILED,
+        "vectorized": network.VECTORIZED,
+    }
+    engine = network.EVENT_DRIVEN
+    table_path = None
+    vcd_path = None
+    vcd_cycles = None
+    store_path = None
+    window = None
+    for option, value in options:
         if option == "-h":  # print the usage message
             print(usage_message)
             sys.exit()
-        elif option == "-c":  # use the command line user interface
-            scanner = Scanner(path, names)
-            parser = Parser(names, devices, network, monitors, scanner)
-            if parser.parse_network():
-                # Initialise an instance of the userint.UserInterface() class
-                userint = UserInterface(names, devices, network, monitors)
-                userint.command_interface()
-
-    if not options:  # no option given, use the graphical user interface
-        # app = wx.App()
-
-        # # Internationalisation
-        # builtins._ = wx.GetTranslation
-        # locale = wx.Locale()
-        # locale.Init(wx.LANGUAGE_DEFAULT)
-        # locale.AddCatalogLookupPathPrefix('./locale')
-        # locale.AddCatalog('logsim_fr.mo')
-
-        gui = Gui(
-            _(
-                "\uB17C\uB9AC \uD68C\uB85C \uBAA8\uC758 \uC2E4\uD5D8 "
-                "Logic Simulator"
-            ),
-            names,
-            devices,
-            network,
-            monitors,
-        )
-        gui.Show(True)
-        app.MainLoop()
+        elif option == "-t":  # write the truth table instead of simulating
+            table_path = value
+        elif option == "-v":  # write the monitored signals to a VCD file
+            vcd_path = value
+        elif option == "-n":  # number of cycles written to the VCD file
+            if not value.isdigit():
+                print(_("Error: invalid number of cycles\n"))
+                print(usage_message)
+                sys.exit()
+            vcd_cycles = int(value)
+        elif option == "-s":  # keep the traces in a memory-mapped file
+            store_path = value
+        elif option == "-w":  # only keep the signals of the recent cycles
+            if not value.isdigit() or int(value) == 0:
+                print(_("Error: invalid number of cycles\n"))
+                print(usage_message)
+                sys.exit()
+            window = int(value)
+        elif option == "-e":  # select the simulation engine
+            if value not in engines:
+                print(_("Error: invalid simulation engine\n"))
+                print(usage_message)
+                sys.exit()
+            engine = engines[value]
+    if vcd_path is not None and vcd_cycles is None:
+        print(_("Error: the number of cycles is missing\n"))
+        print(usage_message)
+        sys.exit()
+
+    # The store file is only made once the options are known to be valid
+    trace_store = None
+    if store_path is not None:
+        trace_store = TraceStore(store_path)
+    monitors = Monitors(names, devices, network, trace_store=trace_store,
+                        window=window)
+
+    # The store is closed however the simulator exits, so that its traces
+    # are flushed and its header is written
+    try:
+        for option, path in options:
+            if option == "-c":  # use the command line user interface
+                scanner = Scanner(path, names)
+                parser = Parser(names, devices, network, monitors, scanner)
+                if parser.parse_network():
+                    if table_path is not None:
+                        truth_table = TruthTable(devices, network, monitors)
+                        with open(table_path, "w", newline="") as table_file:
+                            if not truth_table.write_csv(table_file):
+                                print(_("Error! Could not write the truth "
+                                        "table."))
+                        sys.exit()
+                    if not network.set_engine(engine):
+                        print(_("Error: cannot use the simulation engine on "
+                                "this circuit, using the default engine."))
+                    if vcd_path is not None:
+                        with open(vcd_path, "w") as vcd_file:
+                            vcd_writer = VcdWriter(devices, network, monitors,
+                                                   vcd_file)
+                            status = network.run(vcd_cycles, vcd_writer,
+                                                 skip_idle=True)
+                            vcd_writer.close()
+                        if status.oscillation_cycle is not None:
+                            print(_("Error! Network oscillating."))
+                        sys.exit()
+                    # Initialise a userint.UserInterface() instance
+                    userint = UserInterface(names, devices, network, monitors)
+                    userint.command_interface()
+
+        # no -c option given, use the graphical user interface
+        if "-c" not in [option for option, value in options]:
+            # app = wx.App()
+
+            # # Internationalisation
+            # builtins._ = wx.GetTranslation
+            # locale = wx.Locale()
+            # locale.Init(wx.LANGUAGE_DEFAULT)
+            # locale.AddCatalogLookupPathPrefix('./locale')
+            # locale.AddCatalog('logsim_fr.mo')
+
+            gui = Gui(
+                _(
+                    "\uB17C\uB9AC \uD68C\uB85C \uBAA8\uC758 \uC2E4\uD5D8 "
+                    "Logic Simulator"
+                ),
+                names,
+                devices,
+                network,
+                monitors,
+                engine,
+            )
+            gui.Show(True)
+            app.MainLoop()
+    finally:
+        if trace_store is not None:
+            trace_store.close()
 
 
 if __name__ == "__main__":
@@ -10,6 +10,8 @@ Monitors - records and displays specified output signals.
 """
 import collections
 
+from traces import Trace, RunTrace, MappedTrace, RingTrace
+
 
 class Monitors:
     """Record and display output signals.
@@ -22,11 +24,20 @@ class Monitors:
     names: instance of the names.Names() class.
     devices: instance of the devices.Devices() class.
     network: instance of the network.Network() class.
+    run_length: if True, traces are stored as runs of equal signals
+                (traces.RunTrace) instead of one byte per cycle
+                (traces.Trace).
+    trace_store: instance of the traces.TraceStore() class. If given, the
+                 traces are stored in its memory-mapped file instead.
+    window: if given, monitors only keep the signals of this many of the
+            most recent cycles (traces.RingTrace), unless make_monitor is
+            given another window.
 
     Public methods
     --------------
-    make_monitor(self, device_id, output_id): Sets a specified monitor on the
-                                              specified output.
+    make_monitor(self, device_id, output_id, cycles_completed=0,
+                 window=None): Sets a specified monitor on the specified
+                               output.
 
     remove_monitor(self, device_id, output_id): Removes a monitor from the
                                                 specified output.
@@ -36,6 +47,15 @@ class Monitors:
 
     record_signals(self): Records the current signal level of all monitors.
 
+    make_recorder(self): Returns a function that records the current signal
+                         level of all monitors.
+
+    record_repeat(self, cycles): Records the current signal level of all
+                                 monitors for the given number of cycles.
+
+    repeat_signals(self, period, cycles): Extends all monitors by repeating
+                                          their last period signals.
+
     get_signal_names(self): Returns two lists of signal names: monitored and
                             not monitored.
 
@@ -46,15 +66,32 @@ class Monitors:
     display_signals(self): Displays signal trace(s) in the text console.
     """
 
-    def __init__(self, names, devices, network):
+    def __init__(self, names, devices, network, run_length=False,
+                 trace_store=None, window=None):
         """Initialise the monitors dictionary and monitor errors."""
         self.names = names
         self.network = network
         self.devices = devices
 
         # monitors_dictionary stores
-        # {(device_id, output_id): [signal_list]}
+        # {(device_id, output_id): signal_trace}, where each signal_trace is
+        # a traces.Trace(), or a traces.RunTrace() if run_length is True
         self.monitors_dictionary = collections.OrderedDict()
+        if run_length:
+            self.trace_type = RunTrace
+        else:
+            self.trace_type = Trace
+        self.trace_store = trace_store
+        self.window = window
+
+        # symbols dictionary stores {signal: character} for display_signals
+        self.symbols = {
+            self.devices.HIGH: "-",
+            self.devices.LOW: "_",
+            self.devices.RISING: "/",
+            self.devices.FALLING: "\\",
+            self.devices.BLANK: " ",
+        }
 
         [
             self.NO_ERROR,
@@ -62,10 +99,13 @@ class Monitors:
             self.MONITOR_PRESENT,
         ] = self.names.unique_error_codes(3)
 
-    def make_monitor(self, device_id, output_id, cycles_completed=0):
+    def make_monitor(self, device_id, output_id, cycles_completed=0,
+                     window=None):
         """Add the specified signal to the monitors dictionary.
 
-        Return NO_ERROR if successful, or the corresponding error if not.
+        If window is given, or the monitors have a window, the monitor only
+        keeps the signals of that many of the most recent cycles. Return
+        NO_ERROR if successful, or the corresponding error if not.
         """
         monitor_device = self.devices.get_device(device_id)
         if monitor_device is None:
@@ -79,9 +119,17 @@ class Monitors:
             # monitor, then initialise the signal trace with an n-length list
             # of BLANK signals. Otherwise, initialise the trace with an empty
             # list.
-            self.monitors_dictionary[(device_id, output_id)] = [
-                self.devices.BLANK
-            ] * cycles_completed
+            if window is None:
+                window = self.window
+            if window is not None:
+                signal_trace = RingTrace(window)
+            elif self.trace_store is None:
+                signal_trace = self.trace_type()
+            else:
+                signal_trace = self.trace_store.add_trace(
+                    self.devices.get_signal_name(device_id, output_id))
+            signal_trace.append_run(self.devices.BLANK, cycles_completed)
+            self.monitors_dictionary[(device_id, output_id)] = signal_trace
             return self.NO_ERROR
 
     def remove_monitor(self, device_id, output_id):
@@ -92,7 +140,9 @@ class Monitors:
         if (device_id, output_id) not in self.monitors_dictionary:
             return False
         else:
-            del self.monitors_dictionary[(device_id, output_id)]
+            signal_trace = self.monitors_dictionary.pop((device_id, output_id))
+            if isinstance(signal_trace, MappedTrace):
+                self.trace_store.remove_trace(signal_trace)
             return True
 
     def get_monitor_signal(self, device_id, output_id):
@@ -116,6 +166,54 @@ class Monitors:
                 signal_level
             )
 
+    def make_recorder(self):
+        """Return a function that records the signals of the monitors.
+
+        The function does the same as record_signals, with the monitored
+        outputs and signal lists looked up once in advance. It must be made
+        again if monitors are added or removed.
+        """
+        bindings = [
+            (self.devices.get_device(device_id).outputs, output_id,
+             signal_list.append)
+            for (device_id, output_id), signal_list
+            in self.monitors_dictionary.items()
+        ]
+
+        def record():
+            for outputs, output_id, append in bindings:
+                append(outputs[output_id])
+
+        return record
+
+    def record_repeat(self, cycles):
+        """Record the current signal level for every monitor cycles times.
+
+        This is called instead of record_signals for a run of cycles in
+        which no signal changes.
+        """
+        for (device_id, output_id), signal_list in \
+                self.monitors_dictionary.items():
+            signal_level = self.get_monitor_signal(device_id, output_id)
+            signal_list.append_run(signal_level, cycles)
+
+    def repeat_signals(self, period, cycles):
+        """Extend every monitor by repeating its last period signals.
+
+        The signals recorded in the last period cycles are repeated for the
+        given number of cycles, as if they had been recorded. Traces in
+        memory only keep a note of the repeat, windowed traces only write
+        the cycles they keep, and traces in a store are written a block at
+        a time.
+        """
+        repeats, remainder = divmod(cycles, period)
+        for signal_list in self.monitors_dictionary.values():
+            if isinstance(signal_list, list):
+                pattern = signal_list[-period:]
+                signal_list.extend(pattern * repeats + pattern[:remainder])
+                continue
+            signal_list.repeat_signals(period, cycles)
+
     def get_signal_names(self):
         """Return two signal name lists: monitored and not monitored."""
         non_monitored_signal_list = []
@@ -138,10 +236,18 @@ class Monitors:
     def reset_monitors(self):
         """Clear the memory of all the monitors.
 
-        The list of stored signal levels for each monitor is deleted.
+        The list of stored signal levels for each monitor is deleted. The
+        traces in a trace store are cleared and keep their columns, and
+        windowed traces keep their window.
         """
         for device_id, output_id in self.monitors_dictionary:
-            self.monitors_dictionary[(device_id, output_id)] = []
+            signal_trace = self.monitors_dictionary[(device_id, output_id)]
+            if isinstance(signal_trace, (MappedTrace, RingTrace)):
+                signal_trace.clear()
+            else:
+                self.monitors_dictionary[(device_id, output_id)] = (
+                    self.trace_type()
+                )
 
     def get_margin(self):
         """Return the length of the longest monitor's name.
@@ -161,22 +267,18 @@ class Monitors:
             return None
 
     def display_signals(self):
-        """Display the signal trace(s) in the text console."""
+        """Display the signal trace(s) in the text console.
+
+        Each run of equal signals is printed at once.
+        """
         margin = self.get_margin()
         for device_id, output_id in self.monitors_dictionary:
             monitor_name = self.devices.get_signal_name(device_id, output_id)
             name_length = len(monitor_name)
-            signal_list = self.monitors_dictionary[(device_id, output_id)]
+            signal_trace = self.monitors_dictionary[(device_id, output_id)]
             print(monitor_name + (margin - name_length) * " ", end=": ")
-            for signal in signal_list:
-                if signal == self.devices.HIGH:
-                    print("-", end="")
-                if signal == self.devices.LOW:
-                    print("_", end="")
-                if signal == self.devices.RISING:
-                    print("/", end="")
-                if signal == self.devices.FALLING:
-                    print("\\", end="")
-                if signal == self.devices.BLANK:
-                    print(" ", end="")
+            print("".join(
+                self.symbols.get(signal, "") * length
+                for signal, length in signal_trace.runs()
+            ), end="")
             print("\n", end="")
@@ -0,0 +1,167 @@
+"""Store the network as flat arrays of nets and signals.
+
+Used in the Logic Simulator project to give the compiled, vectorized and
+bit-parallel engines a compact copy of the network, in which every output is
+a net with an integer ID and the connections are arrays of net IDs. The
+devices.Device objects are not replaced by it.
+
+Classes
+-------
+Netlist - stores the devices and connections as arrays indexed by net ID.
+"""
+from array import array
+
+
+class Netlist:
+    """Store the devices and connections as arrays indexed by net ID.
+
+    Every device output is given a net ID when the netlist is elaborated, in
+    the order the devices are executed. The signal of every net is held in
+    one array, and each device kind keeps arrays of the nets its devices
+    drive and read. The Device objects stay the reference copy of the
+    signals: load copies their outputs into the netlist and store copies
+    them back.
+
+    Parameters
+    ----------
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+
+    Public methods
+    --------------
+    elaborate(self): Assigns net IDs and builds the arrays, once. Returns
+                     False if some inputs are unconnected.
+
+    get_net(self, device_id, output_id): Returns the net ID of the specified
+                                         output.
+
+    get_gate_inputs(self, gate_index): Returns the net IDs of the inputs of
+                                       the specified gate.
+
+    load(self): Copies the output signals of the devices into signals.
+
+    store(self): Copies signals back into the outputs of the devices.
+    """
+
+    def __init__(self, devices, network):
+        """Initialise the net and device arrays."""
+        self.devices = devices
+        self.network = network
+
+        # nets dictionary stores {(device_id, output_id): net_id}
+        self.nets = {}
+        # net_outputs stores [(device_id, output_id)], indexed by net ID
+        self.net_outputs = []
+        # owners stores the Device object driving each net
+        self.owners = []
+        # signals stores the signal of every net, indexed by net ID
+        self.signals = array("b")
+
+        # Logic gates, in execution order. The inputs of gate i are
+        # gate_inputs[gate_input_starts[i]:gate_input_starts[i + 1]].
+        self.gate_ids = []
+        self.gate_kinds = array("b")
+        self.gate_nets = array("l")
+        self.gate_input_starts = array("l", [0])
+        self.gate_inputs = array("l")
+        # gate_indices dictionary stores {device_id: gate_index}
+        self.gate_indices = {}
+
+        # D-types, in execution order
+        self.dtype_ids = []
+        self.dtype_q_nets = array("l")
+        self.dtype_qbar_nets = array("l")
+        self.dtype_clock_inputs = array("l")
+        self.dtype_data_inputs = array("l")
+        self.dtype_set_inputs = array("l")
+        self.dtype_clear_inputs = array("l")
+
+        self.clock_ids = []
+        self.clock_nets = array("l")
+        self.switch_ids = []
+        self.switch_nets = array("l")
+
+    def elaborate(self):
+        """Assign net IDs to the outputs and build the arrays.
+
+        Return False if some inputs are unconnected.
+        """
+        if not self.network.check_network():
+            return False
+        order = self.network.get_execution_order()
+
+        for device in order:
+            for output_id, signal in device.outputs.items():
+                self.nets[(device.device_id, output_id)] = len(
+                    self.net_outputs
+                )
+                self.net_outputs.append((device.device_id, output_id))
+                self.owners.append(device)
+                self.signals.append(signal)
+
+        for device in order:
+            device_id = device.device_id
+            inputs = device.inputs
+            if device.device_kind == self.devices.SWITCH:
+                self.switch_ids.append(device_id)
+                self.switch_nets.append(self.nets[(device_id, None)])
+
+            elif device.device_kind == self.devices.CLOCK:
+                self.clock_ids.append(device_id)
+                self.clock_nets.append(self.nets[(device_id, None)])
+
+            elif device.device_kind == self.devices.D_TYPE:
+                self.dtype_ids.append(device_id)
+                self.dtype_q_nets.append(
+                    self.nets[(device_id, self.devices.Q_ID)]
+                )
+                self.dtype_qbar_nets.append(
+                    self.nets[(device_id, self.devices.QBAR_ID)]
+                )
+                self.dtype_clock_inputs.append(
+                    self.nets[inputs[self.devices.CLK_ID]]
+                )
+                self.dtype_data_inputs.append(
+                    self.nets[inputs[self.devices.DATA_ID]]
+                )
+                self.dtype_set_inputs.append(
+                    self.nets[inputs[self.devices.SET_ID]]
+                )
+                self.dtype_clear_inputs.append(
+                    self.nets[inputs[self.devices.CLEAR_ID]]
+                )
+
+            else:  # logic gates
+                self.gate_indices[device_id] = len(self.gate_ids)
+                self.gate_ids.append(device_id)
+                self.gate_kinds.append(device.device_kind)
+                self.gate_nets.append(self.nets[(device_id, None)])
+                for connected_output in inputs.values():
+                    self.gate_inputs.append(self.nets[connected_output])
+                self.gate_input_starts.append(len(self.gate_inputs))
+        return True
+
+    def get_net(self, device_id, output_id):
+        """Return the net ID of the specified output.
+
+        Return None if either of the specified IDs is invalid.
+        """
+        return self.nets.get((device_id, output_id))
+
+    def get_gate_inputs(self, gate_index):
+        """Return the net IDs of the inputs of the specified gate."""
+        start = self.gate_input_starts[gate_index]
+        end = self.gate_input_starts[gate_index + 1]
+        return self.gate_inputs[start:end]
+
+    def load(self):
+        """Copy the output signals of the devices into signals."""
+        signals = self.signals
+        for net, (device_id, output_id) in enumerate(self.net_outputs):
+            signals[net] = self.owners[net].outputs[output_id]
+
+    def store(self):
+        """Copy signals back into the outputs of the devices."""
+        signals = self.signals
+        for net, (device_id, output_id) in enumerate(self.net_outputs):
+            self.owners[net].outputs[output_id] = signals[net]
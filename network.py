@@ -5,7 +5,29 @@ Used in the Logic Simulator project to add and connect devices together.
 Classes
 --------
 Network - builds and executes the network.
+RunStatus - the outcome of a run of many simulation cycles.
 """
+import array
+import collections
+import hashlib
+import heapq
+import itertools
+import operator
+import random
+import struct
+import types
+
+import compiler
+import netlist
+import vectorized
+
+# cycles_completed is the number of cycles that settled, oscillation_cycle is
+# the cycle in which the network oscillated (or None), and
+# oscillating_devices lists the IDs of the devices involved
+RunStatus = collections.namedtuple(
+    "RunStatus",
+    ["cycles_completed", "oscillation_cycle", "oscillating_devices"],
+)
 
 
 class Network:
@@ -25,6 +47,14 @@ class Network:
     get_connected_output(self, device_id, output_id): Returns the device and
                                               port id of the connected output.
 
+    get_all_connections(self): Returns a read-only view of all connections.
+
+    iter_fanout(self, device_id, output_id): Returns an iterator over the
+                                             inputs driven by the output.
+
+    iter_fanin(self, device_id): Returns an iterator over the connected
+                                 inputs of the device.
+
     get_input_signal(self, device_id, input_id): Returns the signal level at
                                      the output connected to the given input.
 
@@ -45,8 +75,8 @@ class Network:
 
     execute_switch(self, device_id): Simulates a switch press.
 
-    execute_gate(self, device_id, x=None, y=None): Simulates a logic gate and
-                                              updates its output signal value.
+    execute_gate(self, device_id, x=None, y=None, settled=False): Simulates a
+                         logic gate and updates its output signal value.
 
     execute_d_type(self, device_id): Simulates a D-type device and updates its
                                      output signal value.
@@ -54,11 +84,72 @@ class Network:
     execute_clock(self, device_id): Simulates a clock and updates its output
                                     signal value.
 
+    register_evaluator(self, device_kind, execute_function, arguments=()):
+                       Executes the devices of a new kind with the function.
+
     update_clocks(self): If it is time to do so, sets clock signals to RISING
                          or FALLING.
 
+    levelize(self): Sorts the logic gates into levels. Returns False if the
+                    gates form a feedback loop.
+
+    set_engine(self, engine): Selects how execute_network executes the
+                              devices.
+
+    find_feedback_loops(self): Returns the loops of logic gates that are not
+                               broken by a D-type.
+
+    get_execution_order(self): Returns the list of devices in the order they
+                               are executed.
+
+    get_netlist(self): Returns the netlist of the devices and connections.
+
     execute_network(self): Executes all the devices in the network for one
                            simulation cycle.
+
+    run(self, cycles, monitors=None, fast_forward=False, skip_idle=False):
+                       Executes the network for many cycles, recording the
+                       monitors, and returns a RunStatus.
+
+    replace_connection(self, second_device_id, second_port_id,
+                       third_device_id, third_port_id): Connects the input of
+                                     the second device to the third device.
+
+    snapshot(self): Returns the simulation state of the network as bytes.
+
+    restore(self, snapshot): Returns the network to the state in a snapshot.
+                             Returns True if successful.
+
+    Non-public methods
+    ------------------
+    _connect(self, input_device_id, input_id, output_device_id, output_id):
+                        Connects the input to the output and updates the
+                        connection and fanout indexes.
+
+    _structure_changed(self): Discards the schedule, levels, compiled
+                              function, vectorized network and netlist
+                              made from the connections.
+
+    _update_schedule(self): Rebuilds the schedule if the devices have
+                            changed.
+
+    _build_schedule(self): Ranks the devices in execution order.
+
+    _get_state_digest(self): Returns a digest of the signals, D-type
+                             memories and clock counters.
+
+    _get_cycle_function(self): Returns the function that executes one cycle
+                               with the chosen engine.
+
+    _check_dtype_inputs(self): Returns True if every D-type is clocked by a
+                               clock, and set and cleared by switches.
+
+    _execute_event_driven(self): Executes the devices whose inputs changed
+                                 until the signals settle.
+
+    _execute_levelized(self): Executes every device once per iteration, with
+                              the gates in level order, until the signals
+                              settle.
     """
 
     def __init__(self, names, devices):
@@ -76,6 +167,113 @@ class Network:
         ] = self.names.unique_error_codes(6)
         self.steady_state = True  # for checking if signals have settled
 
+        LOW = self.devices.LOW
+        HIGH = self.devices.HIGH
+        RISING = self.devices.RISING
+        FALLING = self.devices.FALLING
+        # signal_transitions[signal][target] is the signal after one update
+        # towards the target: LOW and FALLING signals rise towards any
+        # target but LOW, and HIGH and RISING signals fall towards LOW. It is
+        # None for signals that are not levels or transitions.
+        signal_count = len(self.devices.signal_types)
+        self.signal_transitions = [
+            [None] * signal_count for signal in self.devices.signal_types
+        ]
+        for signal, low_target, other_target in [
+            (LOW, LOW, RISING), (FALLING, LOW, RISING),
+            (HIGH, FALLING, HIGH), (RISING, FALLING, HIGH),
+        ]:
+            self.signal_transitions[signal] = [other_target] * signal_count
+            self.signal_transitions[signal][LOW] = low_target
+        # settled_levels[signal] is the level the signal is settling to, and
+        # previous_levels[signal] is the level it is leaving
+        self.settled_levels = [None] * signal_count
+        self.previous_levels = [None] * signal_count
+        for signal, settled_level, previous_level in [
+            (LOW, LOW, LOW), (HIGH, HIGH, HIGH),
+            (RISING, HIGH, LOW), (FALLING, LOW, HIGH),
+        ]:
+            self.settled_levels[signal] = settled_level
+            self.previous_levels[signal] = previous_level
+        # inverse_signals dictionary stores {level: inverse level}
+        self.inverse_signals = {LOW: HIGH, HIGH: LOW}
+        # gate_rules dictionary stores {device_kind: (x, y)} in execution
+        # order: if all the inputs of a gate are x, then its output is y,
+        # else its output is the inverse of y. XOR gates have no rule.
+        self.gate_rules = {
+            self.devices.AND: (HIGH, HIGH),
+            self.devices.OR: (LOW, LOW),
+            self.devices.NAND: (HIGH, LOW),
+            self.devices.NOR: (LOW, HIGH),
+            self.devices.XOR: (None, None),
+            self.devices.NOT: (HIGH, LOW),
+        }
+        # evaluators stores [(device_kind, execute_function, arguments)]
+        # for the device kinds registered with register_evaluator
+        self.evaluators = []
+
+        # schedule stores [(device, execute_function, extra_arguments)] in
+        # the order the devices are executed within each iteration. It is
+        # rebuilt when devices or connections change.
+        self.schedule = None
+        self.schedule_generation = None
+        # ranks dictionary stores {device_id: position in schedule}
+        self.ranks = {}
+        self.switch_ranks = []
+        # connections dictionary stores
+        # {(input_device_id, input_id): (output_device_id, output_id)}
+        self.connections = {}
+        # fanout dictionary stores
+        # {(output_device_id, output_id): [(input_device_id, input_id)]}
+        self.fanout = {}
+        # ranks of the devices to execute first in the next simulation cycle
+        self.pending = set()
+        # state_keys stores, for each rank, a list of random hash keys per
+        # output and signal level, with the D-type memory as a last output
+        self.state_keys = []
+        self.key_generator = random.Random(0)
+        # device IDs of the devices that changed in the last failed cycle
+        self.oscillating_devices = []
+        # feedback_loops stores [[gate_device_ids]], one list per loop
+        self.feedback_loops = []
+        # number of states remembered by run to find periodic behaviour
+        self.state_history_limit = 100000
+        # snapshot_header packs the numbers of output signals, D-types,
+        # clocks and switches, and the length, version and Gaussian value of
+        # the random number generator state
+        self.snapshot_header = struct.Struct("<6q?d")
+
+        # levels stores [[gate_device_ids]], where the gates in each level
+        # are only driven by earlier levels, switches, clocks and D-types
+        self.levels = None
+        self.levelized_order = []
+        self.levels_valid = False
+        # True if levelized execution gives the same results as the
+        # event-driven engine for the D-types, found with the levels
+        self.dtypes_levelizable = False
+
+        # history.History recording the changes of every device, or None
+        self.history = None
+
+        # function generated by compiler.Compiler to execute a cycle
+        self.compiled_execute = None
+        # vectorized.VectorizedNetwork built for the network
+        self.vectorized_network = None
+        # netlist.Netlist of the current devices and connections
+        self.netlist = None
+
+        # number of devices when the schedule, levels and compiled function
+        # were made; they are all remade when connections change
+        self.structure_size = 0
+
+        self.engine_types = [
+            self.EVENT_DRIVEN,
+            self.LEVELIZED,
+            self.COMPILED,
+            self.VECTORIZED,
+        ] = range(4)
+        self.engine = self.EVENT_DRIVEN
+
     def get_connected_output(self, device_id, input_id):
         """Return the output connected to the given input.
 
@@ -90,21 +288,34 @@ class Network:
         return None
 
     def get_all_connections(self):
-        """Return list of all connections in the network."""
-        all_devices = self.devices.find_devices()
-        connection_dict = {}
-        for second_device_id in all_devices:
-            for second_port_id in self.devices.get_device(
-                second_device_id
-            ).inputs:
-                first_device_id, first_port_id = self.get_connected_output(
-                    second_device_id, second_port_id
-                )
-                connection_dict[(second_device_id, second_port_id)] = (
-                    first_device_id,
-                    first_port_id,
-                )
-        return connection_dict
+        """Return a read-only view of all connections in the network.
+
+        The view maps each connected input (device ID, port ID) to its
+        output (device ID, port ID), and follows later connection changes.
+        """
+        return types.MappingProxyType(self.connections)
+
+    def iter_fanout(self, device_id, output_id):
+        """Return an iterator over the inputs driven by the given output.
+
+        The inputs are of the form (device ID, port ID).
+        """
+        return iter(self.fanout.get((device_id, output_id), ()))
+
+    def iter_fanin(self, device_id):
+        """Return an iterator over the connected inputs of the given device.
+
+        Each item is of the form (input ID, (device ID, port ID)), where the
+        second part is the connected output.
+        """
+        device = self.devices.get_device(device_id)
+        if device is None:
+            return iter(())
+        return (
+            (input_id, connected_output)
+            for input_id, connected_output in device.inputs.items()
+            if connected_output is not None
+        )
 
     def get_input_signal(self, device_id, input_id):
         """Return the signal level at the output connected to the given input.
@@ -152,7 +363,9 @@ class Network:
                 error_type = self.INPUT_TO_INPUT
             elif second_port_id in second_device.outputs:
                 # Make connection
-                first_device.inputs[first_port_id] = (
+                self._connect(
+                    first_device_id,
+                    first_port_id,
                     second_device_id,
                     second_port_id,
                 )
@@ -169,7 +382,9 @@ class Network:
                     # Input is already in a connection
                     error_type = self.INPUT_CONNECTED
                 else:
-                    second_device.inputs[second_port_id] = (
+                    self._connect(
+                        second_device_id,
+                        second_port_id,
                         first_device_id,
                         first_port_id,
                     )
@@ -194,16 +409,38 @@ class Network:
         Replace connection between an arbitrary device and second device with a
         connection between third device and second device.
         """
-        second_device = self.devices.get_device(second_device_id)
+        self._connect(
+            second_device_id, second_port_id, third_device_id, third_port_id
+        )
 
-        second_device.inputs[second_port_id] = (third_device_id, third_port_id)
+    def _connect(
+        self, input_device_id, input_id, output_device_id, output_id
+    ):
+        """Connect the given input to the given output.
+
+        Any previous connection of the input is removed from the connection
+        and fanout indexes.
+        """
+        input_device = self.devices.get_device(input_device_id)
+        previous_output = input_device.inputs.get(input_id)
+        if previous_output is not None:
+            self.fanout[previous_output].remove((input_device_id, input_id))
+
+        input_device.inputs[input_id] = (output_device_id, output_id)
+        self.connections[(input_device_id, input_id)] = (
+            output_device_id,
+            output_id,
+        )
+        self.fanout.setdefault((output_device_id, output_id), []).append(
+            (input_device_id, input_id)
+        )
+        self._structure_changed()
 
     def check_network(self):
         """Return True if all inputs in the network are connected."""
-        for device_id in self.devices.find_devices():
-            device = self.devices.get_device(device_id)
-            for input_id in device.inputs:
-                if self.get_connected_output(device_id, input_id) is None:
+        for device in self.devices.iter_devices():
+            for connected_output in device.inputs.values():
+                if connected_output is None:
                     return False
         return True
 
@@ -211,19 +448,12 @@ class Network:
         """Update the signal in the direction of the target.
 
         Return updated signal, and set steady_state to false if the new signal
-        is different from the old signal.
+        is different from the old signal. Return None if the signal or the
+        target is not a signal type.
         """
-        if signal in [self.devices.LOW, self.devices.FALLING]:
-            if target == self.devices.LOW:
-                new_signal = self.devices.LOW
-            else:
-                new_signal = self.devices.RISING
-        elif signal in [self.devices.HIGH, self.devices.RISING]:
-            if target == self.devices.LOW:
-                new_signal = self.devices.FALLING
-            else:
-                new_signal = self.devices.HIGH
-        else:
+        try:
+            new_signal = self.signal_transitions[signal][target]
+        except (IndexError, TypeError):
             return None
         if signal != new_signal:
             self.steady_state = False
@@ -234,12 +464,7 @@ class Network:
 
         Return None if the signal is not HIGH or LOW.
         """
-        if signal == self.devices.HIGH:
-            return self.devices.LOW
-        elif signal == self.devices.LOW:
-            return self.devices.HIGH
-        else:
-            return None
+        return self.inverse_signals.get(signal)
 
     def execute_switch(self, device_id):
         """Simulate a switch.
@@ -258,40 +483,47 @@ class Network:
             device.outputs[None] = updated_signal
             return True
 
-    def execute_gate(self, device_id, x=None, y=None):
+    def execute_gate(self, device_id, x=None, y=None, settled=False):
         """Simulate a logic gate and update its output signal value.
 
         The rule is: if all its inputs are x, then its output is y, else its
         output is the inverse of y.
         Note: (x,y) pairs for AND, OR, NOR, NAND, XOR are: (HIGH, HIGH), (LOW,
         LOW), (LOW, HIGH), (HIGH, LOW), (None, None).
+        If settled is True, RISING and FALLING inputs are read as the level
+        they are changing to.
         Return True if successful.
         """
         device = self.devices.get_device(device_id)
-        input_signal_list = []
-        for input_id in device.inputs:
-            input_signal = self.get_input_signal(device_id, input_id)
-            if input_signal is None:  # this input is unconnected
-                return False
-            input_signal_list.append(input_signal)
-
-            if device.device_kind != self.devices.XOR:
-                if input_signal != x:
-                    output_signal = self.invert_signal(y)
-                    break
-                output_signal = y
-
         if device.device_kind == self.devices.XOR:
+            input_signals = []
+            for input_id in device.inputs:
+                input_signal = self.get_input_signal(device_id, input_id)
+                if input_signal is None:  # this input is unconnected
+                    return False
+                if settled:
+                    input_signal = self.settled_levels[input_signal]
+                input_signals.append(input_signal)
             # Output is high only if both inputs are different
-            if input_signal_list[0] == input_signal_list[1]:  # assume 2 inputs
-                output_signal = self.devices.LOW
+            if input_signals[0] == input_signals[1]:  # assume 2 inputs
+                target = self.devices.LOW
             else:
-                output_signal = self.devices.HIGH
+                target = self.devices.HIGH
+        else:
+            # The first input that is not x decides the output
+            target = y
+            for input_id in device.inputs:
+                input_signal = self.get_input_signal(device_id, input_id)
+                if input_signal is None:  # this input is unconnected
+                    return False
+                if settled:
+                    input_signal = self.settled_levels[input_signal]
+                if input_signal != x:
+                    target = self.inverse_signals.get(y)
+                    break
 
         # Update and store the new signal
-        signal = self.get_output_signal(device_id, None)
-        target = output_signal
-        updated_signal = self.update_signal(signal, target)
+        updated_signal = self.update_signal(device.outputs[None], target)
         if updated_signal is None:  # if the update is unsuccessful
             return False
         device.outputs[None] = updated_signal
@@ -317,12 +549,12 @@ class Network:
             elif input_id == self.devices.SET_ID:
                 set_signal = input_signal
 
-        # Set D-type memory depending on the input signal
+        # Set D-type memory depending on the input signal. On a rising clock
+        # edge, the data is latched at the level it had before any change.
         if clock_signal == self.devices.RISING:
-            if data_signal in [self.devices.HIGH, self.devices.FALLING]:
-                device.dtype_memory = self.devices.HIGH
-            elif data_signal in [self.devices.LOW, self.devices.RISING]:
-                device.dtype_memory = self.devices.LOW
+            data_level = self.previous_levels[data_signal]
+            if data_level is not None:
+                device.dtype_memory = data_level
         if set_signal == self.devices.HIGH:
             device.dtype_memory = self.devices.HIGH
         if clear_signal == self.devices.HIGH:
@@ -354,60 +586,591 @@ class Network:
         device = self.devices.get_device(device_id)
         output_signal = device.outputs[None]  # output ID is None
 
-        if output_signal == self.devices.RISING:
-            new_signal = self.update_signal(output_signal, self.devices.HIGH)
-            if new_signal is None:  # update is unsuccessful
-                return False
-            device.outputs[None] = new_signal
-            return True
+        # RISING and FALLING clocks settle to HIGH and LOW
+        new_signal = self.update_signal(
+            output_signal, self.settled_levels[output_signal])
+        if new_signal is None:  # update is unsuccessful
+            return False
+        device.outputs[None] = new_signal
+        return True
 
-        elif output_signal == self.devices.FALLING:
-            new_signal = self.update_signal(output_signal, self.devices.LOW)
-            if new_signal is None:  # update is unsuccessful
-                return False
-            device.outputs[None] = new_signal
-            return True
+    def register_evaluator(self, device_kind, execute_function,
+                           arguments=()):
+        """Execute the devices of a new kind with the given function.
 
-        elif output_signal in [self.devices.HIGH, self.devices.LOW]:
-            return True
+        The function is called as execute_function(device_id, *arguments)
+        once for every device of the kind each iteration, after the gates,
+        and must return True if successful. Only the event-driven engine
+        executes registered device kinds.
+        """
+        self.evaluators.append((device_kind, execute_function,
+                                tuple(arguments)))
+        self.engine = self.EVENT_DRIVEN
+        self.schedule = None
+
+    def update_clocks(self):
+        """If it is time to do so, set clock signals to RISING or FALLING.
 
+        Only the clocks that switch state in this cycle are visited. Return
+        the list of these clock devices.
+        """
+        switched = self.devices.update_clock_edges()
+        for device in switched:
+            output_signal = device.outputs[None]
+            if output_signal == self.devices.HIGH:
+                device.outputs[None] = self.devices.FALLING
+            elif output_signal == self.devices.LOW:
+                device.outputs[None] = self.devices.RISING
+        return switched
+
+    def get_execution_order(self):
+        """Return the list of devices in the order they are executed.
+
+        Switches come first, then D-types, clocks, the gates kind by kind,
+        and the registered device kinds.
+        """
+        self._update_schedule()
+        return [device for device, function, arguments in self.schedule]
+
+    def get_netlist(self):
+        """Return the netlist.Netlist of the devices and connections.
+
+        The netlist is elaborated once and kept until the connections change.
+        Its signals are loaded from the devices. Return None if some inputs
+        are unconnected.
+        """
+        self._update_schedule()
+        if self.netlist is None:
+            new_netlist = netlist.Netlist(self.devices, self)
+            if not new_netlist.elaborate():
+                return None
+            self.netlist = new_netlist
         else:
+            self.netlist.load()
+        return self.netlist
+
+    def _structure_changed(self):
+        """Discard everything made from the devices and their connections."""
+        self.schedule = None
+        self.levels_valid = False
+        self.compiled_execute = None
+        self.vectorized_network = None
+        self.netlist = None
+
+    def _update_schedule(self):
+        """Rebuild the schedule if the devices have changed."""
+        if len(self.devices.devices_list) != self.structure_size:
+            self._structure_changed()
+            self.structure_size = len(self.devices.devices_list)
+            if self.history is not None:
+                # The ranks in the history no longer match the devices
+                self.history.stop()
+        if (
+            self.schedule is None
+            or self.schedule_generation != self.devices.generation
+        ):
+            self._build_schedule()
+
+    def _build_schedule(self):
+        """Rank the devices in execution order.
+
+        Devices are ranked in the order they have always been executed in:
+        switches, D-types, clocks, then the gates kind by kind, then the
+        registered device kinds.
+        """
+        execution_order = [
+            (self.devices.SWITCH, self.execute_switch, ()),
+            # D-types are executed before clocks to catch the rising edge
+            (self.devices.D_TYPE, self.execute_d_type, ()),
+            (self.devices.CLOCK, self.execute_clock, ()),
+        ]
+        for device_kind, gate_rule in self.gate_rules.items():
+            execution_order.append((device_kind, self.execute_gate, gate_rule))
+        # Registered device kinds are executed last
+        execution_order.extend(self.evaluators)
+        self.schedule = []
+        self.ranks = {}
+        for device_kind, execute_function, arguments in execution_order:
+            for device in self.devices.iter_devices(device_kind):
+                self.ranks[device.device_id] = len(self.schedule)
+                self.schedule.append((device, execute_function, arguments))
+
+        self.state_keys = [
+            [
+                [self.key_generator.getrandbits(64)
+                 for signal in self.devices.signal_types]
+                for port in range(len(device.outputs) + 1)
+            ]
+            for device, execute_function, arguments in self.schedule
+        ]
+
+        self.switch_ranks = [
+            self.ranks[device_id]
+            for device_id in self.devices.find_devices(self.devices.SWITCH)
+        ]
+        self.schedule_generation = self.devices.generation
+        # Nothing is known about the state of the devices yet
+        self.pending = set(range(len(self.schedule)))
+
+    def levelize(self):
+        """Sort the logic gates into levels for levelized execution.
+
+        The network is cut at the outputs of switches, clocks and D-types.
+        Each gate is placed one level above the highest level of the gates
+        driving it, so executing the levels in order lets every gate see the
+        settled signals of its inputs in the same iteration. Whether the
+        D-types can be executed in levelized order is found at the same time.
+        Return True if successful, or False if the gates form a feedback loop.
+        """
+        self._update_schedule()
+
+        # Count the inputs of each gate that are driven by other gates
+        gate_inputs = {}
+        for device, execute_function, arguments in self.schedule:
+            if device.device_kind in self.devices.gate_types:
+                gate_inputs[device.device_id] = 0
+        for device_id in gate_inputs:
+            for connected_output in self.devices.get_device(
+                device_id
+            ).inputs.values():
+                if connected_output is not None:
+                    if connected_output[0] in gate_inputs:
+                        gate_inputs[device_id] += 1
+
+        self.levels = []
+        level = [
+            device_id for device_id in gate_inputs
+            if gate_inputs[device_id] == 0
+        ]
+        levelized_gates = 0
+        while level:
+            self.levels.append(level)
+            levelized_gates += len(level)
+            next_level = []
+            for device_id in level:
+                for input_device_id, input_id in self.fanout.get(
+                    (device_id, None), ()
+                ):
+                    if input_device_id in gate_inputs:
+                        gate_inputs[input_device_id] -= 1
+                        if gate_inputs[input_device_id] == 0:
+                            next_level.append(input_device_id)
+            level = next_level
+
+        self.levels_valid = True
+        self.dtypes_levelizable = self._check_dtype_inputs()
+        if levelized_gates != len(gate_inputs):  # some gates form a loop
+            self.levels = None
+            self.levelized_order = []
             return False
 
-    def update_clocks(self):
-        """If it is time to do so, set clock signals to RISING or FALLING."""
-        clock_devices = self.devices.find_devices(self.devices.CLOCK)
-        for device_id in clock_devices:
-            device = self.devices.get_device(device_id)
-            if device.clock_counter == device.clock_half_period:
-                device.clock_counter = 0
-                output_signal = self.get_output_signal(
-                    device_id, output_id=None
+        self.levelized_order = [
+            (device, execute_function, arguments)
+            for device, execute_function, arguments in self.schedule
+            if device.device_kind not in self.devices.gate_types
+        ]
+        for level in self.levels:
+            for device_id in level:
+                device, execute_function, arguments = self.schedule[
+                    self.ranks[device_id]
+                ]
+                self.levelized_order.append(
+                    (device, execute_function, (*arguments, True))
                 )
-                if output_signal == self.devices.HIGH:
-                    device.outputs[None] = self.devices.FALLING
-                elif output_signal == self.devices.LOW:
-                    device.outputs[None] = self.devices.RISING
-            device.clock_counter += 1
+        return True
+
+    def find_feedback_loops(self):
+        """Find the feedback loops among the logic gates.
+
+        The network is cut at the outputs of switches, clocks and D-types, so
+        only loops made entirely of gates are found. Each loop is a strongly
+        connected component of the gates, found with Tarjan's algorithm.
+        Return the list of loops, each a list of gate device IDs in execution
+        order.
+        """
+        self._update_schedule()
+        gate_ids = [
+            device.device_id
+            for device, execute_function, arguments in self.schedule
+            if device.device_kind in self.devices.gate_types
+        ]
+        gate_set = set(gate_ids)
+
+        # index and lowlink dictionaries store {device_id: number}
+        index = {}
+        lowlink = {}
+        stack = []
+        on_stack = set()
+        self.feedback_loops = []
+        for root in gate_ids:
+            if root in index:
+                continue
+            # Each frame holds a gate and an iterator over the gates it drives
+            frames = [(root, self.iter_fanout(root, None))]
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            while frames:
+                device_id, fanout = frames[-1]
+                for input_device_id, input_id in fanout:
+                    if input_device_id not in gate_set:
+                        continue
+                    if input_device_id not in index:
+                        index[input_device_id] = len(index)
+                        lowlink[input_device_id] = index[input_device_id]
+                        stack.append(input_device_id)
+                        on_stack.add(input_device_id)
+                        frames.append((
+                            input_device_id,
+                            self.iter_fanout(input_device_id, None),
+                        ))
+                        break
+                    if input_device_id in on_stack:
+                        lowlink[device_id] = min(
+                            lowlink[device_id], index[input_device_id]
+                        )
+                else:
+                    frames.pop()
+                    if frames:
+                        parent_id = frames[-1][0]
+                        lowlink[parent_id] = min(
+                            lowlink[parent_id], lowlink[device_id]
+                        )
+                    if lowlink[device_id] == index[device_id]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == device_id:
+                                break
+                        if len(component) > 1 or (device_id, None) in [
+                            connected_output for input_id, connected_output
+                            in self.iter_fanin(device_id)
+                        ]:
+                            component.sort(key=self.ranks.get)
+                            self.feedback_loops.append(component)
+        self.feedback_loops.sort(key=lambda loop: self.ranks[loop[0]])
+        return self.feedback_loops
+
+    def set_engine(self, engine):
+        """Select how execute_network executes the devices.
+
+        EVENT_DRIVEN only executes the devices whose inputs have changed.
+        LEVELIZED executes every device once per iteration, with the gates in
+        level order; it needs the gates to be free of feedback loops, and
+        only gives the same results as EVENT_DRIVEN if every D-type is
+        clocked by a clock and set and cleared by switches, so it is refused
+        for other networks, and the engine is set back to EVENT_DRIVEN if the
+        network is later changed into one of them.
+        COMPILED executes a function generated for the network, with the same
+        results as EVENT_DRIVEN; it needs all inputs to be connected.
+        VECTORIZED executes the gates of each kind together with NumPy array
+        operations, with the same results as EVENT_DRIVEN; it needs all
+        inputs to be connected and NumPy to be installed. Return True if
+        successful.
+        """
+        if engine not in self.engine_types:
+            return False
+        # Only the event-driven engine executes registered device kinds
+        if engine != self.EVENT_DRIVEN and self.evaluators:
+            return False
+        if engine == self.LEVELIZED and not (
+            self.levelize() and self.dtypes_levelizable
+        ):
+            return False
+        if engine == self.COMPILED:
+            self.compiled_execute = compiler.Compiler(
+                self.devices, self
+            ).compile_network()
+            if self.compiled_execute is None:
+                return False
+        if engine == self.VECTORIZED:
+            new_network = vectorized.VectorizedNetwork(self.devices, self)
+            if not new_network.build():
+                return False
+            self.vectorized_network = new_network
+        self.engine = engine
+        # Nothing is known about which devices the new engine left unsettled
+        self.schedule = None
+        return True
 
     def execute_network(self):
         """Execute all the devices in the network for one simulation cycle.
 
-        Return True if successful and the network does not oscillate.
+        Return True if successful and the network does not oscillate. If the
+        event-driven engine finds that the network oscillates, the devices
+        involved are stored in oscillating_devices.
+        """
+        self._update_schedule()
+        self.oscillating_devices = []
+        return self._get_cycle_function()()
+
+    def run(self, cycles, monitors=None, fast_forward=False,
+            skip_idle=False):
+        """Execute the network for the specified number of cycles.
+
+        The engine is chosen once, before the first cycle, and the signals of
+        the monitors in monitors (a monitors.Monitors() instance) are recorded
+        after every successful cycle. Stop at the first cycle in which the
+        network oscillates. Return a RunStatus.
+
+        If fast_forward is True, the state of the network is hashed after
+        every cycle. Once a state repeats, the network is known to cycle
+        through the same states forever, so whole periods are skipped by
+        repeating the recorded monitor signals instead of executing them.
+        The devices end in the same state as if every cycle was executed.
+
+        If skip_idle is True, the cycles before the next clock edge are
+        skipped once a cycle settles. The switches cannot change during a
+        run, so no signal can change until a clock switches state. The
+        monitors record the settled signals for the skipped cycles.
+
+        Cycles are never skipped while a history is recorded.
+        """
+        if self.history is not None:
+            fast_forward = False
+            skip_idle = False
+        self._update_schedule()
+        self.oscillating_devices = []
+        execute_cycle = self._get_cycle_function()
+        if monitors is None:
+            record = None
+        else:
+            record = monitors.make_recorder()
+
+        # seen_states dictionary stores {state_digest: cycles_completed}
+        seen_states = {}
+
+        cycle = 0
+        while cycle < cycles:
+            if not execute_cycle():
+                return RunStatus(cycle, cycle, self.oscillating_devices)
+            if record is not None:
+                record()
+            cycle += 1
+
+            if skip_idle:
+                skipped = self.devices.get_cycles_to_edge()
+                if skipped is None or skipped > cycles - cycle:
+                    skipped = cycles - cycle
+                if skipped:
+                    if monitors is not None:
+                        monitors.record_repeat(skipped)
+                    self.devices.skip_clock_cycles(skipped)
+                    cycle += skipped
+
+            if not fast_forward:
+                continue
+
+            digest = self._get_state_digest()
+            if digest in seen_states:
+                period = cycle - seen_states[digest]
+                skipped = (cycles - cycle) // period * period
+                if monitors is not None:
+                    monitors.repeat_signals(period, skipped)
+                cycle += skipped
+                fast_forward = False
+            else:
+                if len(seen_states) >= self.state_history_limit:
+                    # Only periods shorter than the limit can be found
+                    seen_states = {}
+                seen_states[digest] = cycle
+        return RunStatus(cycles, None, [])
+
+    def snapshot(self):
+        """Return the simulation state of the network as bytes.
+
+        The state is made of all the output signals, the D-type memories,
+        the clock counters, the switch states and the state of the random
+        number generator used by cold start-up. The bytes can be stored or
+        sent to another process, and passed to restore on a network with
+        the same devices.
         """
-        clock_devices = self.devices.find_devices(self.devices.CLOCK)
-        switch_devices = self.devices.find_devices(self.devices.SWITCH)
-        d_type_devices = self.devices.find_devices(self.devices.D_TYPE)
-        and_devices = self.devices.find_devices(self.devices.AND)
-        or_devices = self.devices.find_devices(self.devices.OR)
-        nand_devices = self.devices.find_devices(self.devices.NAND)
-        nor_devices = self.devices.find_devices(self.devices.NOR)
-        xor_devices = self.devices.find_devices(self.devices.XOR)
-        not_devices = self.devices.find_devices(self.devices.NOT)
+        devices = self.devices
+        signals = bytes(itertools.chain.from_iterable(map(
+            dict.values, map(operator.attrgetter("outputs"),
+                             devices.devices_list)
+        )))
+        memories = array.array("b", [
+            device.dtype_memory
+            for device in devices.iter_devices(devices.D_TYPE)
+        ])
+        switches = array.array("b", [
+            device.switch_state
+            for device in devices.iter_devices(devices.SWITCH)
+        ])
+        counters = array.array("q", [
+            device.clock_counter
+            for device in devices.iter_devices(devices.CLOCK)
+        ])
+        version, generator_state, gauss_next = random.getstate()
+        header = self.snapshot_header.pack(
+            len(signals), len(memories), len(counters), len(switches),
+            len(generator_state), version, gauss_next is not None,
+            gauss_next or 0.0,
+        )
+        return b"".join([
+            header, counters.tobytes(),
+            array.array("q", generator_state).tobytes(), signals,
+            memories.tobytes(), switches.tobytes(),
+        ])
+
+    def restore(self, snapshot):
+        """Return the network to the state saved by snapshot.
+
+        Return True if successful, or False if the snapshot was taken from
+        a network with different devices.
+        """
+        devices = self.devices
+        (signal_count, memory_count, counter_count, switch_count,
+         generator_count, version, has_gauss,
+         gauss_next) = self.snapshot_header.unpack_from(snapshot)
+        dtypes = devices.kind_buckets.get(devices.D_TYPE, [])
+        clocks = devices.kind_buckets.get(devices.CLOCK, [])
+        switches = devices.kind_buckets.get(devices.SWITCH, [])
+        if (
+            memory_count != len(dtypes)
+            or counter_count != len(clocks)
+            or switch_count != len(switches)
+            or signal_count != sum(
+                len(device.outputs) for device in devices.devices_list
+            )
+        ):
+            return False
 
+        # The 8-byte parts come first, then the 1-byte parts
+        counters = array.array("q")
+        generator_state = array.array("q")
+        signals = array.array("b")
+        memories = array.array("b")
+        switch_states = array.array("b")
+        start = self.snapshot_header.size
+        for part, count in [
+            (counters, counter_count),
+            (generator_state, generator_count),
+            (signals, signal_count),
+            (memories, memory_count),
+            (switch_states, switch_count),
+        ]:
+            end = start + count * part.itemsize
+            part.frombytes(snapshot[start:end])
+            start = end
+
+        signal_iterator = iter(signals)
+        for device in devices.devices_list:
+            outputs = device.outputs
+            for output_id in outputs:
+                outputs[output_id] = next(signal_iterator)
+        for device, memory in zip(dtypes, memories):
+            device.dtype_memory = memory
+        for device, counter in zip(clocks, counters):
+            device.clock_counter = counter
+        for device, switch_state in zip(switches, switch_states):
+            device.switch_state = switch_state
+        if not has_gauss:
+            gauss_next = None
+        random.setstate((version, tuple(generator_state), gauss_next))
+
+        # Every device must be executed again by the event-driven engine
+        if self.schedule is not None:
+            self.pending = set(range(len(self.schedule)))
+        return True
+
+    def _get_state_digest(self):
+        """Return a digest of the state of the network between cycles.
+
+        The state is made of all the output signals, the D-type memories and
+        the clock counters.
+        """
+        state = array.array("l")
+        for device in self.devices.iter_devices():
+            state.extend(device.outputs.values())
+        for device in self.devices.iter_devices(self.devices.D_TYPE):
+            state.append(device.dtype_memory)
+        for device in self.devices.iter_devices(self.devices.CLOCK):
+            state.append(device.clock_counter)
+        return hashlib.blake2b(state.tobytes(), digest_size=16).digest()
+
+    def _get_cycle_function(self):
+        """Return the function that executes a cycle with the chosen engine.
+
+        Engines that cannot handle the network fall back to the event-driven
+        engine, which is also used while a history is recorded. If the
+        network was changed so that it can no longer be levelized, the
+        engine is set to EVENT_DRIVEN, so that callers can tell.
+        """
+        if self.history is not None:
+            return self._execute_event_driven
+
+        if self.engine == self.COMPILED:
+            if self.compiled_execute is None:
+                self.compiled_execute = compiler.Compiler(
+                    self.devices, self
+                ).compile_network()
+            # Networks with unconnected inputs cannot be compiled
+            if self.compiled_execute is not None:
+                return self.compiled_execute
+
+        if self.engine == self.VECTORIZED:
+            if self.vectorized_network is None:
+                new_network = vectorized.VectorizedNetwork(self.devices, self)
+                if new_network.build():
+                    self.vectorized_network = new_network
+            # Networks with unconnected inputs cannot be vectorized
+            if self.vectorized_network is not None:
+                return self.vectorized_network.execute_network
+
+        if self.engine == self.LEVELIZED:
+            if not self.levels_valid:
+                self.levelize()
+            if self.levels is not None and self.dtypes_levelizable:
+                return self._execute_levelized
+            # Gates with feedback loops cannot be levelized, and D-types
+            # clocked by other devices do not give the same results
+            self.engine = self.EVENT_DRIVEN
+
+        return self._execute_event_driven
+
+    def _check_dtype_inputs(self):
+        """Return True if levelized execution can execute the D-types.
+
+        Every D-type must be clocked by a clock, and set and cleared by
+        switches. Levelized execution gives different results from the
+        event-driven engine when a D-type is clocked by a gate or another
+        D-type, or is set or cleared by them, as their pulses then race in an
+        order that depends on the engine.
+        """
+        for device in self.devices.iter_devices(self.devices.D_TYPE):
+            for input_id, connected_output in device.inputs.items():
+                if input_id == self.devices.CLK_ID:
+                    allowed_kind = self.devices.CLOCK
+                elif input_id in [self.devices.SET_ID, self.devices.CLEAR_ID]:
+                    allowed_kind = self.devices.SWITCH
+                else:
+                    continue
+                if connected_output is None:  # the input is unconnected
+                    continue
+                connected_device = self.devices.get_device(
+                    connected_output[0])
+                if connected_device.device_kind != allowed_kind:
+                    return False
+        return True
+
+    def _execute_levelized(self):
+        """Execute every device once per iteration until the signals settle.
+
+        The clocks are updated first. In every iteration, switches, D-types
+        and clocks are executed first, then the gates in level order. Return
+        True if successful and the network does not oscillate.
+        """
         # This sets clock signals to RISING or FALLING, where necessary
         self.update_clocks()
 
+        # Devices left unsettled here must be executed by the event-driven
+        # engine if it is selected later
+        self.pending = set(range(len(self.schedule)))
+
         # Number of iterations to wait for the signals to settle before
         # declaring the network unstable
         iteration_limit = 20
@@ -416,46 +1179,145 @@ class Network:
         while iterations < iteration_limit:
             iterations += 1
             self.steady_state = True
-
-            for device_id in switch_devices:  # execute switch devices
-                if not self.execute_switch(device_id):
+            for device, execute_function, arguments in self.levelized_order:
+                if not execute_function(device.device_id, *arguments):
                     return False
-            # Execute D-type devices before clocks to catch the rising edge of
-            # the clock
-            for device_id in d_type_devices:  # execute DTYPE devices
-                if not self.execute_d_type(device_id):
-                    return False
-            for device_id in clock_devices:  # complete clock executions
-                if not self.execute_clock(device_id):
-                    return False
-            for device_id in and_devices:  # execute AND gate devices
-                if not self.execute_gate(
-                    device_id, self.devices.HIGH, self.devices.HIGH
-                ):
-                    return False
-            for device_id in or_devices:  # execute OR gate devices
-                if not self.execute_gate(
-                    device_id, self.devices.LOW, self.devices.LOW
-                ):
-                    return False
-            for device_id in nand_devices:  # execute NAND gate devices
-                if not self.execute_gate(
-                    device_id, self.devices.HIGH, self.devices.LOW
-                ):
-                    return False
-            for device_id in nor_devices:  # execute NOR gate devices
-                if not self.execute_gate(
-                    device_id, self.devices.LOW, self.devices.HIGH
+            if self.steady_state:
+                break
+        return self.steady_state
+
+    def _execute_event_driven(self):
+        """Execute the devices whose inputs changed until the signals settle.
+
+        The clocks are updated first. Then only the devices that may change
+        are executed: those with an input that has changed, those whose
+        output is still RISING or FALLING, and the switches. Devices are
+        executed in the same order as if every device was executed in every
+        iteration, so the result is identical.
+
+        The signals and D-type memories are hashed after each iteration. If
+        the hash and the devices left to execute repeat, the iterations will
+        repeat forever, so the network is declared to oscillate at once.
+
+        Return True if successful and the network does not oscillate.
+        """
+        # This sets clock signals to RISING or FALLING, where necessary. Only
+        # the clocks that switch state are returned, so idle clocks cost
+        # nothing.
+        switched_clocks = self.update_clocks()
+
+        history = self.history
+        if history is not None:
+            history_logs = history.logs
+            rank_step = history.RANK_STEP
+            port_step = history.PORT_STEP
+            log_base = history.get_log_base(0)
+
+        transient_signals = [self.devices.RISING, self.devices.FALLING]
+        active = self.pending
+        active.update(self.switch_ranks)  # switches may have been set
+        for device in switched_clocks:
+            rank = self.ranks[device.device_id]
+            if device.outputs[None] in transient_signals:
+                # The clock has just changed, so its inputs must be executed
+                active.add(rank)
+                if history is not None:
+                    history_logs[rank].append(
+                        log_base + rank * rank_step + device.outputs[None]
+                    )
+                for input_device_id, input_id in self.fanout.get(
+                    (device.device_id, None), ()
                 ):
+                    active.add(self.ranks[input_device_id])
+
+        # Hash of the changes made since the start of the cycle
+        state_hash = 0
+        # seen_states dictionary stores {(state_hash, ranks): iteration}
+        seen_states = {(state_hash, frozenset(active)): 0}
+        # changed_ranks stores the set of ranks changed in each iteration
+        changed_ranks = []
+        # iteration at which the repeated state was first seen
+        cycle_start = None
+
+        # Number of iterations to wait for the signals to settle before
+        # declaring the network unstable
+        iteration_limit = 20
+
+        iterations = 0
+        while iterations < iteration_limit:
+            iterations += 1
+            self.steady_state = True
+            if history is not None:
+                log_base = history.get_log_base(iterations)
+
+            # Devices ranked after a changed device are executed in the same
+            # iteration, the others in the next one
+            queue = sorted(active)
+            next_active = set()
+            changed = set()
+            while queue:
+                rank = heapq.heappop(queue)
+                device, execute_function, arguments = self.schedule[rank]
+                previous_signals = list(device.outputs.values())
+                previous_memory = device.dtype_memory
+                if not execute_function(device.device_id, *arguments):
+                    # Execute everything again after a failure
+                    self.pending = set(range(len(self.schedule)))
+                    if history is not None:
+                        history.end_cycle(False)
                     return False
-            for device_id in xor_devices:  # execute XOR devices
-                if not self.execute_gate(device_id, None, None):
-                    return False
-            for device_id in not_devices:  # execute NOT devices
-                if not self.execute_gate(
-                    device_id, self.devices.HIGH, self.devices.LOW
+                keys = self.state_keys[rank]
+                if device.dtype_memory != previous_memory:
+                    state_hash ^= (keys[-1][previous_memory]
+                                   ^ keys[-1][device.dtype_memory])
+                    changed.add(rank)
+                for port, ((output_id, signal), previous_signal) in enumerate(
+                    zip(device.outputs.items(), previous_signals)
                 ):
-                    return False
+                    if signal == previous_signal:
+                        continue
+                    state_hash ^= (keys[port][previous_signal]
+                                   ^ keys[port][signal])
+                    changed.add(rank)
+                    if history is not None:
+                        history_logs[rank].append(
+                            log_base + rank * rank_step + port * port_step
+                            + signal
+                        )
+                    if signal in transient_signals:
+                        next_active.add(rank)
+                    for input_device_id, input_id in self.fanout.get(
+                        (device.device_id, output_id), ()
+                    ):
+                        input_rank = self.ranks[input_device_id]
+                        if input_rank <= rank:
+                            next_active.add(input_rank)
+                        elif input_rank not in active:
+                            active.add(input_rank)
+                            heapq.heappush(queue, input_rank)
+            active = next_active
+            changed_ranks.append(changed)
             if self.steady_state:
                 break
+
+            state = (state_hash, frozenset(active))
+            if state in seen_states:
+                # The iterations since the state was first seen will repeat
+                cycle_start = seen_states[state]
+                break
+            seen_states[state] = iterations
+
+        self.pending = active
+        if not self.steady_state:
+            # Report the devices that change in the repeating iterations, or
+            # in the last iteration if no state repeated
+            if cycle_start is None:
+                ranks = changed_ranks[-1]
+            else:
+                ranks = set().union(*changed_ranks[cycle_start:])
+            self.oscillating_devices = [
+                self.schedule[rank][0].device_id for rank in sorted(ranks)
+            ]
+        if history is not None:
+            history.end_cycle(self.steady_state)
         return self.steady_state
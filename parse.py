@@ -45,6 +45,8 @@ class Parser:
                                                                until stopping
                                                                symbol.
 
+    _warning(self, loop): Print a warning about a feedback loop of gates.
+
     _name(self): Parse a name and return the name ID if it is a valid name.
 
     _argument(self): Parse an argument and return the number.
@@ -229,6 +231,20 @@ class Parser:
             elif skip is False:
                 self.symbol = self.scanner.get_symbol()
 
+    def _warning(self, loop):
+        """Print a warning about a feedback loop of logic gates.
+
+        A warning does not count as an error, so the network is still built.
+        """
+        loop_names = [
+            self.names.get_name_string(device_id) for device_id in loop
+        ]
+        self._parser_output(
+            _("Warning: feedback loop without a D-type: {}\n").format(
+                ", ".join(loop_names)
+            )
+        )
+
     def _name(self):
         """Parse a name and return the name ID if it is a valid name.
 
@@ -728,7 +744,9 @@ class Parser:
         if self.error_count == 0:
             # if all inputs are connected
             if self.network.check_network() is True:
-                pass
+                # loops of gates are allowed, but they may oscillate
+                for loop in self.network.find_feedback_loops():
+                    self._warning(loop)
             # if not all inputs are connected
             elif self.network.check_network() is False:
                 self._error(self.SEMANTIC, self.unconnected_inputs)
@@ -737,7 +755,10 @@ class Parser:
 
     def parse_network(self):
         """Parse the circuit definition file."""
+        # Cold start-up is simulated once, after every device is made
+        self.devices.begin_build()
         self._program()
+        self.devices.end_build()
         if self.error_count == 0:
             return True
         else:
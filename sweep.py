@@ -0,0 +1,225 @@
+"""Run a circuit under many switch configurations in parallel.
+
+Used in the Logic Simulator project to explore the behaviour of a circuit for
+many settings of its switches at once, spreading the simulation runs over a
+pool of worker processes.
+
+Classes
+-------
+Sweep - runs a circuit definition file for many switch configurations.
+SweepResult - the outcome of the run for one switch configuration.
+"""
+import collections
+import concurrent.futures
+import itertools
+import os
+import random
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import Scanner
+from parse import Parser
+
+# configuration is the {switch_name: level} dictionary that was run, status
+# is the network.RunStatus of the run, and traces stores
+# {signal_name: signal_trace} for every monitor, where each signal_trace is
+# a traces.Trace() that compares equal to the list of signals
+SweepResult = collections.namedtuple(
+    "SweepResult", ["configuration", "status", "traces"]
+)
+
+# circuit parsed by each worker process, as a Sweep instance
+worker_sweep = None
+
+
+def _discard_output(text):
+    """Discard parser messages, which are already shown by the main process."""
+
+
+def _initialise_worker(path, cycles, seed):
+    """Parse the circuit once in a new worker process."""
+    global worker_sweep
+    worker_sweep = Sweep(path, cycles, seed=seed)
+    worker_sweep.parse(output_cmd=_discard_output)
+
+
+def _run_in_worker(configuration):
+    """Run one switch configuration on the circuit parsed by the worker."""
+    return worker_sweep.run_configuration(configuration)
+
+
+class Sweep:
+    """Run a circuit definition file for many switch configurations.
+
+    Every configuration is run from the same start: the switches are set,
+    the D-types and clocks are given the same cold start-up state, and the
+    network is run for the given number of cycles while recording the
+    monitors in the file. The runs are spread over a pool of processes, and
+    each process parses the file once.
+
+    Parameters
+    ----------
+    path: path of the circuit definition file.
+    cycles: number of simulation cycles in each run.
+    processes: number of worker processes (default: number of CPUs).
+    seed: seed of the random cold start-up state used for every run.
+
+    Public methods
+    --------------
+    parse(self, output_cmd=None): Parses the definition file. Returns True
+                                  if successful.
+
+    get_switch_names(self): Returns the names of the switches in the circuit.
+
+    enumerate_configurations(self, switch_names=None): Returns every
+                               configuration of the specified switches.
+
+    sample_configurations(self, count, switch_names=None, seed=None):
+                               Returns randomly chosen configurations.
+
+    run_configuration(self, configuration): Runs one configuration in this
+                                            process and returns a SweepResult.
+
+    run(self, configurations): Runs the configurations in the process pool
+                               and returns a list of SweepResults.
+    """
+
+    def __init__(self, path, cycles, processes=None, seed=0):
+        """Initialise the sweep settings."""
+        self.path = path
+        self.cycles = cycles
+        if processes is None:
+            processes = os.cpu_count()
+        self.processes = processes
+        self.seed = seed
+
+        self.names = None
+        self.devices = None
+        self.network = None
+        self.monitors = None
+        self.parsed = False
+        # initial_switches dictionary stores {switch_id: level in the file}
+        self.initial_switches = {}
+
+    def parse(self, output_cmd=None):
+        """Parse the circuit definition file.
+
+        Parser messages are printed, or passed to output_cmd if given. Return
+        True if successful.
+        """
+        self.names = Names()
+        self.devices = Devices(self.names)
+        self.network = Network(self.names, self.devices)
+        self.monitors = Monitors(self.names, self.devices, self.network)
+        scanner = Scanner(self.path, self.names)
+        if output_cmd is None:
+            parser = Parser(self.names, self.devices, self.network,
+                            self.monitors, scanner)
+        else:
+            parser = Parser(self.names, self.devices, self.network,
+                            self.monitors, scanner, mode="gui",
+                            output_cmd=output_cmd)
+        self.parsed = parser.parse_network()
+        self.initial_switches = {
+            device.device_id: device.switch_state
+            for device in self.devices.iter_devices(self.devices.SWITCH)
+        }
+        return self.parsed
+
+    def get_switch_names(self):
+        """Return the names of the switches in the circuit."""
+        return [
+            self.names.get_name_string(device_id)
+            for device_id in self.devices.find_devices(self.devices.SWITCH)
+        ]
+
+    def enumerate_configurations(self, switch_names=None):
+        """Return every configuration of the specified switches.
+
+        All the switches in the circuit are used if none are specified.
+        Each configuration is a {switch_name: level} dictionary.
+        """
+        if switch_names is None:
+            switch_names = self.get_switch_names()
+        return [
+            dict(zip(switch_names, levels))
+            for levels in itertools.product(
+                [self.devices.LOW, self.devices.HIGH],
+                repeat=len(switch_names),
+            )
+        ]
+
+    def sample_configurations(self, count, switch_names=None, seed=None):
+        """Return count randomly chosen configurations of the switches.
+
+        All the switches in the circuit are used if none are specified.
+        Configurations may repeat.
+        """
+        if switch_names is None:
+            switch_names = self.get_switch_names()
+        generator = random.Random(seed)
+        return [
+            {
+                switch_name: generator.choice(
+                    [self.devices.LOW, self.devices.HIGH]
+                )
+                for switch_name in switch_names
+            }
+            for sample in range(count)
+        ]
+
+    def run_configuration(self, configuration):
+        """Run one configuration in this process and return a SweepResult.
+
+        Switches not in the configuration keep the level given in the file.
+        Return None if a switch in the configuration does not exist.
+        """
+        for switch_id, level in self.initial_switches.items():
+            self.devices.set_switch(switch_id, level)
+        for switch_name, level in configuration.items():
+            switch_id = self.names.query(switch_name)
+            if not self.devices.set_switch(switch_id, level):
+                return None
+
+        self.devices.cold_startup(self.seed)
+        self.monitors.reset_monitors()
+        status = self.network.run(self.cycles, self.monitors,
+                                  skip_idle=True)
+
+        traces = {}
+        for (device_id, output_id), signal_trace in (
+            self.monitors.monitors_dictionary.items()
+        ):
+            signal_name = self.devices.get_signal_name(device_id, output_id)
+            traces[signal_name] = signal_trace
+        return SweepResult(dict(configuration), status, traces)
+
+    def run(self, configurations):
+        """Run the configurations in the process pool.
+
+        Return a list of SweepResults in the same order as configurations,
+        or None if the file does not parse or a configuration names a
+        switch that does not exist.
+        """
+        if not self.parsed and not self.parse():
+            return None
+        switch_names = set(self.get_switch_names())
+        for configuration in configurations:
+            if not switch_names.issuperset(configuration):
+                return None
+        if not configurations:
+            return []
+
+        # Send the configurations in chunks to keep the workers busy without
+        # a message per run
+        chunksize = max(1, len(configurations) // (self.processes * 4))
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.processes,
+            initializer=_initialise_worker,
+            initargs=(self.path, self.cycles, self.seed),
+        ) as executor:
+            return list(executor.map(
+                _run_in_worker, configurations, chunksize=chunksize
+            ))
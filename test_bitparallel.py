@@ -0,0 +1,152 @@
+"""Test the bitparallel module."""
+import random
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from bitparallel import BitParallelNetwork
+from test_compiler import make_counter
+
+
+@pytest.fixture
+def new_gates():
+    """Return a Network class instance with two switches and three gates."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+
+    [SW1_ID, SW2_ID, AND1_ID, XOR1_ID, NOT1_ID, I1, I2] = new_names.lookup(
+        ["Sw1", "Sw2", "And1", "Xor1", "Not1", "I1", "I2"])
+    new_devices.make_device(SW1_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(SW2_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(AND1_ID, new_devices.AND, 2)
+    new_devices.make_device(XOR1_ID, new_devices.XOR)
+    new_devices.make_device(NOT1_ID, new_devices.NOT)
+
+    new_network.make_connection(SW1_ID, None, AND1_ID, I1)
+    new_network.make_connection(SW2_ID, None, AND1_ID, I2)
+    new_network.make_connection(SW1_ID, None, XOR1_ID, I1)
+    new_network.make_connection(SW2_ID, None, XOR1_ID, I2)
+    new_network.make_connection(AND1_ID, None, NOT1_ID, I1)
+    return new_network
+
+
+def test_reset_unconnected():
+    """Test if reset fails when some inputs are unconnected."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+
+    [AND1] = new_names.lookup(["And1"])
+    new_devices.make_device(AND1, new_devices.AND, 2)
+
+    simulator = BitParallelNetwork(new_devices, new_network)
+    assert not simulator.reset()
+
+
+def test_set_switch_and_gates(new_gates):
+    """Test if every lane holds the gate outputs for its switch levels."""
+    network = new_gates
+    devices = network.devices
+    [SW1_ID, SW2_ID, AND1_ID, XOR1_ID, NOT1_ID] = devices.names.lookup(
+        ["Sw1", "Sw2", "And1", "Xor1", "Not1"])
+
+    simulator = BitParallelNetwork(devices, network, lanes=4)
+    assert simulator.reset()
+    # The lanes hold every combination of the two switches
+    assert simulator.set_switch(SW1_ID, 0b1010)
+    assert simulator.set_switch(SW2_ID, 0b1100)
+    assert not simulator.set_switch(AND1_ID, 0b1111)
+    assert simulator.execute_network()
+
+    assert simulator.get_output_word(AND1_ID, None) == 0b1000
+    assert simulator.get_output_word(XOR1_ID, None) == 0b0110
+    assert simulator.get_output_word(NOT1_ID, None) == 0b0111
+    assert simulator.get_output_word(AND1_ID, devices.Q_ID) is None
+
+    assert simulator.get_lane_signal(AND1_ID, None, 3) == devices.HIGH
+    assert simulator.get_lane_signal(XOR1_ID, None, 3) == devices.LOW
+    assert simulator.get_lane_signal(SW2_ID, None, 1) == devices.LOW
+
+
+def test_add_fault(new_gates):
+    """Test if faults hold gate ports only in the specified lanes."""
+    network = new_gates
+    devices = network.devices
+    [SW1_ID, SW2_ID, AND1_ID, XOR1_ID, NOT1_ID, I2] = devices.names.lookup(
+        ["Sw1", "Sw2", "And1", "Xor1", "Not1", "I2"])
+
+    simulator = BitParallelNetwork(devices, network, lanes=4)
+    assert simulator.reset()
+    assert simulator.set_switch(SW1_ID, 0b1111)
+    assert simulator.set_switch(SW2_ID, 0b1111)
+    # And1 output stuck LOW in lane 1, its second input stuck LOW in lane 2
+    assert simulator.add_fault(AND1_ID, None, devices.LOW, 0b0010)
+    assert simulator.add_fault(AND1_ID, I2, devices.LOW, 0b0100)
+    assert simulator.add_fault(XOR1_ID, None, devices.HIGH, 0b1000)
+    assert not simulator.add_fault(SW1_ID, None, devices.LOW, 0b0001)
+    assert not simulator.add_fault(NOT1_ID, I2, devices.LOW, 0b0001)
+    assert simulator.execute_network()
+
+    assert simulator.get_output_word(AND1_ID, None) == 0b1001
+    assert simulator.get_output_word(NOT1_ID, None) == 0b0110
+    assert simulator.get_output_word(XOR1_ID, None) == 0b1000
+
+    # Faults are cleared by reset
+    assert simulator.reset()
+    assert simulator.set_switch(SW1_ID, 0b1111)
+    assert simulator.set_switch(SW2_ID, 0b1111)
+    assert simulator.execute_network()
+    assert simulator.get_output_word(AND1_ID, None) == 0b1111
+
+
+def test_lanes_match_separate_runs():
+    """Test if every lane matches a separate run of the network."""
+    lanes = 8
+    random.seed(4)
+    simulator_network = make_counter()
+    devices = simulator_network.devices
+    [SW1_ID, SW2_ID] = devices.names.lookup(["Sw1", "Sw2"])
+    simulator = BitParallelNetwork(devices, simulator_network, lanes)
+    assert simulator.reset()
+
+    lane_networks = []
+    for lane in range(lanes):
+        random.seed(4)
+        lane_networks.append(make_counter())
+
+    # Each lane pulses the clear and set switches at different cycles
+    stimulus = random.Random(5)
+    for cycle in range(30):
+        for switch_id in [SW1_ID, SW2_ID]:
+            word = 0
+            if stimulus.random() < 0.2:
+                word = stimulus.getrandbits(lanes)
+            simulator.set_switch(switch_id, word)
+            for lane, network in enumerate(lane_networks):
+                network.devices.set_switch(switch_id, word >> lane & 1)
+
+        assert simulator.execute_network()
+        for lane, network in enumerate(lane_networks):
+            assert network.execute_network()
+            for device in network.devices.devices_list:
+                for output_id, signal in device.outputs.items():
+                    assert simulator.get_lane_signal(
+                        device.device_id, output_id, lane) == signal
+
+
+def test_oscillating_network():
+    """Test if execute_network fails when the gates do not settle."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+
+    [NOR1, I1] = new_names.lookup(["Nor1", "I1"])
+    new_devices.make_device(NOR1, new_devices.NOR, 1)
+    new_network.make_connection(NOR1, None, NOR1, I1)
+
+    simulator = BitParallelNetwork(new_devices, new_network)
+    assert simulator.reset()
+    assert not simulator.execute_network()
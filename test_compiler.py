@@ -0,0 +1,118 @@
+"""Test the compiler module."""
+import random
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from compiler import Compiler
+
+
+def make_counter():
+    """Return a Network class instance with a 2-bit counter and some gates.
+
+    The counter is clocked by Clock1. Sw1 clears both D-types, and the
+    gates decode the counter outputs.
+    """
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+
+    [SW1_ID, SW2_ID, CL_ID, D1_ID, D2_ID, XOR1_ID, AND1_ID, NOR1_ID,
+     NOT1_ID, I1, I2] = new_names.lookup(["Sw1", "Sw2", "Clock1", "D1", "D2",
+                                          "Xor1", "And1", "Nor1", "Not1",
+                                          "I1", "I2"])
+    new_devices.make_device(SW1_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(SW2_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(CL_ID, new_devices.CLOCK, 2)
+    new_devices.make_device(D1_ID, new_devices.D_TYPE)
+    new_devices.make_device(D2_ID, new_devices.D_TYPE)
+    new_devices.make_device(XOR1_ID, new_devices.XOR)
+    new_devices.make_device(AND1_ID, new_devices.AND, 2)
+    new_devices.make_device(NOR1_ID, new_devices.NOR, 2)
+    new_devices.make_device(NOT1_ID, new_devices.NOT)
+
+    Q = new_devices.Q_ID
+    QBAR = new_devices.QBAR_ID
+    connections = [
+        (CL_ID, None, D1_ID, new_devices.CLK_ID),
+        (CL_ID, None, D2_ID, new_devices.CLK_ID),
+        (SW2_ID, None, D1_ID, new_devices.SET_ID),
+        (SW2_ID, None, D2_ID, new_devices.SET_ID),
+        (SW1_ID, None, D1_ID, new_devices.CLEAR_ID),
+        (SW1_ID, None, D2_ID, new_devices.CLEAR_ID),
+        (D1_ID, QBAR, D1_ID, new_devices.DATA_ID),
+        (XOR1_ID, None, D2_ID, new_devices.DATA_ID),
+        (D1_ID, Q, XOR1_ID, I1),
+        (D2_ID, Q, XOR1_ID, I2),
+        (D1_ID, Q, AND1_ID, I1),
+        (D2_ID, Q, AND1_ID, I2),
+        (AND1_ID, None, NOR1_ID, I1),
+        (NOT1_ID, None, NOR1_ID, I2),
+        (CL_ID, None, NOT1_ID, I1),
+    ]
+    for connection in connections:
+        assert new_network.make_connection(*connection) == \
+            new_network.NO_ERROR
+    return new_network
+
+
+def run_and_record(network, cycles):
+    """Run the network and return the outputs of every device every cycle."""
+    devices = network.devices
+    trace = []
+    for cycle in range(cycles):
+        if cycle == 5:
+            devices.set_switch(devices.names.query("Sw1"), devices.HIGH)
+        if cycle == 9:
+            devices.set_switch(devices.names.query("Sw1"), devices.LOW)
+        assert network.execute_network()
+        trace.append([dict(device.outputs)
+                      for device in devices.devices_list])
+    return trace
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_compiled_matches_event_driven(seed):
+    """Test if the compiled engine gives the same signals as the default."""
+    random.seed(seed)
+    event_network = make_counter()
+    random.seed(seed)
+    compiled_network = make_counter()
+    assert compiled_network.set_engine(compiled_network.COMPILED)
+
+    assert run_and_record(compiled_network, 30) == \
+        run_and_record(event_network, 30)
+
+
+def test_compiled_oscillating_network():
+    """Test if the compiled engine detects oscillating networks."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+
+    [NOR1, I1] = new_names.lookup(["Nor1", "I1"])
+    new_devices.make_device(NOR1, new_devices.NOR, 1)
+    new_network.make_connection(NOR1, None, NOR1, I1)
+
+    assert new_network.set_engine(new_network.COMPILED)
+    assert not new_network.execute_network()
+
+
+def test_compile_network_unconnected():
+    """Test if networks with unconnected inputs are not compiled."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+
+    [AND1, SW1, I1] = new_names.lookup(["And1", "Sw1", "I1"])
+    new_devices.make_device(AND1, new_devices.AND, 2)
+    new_devices.make_device(SW1, new_devices.SWITCH, 1)
+    new_network.make_connection(SW1, None, AND1, I1)
+
+    compiler = Compiler(new_devices, new_network)
+    assert compiler.generate_source() is None
+    assert compiler.compile_network() is None
+    assert not new_network.set_engine(new_network.COMPILED)
+    assert new_network.engine == new_network.EVENT_DRIVEN
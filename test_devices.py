@@ -2,7 +2,7 @@
 import pytest
 
 from names import Names
-from devices import Devices
+from devices import Device, Devices
 
 
 @pytest.fixture
@@ -52,6 +52,23 @@ def test_find_devices(devices_with_items):
     assert devices.find_devices(devices.XOR) == []
 
 
+def test_iter_devices(devices_with_items):
+    """Test if iter_devices iterates over the devices of the given kind."""
+    devices = devices_with_items
+    names = devices.names
+    [AND1_ID, NOR1_ID, SW1_ID, AND2_ID] = names.lookup(["And1", "Nor1", "Sw1",
+                                                        "And2"])
+
+    assert list(devices.iter_devices()) == devices.devices_list
+    assert list(devices.iter_devices(devices.XOR)) == []
+
+    devices.make_device(AND2_ID, devices.AND, 1)
+    assert [device.device_id for device in
+            devices.iter_devices(devices.AND)] == [AND1_ID, AND2_ID]
+    assert devices.get_device(AND2_ID).device_kind == devices.AND
+    assert devices.find_devices() == [AND1_ID, NOR1_ID, SW1_ID, AND2_ID]
+
+
 def test_make_device(new_devices):
     """Test if make_device correctly makes devices with their properties."""
     names = new_devices.names
@@ -148,3 +165,66 @@ def test_set_switch(new_devices):
     # Set switch Sw1 to LOW
     new_devices.set_switch(SW1_ID, new_devices.LOW)
     assert switch_object.switch_state == new_devices.LOW
+
+
+def test_update_clock_edges(new_devices):
+    """Test if only the clocks reaching their half period switch state."""
+    names = new_devices.names
+    [CL1_ID, CL2_ID] = names.lookup(["Clock1", "Clock2"])
+    new_devices.make_device(CL1_ID, new_devices.CLOCK, 2)
+    new_devices.make_device(CL2_ID, new_devices.CLOCK, 3)
+    clock1 = new_devices.get_device(CL1_ID)
+    clock2 = new_devices.get_device(CL2_ID)
+    clock1.clock_counter = 1
+    clock2.clock_counter = 0
+
+    switched = []
+    for cycle in range(6):
+        switched.append([
+            device.device_id for device in new_devices.update_clock_edges()
+        ])
+    assert switched == [[], [CL1_ID], [], [CL1_ID, CL2_ID], [], [CL1_ID]]
+
+    # The counters count the cycles since each clock last switched state
+    assert clock1.clock_counter == 1
+    assert clock2.clock_counter == 3
+
+
+def test_clock_counter_without_devices():
+    """Test if a device that does not belong to a Devices keeps its counter."""
+    device = Device(1)
+    device.clock_half_period = 3
+    assert device.clock_counter is None
+    device.clock_counter = 2
+    assert device.clock_counter == 2
+
+
+def test_begin_and_end_build(monkeypatch):
+    """Test if cold start-up is simulated once when the build ends."""
+    states = []
+    for repeat in range(2):
+        new_devices = Devices(Names())
+        names = new_devices.names
+        startups = []
+        cold_startup = new_devices.cold_startup
+        monkeypatch.setattr(new_devices, "cold_startup",
+                            lambda seed=None: startups.append(
+                                cold_startup(seed)))
+
+        new_devices.begin_build()
+        for index in range(10):
+            [CL_ID, D_ID] = names.lookup(["Clock{}".format(index),
+                                          "D{}".format(index)])
+            new_devices.make_device(CL_ID, new_devices.CLOCK, 7)
+            new_devices.make_device(D_ID, new_devices.D_TYPE)
+        assert startups == []
+        new_devices.end_build(seed=5)
+        assert len(startups) == 1
+
+        states.append([
+            (device.outputs, device.clock_counter, device.dtype_memory)
+            for device in new_devices.devices_list
+        ])
+
+    # The same seed gives the same cold start-up state
+    assert states[0] == states[1]
@@ -0,0 +1,112 @@
+"""Test the faults module."""
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("wx")
+
+from names import Names  # noqa: E402
+from devices import Devices  # noqa: E402
+from network import Network  # noqa: E402
+from monitors import Monitors  # noqa: E402
+from faults import Fault, FaultSimulator, FaultCampaign  # noqa: E402
+
+
+@pytest.fixture
+def new_simulator():
+    """Return a FaultSimulator for two switches, an AND gate and a NOT gate."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+    monitors = Monitors(new_names, new_devices, new_network)
+
+    [SW1_ID, SW2_ID, AND1_ID, NOT1_ID, I1, I2] = new_names.lookup(
+        ["Sw1", "Sw2", "And1", "Not1", "I1", "I2"])
+    new_devices.make_device(SW1_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(SW2_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(AND1_ID, new_devices.AND, 2)
+    new_devices.make_device(NOT1_ID, new_devices.NOT)
+    new_network.make_connection(SW1_ID, None, AND1_ID, I1)
+    new_network.make_connection(SW2_ID, None, AND1_ID, I2)
+    new_network.make_connection(AND1_ID, None, NOT1_ID, I1)
+    monitors.make_monitor(NOT1_ID, None)
+    return FaultSimulator(new_devices, new_network, monitors, lanes=4)
+
+
+def test_list_faults(new_simulator):
+    """Test if every gate output and input has both stuck-at faults."""
+    devices = new_simulator.devices
+    [AND1_ID, NOT1_ID, I1, I2] = devices.names.lookup(
+        ["And1", "Not1", "I1", "I2"])
+    LOW = devices.LOW
+    HIGH = devices.HIGH
+    assert new_simulator.list_faults() == [
+        Fault(AND1_ID, None, LOW), Fault(AND1_ID, None, HIGH),
+        Fault(AND1_ID, I1, LOW), Fault(AND1_ID, I1, HIGH),
+        Fault(AND1_ID, I2, LOW), Fault(AND1_ID, I2, HIGH),
+        Fault(NOT1_ID, None, LOW), Fault(NOT1_ID, None, HIGH),
+        Fault(NOT1_ID, I1, LOW), Fault(NOT1_ID, I1, HIGH),
+    ]
+
+
+def test_simulate(new_simulator):
+    """Test if the faults that change the monitored signal are detected."""
+    devices = new_simulator.devices
+    [SW1_ID, SW2_ID] = devices.names.lookup(["Sw1", "Sw2"])
+    faults = new_simulator.list_faults()
+
+    # With both switches LOW, only the faults that make the AND gate HIGH
+    # or hold the NOT gate are seen
+    assert new_simulator.simulate(faults, [{}]) == [
+        False, True, False, False, False, False, True, False, False, True,
+    ]
+
+    # Setting one switch HIGH, then the other, detects every fault
+    stimulus = [{}, {SW1_ID: devices.HIGH}, {SW1_ID: devices.LOW,
+                                             SW2_ID: devices.HIGH},
+                {SW1_ID: devices.HIGH}]
+    assert new_simulator.simulate(faults, stimulus) == [True] * 10
+
+    # Faults must be on logic gate ports
+    assert new_simulator.simulate([Fault(SW1_ID, None, devices.LOW)],
+                                  stimulus) is None
+
+
+def test_simulate_oscillating_fault():
+    """Test if a fault that stops the network settling is detected."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+    monitors = Monitors(new_names, new_devices, new_network)
+
+    [SW1_ID, NAND1_ID, I1, I2] = new_names.lookup(["Sw1", "Nand1", "I1",
+                                                   "I2"])
+    new_devices.make_device(SW1_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(NAND1_ID, new_devices.NAND, 2)
+    new_network.make_connection(SW1_ID, None, NAND1_ID, I1)
+    new_network.make_connection(NAND1_ID, None, NAND1_ID, I2)
+    monitors.make_monitor(NAND1_ID, None)
+
+    simulator = FaultSimulator(new_devices, new_network, monitors)
+    faults = [Fault(NAND1_ID, I1, new_devices.HIGH),
+              Fault(NAND1_ID, I2, new_devices.HIGH)]
+    assert simulator.simulate(faults, [{}]) == [True, False]
+
+
+def test_campaign_run():
+    """Test if the campaign simulates every fault in the process pool."""
+    campaign = FaultCampaign(str(Path("test_files/sweep_test1.txt")),
+                             processes=2, lanes=3)
+    assert campaign.parse()
+    devices = campaign.devices
+    [SW1_ID, SW2_ID, SW3_ID] = devices.names.lookup(["SW1", "SW2", "SW3"])
+    stimulus = [{}, {SW3_ID: devices.LOW}, {SW1_ID: devices.HIGH},
+                {SW2_ID: devices.HIGH}]
+
+    detected = campaign.run(stimulus)
+    faults = campaign.simulator.list_faults()
+    assert list(detected) == faults
+    assert list(detected.values()) == campaign.simulator.simulate(
+        faults, stimulus)
+    # Faults that are not on logic gates are rejected before the batches
+    assert campaign.run(stimulus, [Fault(SW1_ID, None, devices.LOW)]) is None
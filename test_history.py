@@ -0,0 +1,112 @@
+"""Test the history module."""
+import random
+
+import pytest
+
+from monitors import Monitors
+from history import History
+from test_compiler import make_counter
+
+
+def run_counter(edits, history_interval=None, checkpoint_limit=64,
+                window=None, run_length=False):
+    """Run the counter and return its monitors and history.
+
+    The edits are (input_device, input, output_device, output) names of
+    connections replaced before the run. If history_interval is given, a
+    history with that interval and checkpoint limit is recorded. The window
+    and run_length are passed to the monitors.
+    """
+    network = make_counter()
+    devices = network.devices
+    names = devices.names
+    monitors = Monitors(names, devices, network, run_length=run_length,
+                        window=window)
+    [SW1_ID, NOR1_ID, D2_ID] = names.lookup(["Sw1", "Nor1", "D2"])
+    monitors.make_monitor(NOR1_ID, None)
+    monitors.make_monitor(D2_ID, devices.Q_ID)
+
+    for edit in edits:
+        network.replace_connection(*[names.query(name) for name in edit])
+    random.seed(1)
+    devices.cold_startup()
+    history = None
+    if history_interval is not None:
+        history = History(network, monitors, history_interval,
+                          checkpoint_limit)
+        history.start()
+
+    for cycle in range(24):
+        if cycle == 10:
+            devices.set_switch(SW1_ID, devices.HIGH)
+        if cycle == 13:
+            devices.set_switch(SW1_ID, devices.LOW)
+        assert network.run(1, monitors).oscillation_cycle is None
+    return monitors, history
+
+
+def get_state(monitors):
+    """Return the outputs and memory of every device and the traces."""
+    return (
+        [
+            (dict(device.outputs), device.dtype_memory)
+            for device in monitors.devices.devices_list
+        ],
+        {key: list(trace)
+         for key, trace in monitors.monitors_dictionary.items()},
+    )
+
+
+@pytest.mark.parametrize("interval, checkpoint_limit", [
+    (1, 64), (5, 64), (64, 64), (1, 3), (2, 4)])
+def test_replace_connection(interval, checkpoint_limit):
+    """Test if replacing a connection gives the results of a new run."""
+    edits = [("D2", "DATA", "D2", "QBAR"), ("Nor1", "I2", "Sw1", None)]
+    monitors, history = run_counter([], interval, checkpoint_limit)
+    assert len(history.checkpoints) <= checkpoint_limit
+    names = monitors.names
+    for edit in edits:
+        assert history.replace_connection(
+            *[names.query(name) for name in edit])
+        assert monitors.network.history is history
+
+    new_monitors, new_history = run_counter(edits)
+    assert get_state(monitors) == get_state(new_monitors)
+
+
+@pytest.mark.parametrize("window, run_length", [
+    (None, False), (None, True), (5, False), (20, False)])
+def test_replace_connection_traces(window, run_length):
+    """Test if the replayed signals are written to every kind of trace."""
+    edit = ("D2", "DATA", "D2", "QBAR")
+    monitors, history = run_counter([], 4, window=window,
+                                    run_length=run_length)
+    assert history.replace_connection(
+        *[monitors.names.query(name) for name in edit])
+
+    new_monitors, new_history = run_counter([edit], window=window,
+                                            run_length=run_length)
+    assert get_state(monitors) == get_state(new_monitors)
+
+
+def test_replace_connection_oscillating():
+    """Test if recording stops when the edited network oscillates."""
+    monitors, history = run_counter([], 4)
+    network = monitors.network
+    names = monitors.names
+    [NOT1_ID, I1] = names.lookup(["Not1", "I1"])
+    # Not1 drives its own input
+    assert not history.replace_connection(NOT1_ID, I1, NOT1_ID, None)
+    assert network.history is None
+    assert network.get_connected_output(NOT1_ID, I1) == (NOT1_ID, None)
+
+
+def test_history_log_limit():
+    """Test if recording stops once the logs are longer than the limit."""
+    monitors, history = run_counter([])
+    network = monitors.network
+    history = History(network, monitors, 4, log_limit=10)
+    history.start()
+    assert network.run(40, monitors).oscillation_cycle is None
+    assert network.history is None
+    assert history.cycles < 40
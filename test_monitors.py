@@ -1,10 +1,14 @@
 """Test the monitors module."""
+import random
+
 import pytest
 
 from names import Names
 from network import Network
 from devices import Devices
 from monitors import Monitors
+from traces import TraceStore
+from test_compiler import make_counter
 
 
 @pytest.fixture
@@ -118,6 +122,71 @@ def test_record_signals(new_monitors):
         (SW1_ID, None): [LOW, HIGH, HIGH],
         (SW2_ID, None): [LOW, LOW, HIGH],
         (OR1_ID, None): [LOW, HIGH, HIGH]}
+    # Repeated signals extend the last run
+    assert list(new_monitors.monitors_dictionary[(OR1_ID, None)].runs()) == [
+        (LOW, 1), (HIGH, 2)]
+
+
+def test_make_recorder(new_monitors):
+    """Test if the recorder records the same signals as record_signals."""
+    names = new_monitors.names
+    devices = new_monitors.devices
+    network = new_monitors.network
+
+    [SW1_ID, SW2_ID, OR1_ID] = names.lookup(["Sw1", "Sw2", "Or1"])
+
+    HIGH = devices.HIGH
+    LOW = devices.LOW
+
+    record = new_monitors.make_recorder()
+    network.execute_network()
+    record()
+    devices.set_switch(SW2_ID, HIGH)
+    network.execute_network()
+    record()
+
+    assert new_monitors.monitors_dictionary == {
+        (SW1_ID, None): [LOW, LOW],
+        (SW2_ID, None): [LOW, HIGH],
+        (OR1_ID, None): [LOW, HIGH]}
+
+
+def test_repeat_signals(new_monitors):
+    """Test if repeat_signals extends the monitors periodically."""
+    names = new_monitors.names
+    devices = new_monitors.devices
+    [SW1_ID, SW2_ID, OR1_ID] = names.lookup(["Sw1", "Sw2", "Or1"])
+
+    HIGH = devices.HIGH
+    LOW = devices.LOW
+    new_monitors.monitors_dictionary[(SW1_ID, None)] = [LOW, LOW, HIGH]
+    new_monitors.monitors_dictionary[(SW2_ID, None)] = [HIGH, LOW, HIGH]
+    new_monitors.monitors_dictionary[(OR1_ID, None)] = [HIGH, HIGH, HIGH]
+
+    new_monitors.repeat_signals(2, 5)
+    assert new_monitors.monitors_dictionary == {
+        (SW1_ID, None): [LOW, LOW, HIGH, LOW, HIGH, LOW, HIGH, LOW],
+        (SW2_ID, None): [HIGH, LOW, HIGH, LOW, HIGH, LOW, HIGH, LOW],
+        (OR1_ID, None): [HIGH, HIGH, HIGH, HIGH, HIGH, HIGH, HIGH, HIGH]}
+
+
+def test_record_repeat(new_monitors):
+    """Test if record_repeat records the current signals many times."""
+    names = new_monitors.names
+    devices = new_monitors.devices
+    network = new_monitors.network
+    [SW1_ID, SW2_ID, OR1_ID] = names.lookup(["Sw1", "Sw2", "Or1"])
+
+    HIGH = devices.HIGH
+    LOW = devices.LOW
+    devices.set_switch(SW2_ID, HIGH)
+    network.execute_network()
+    new_monitors.record_signals()
+    new_monitors.record_repeat(3)
+    assert new_monitors.monitors_dictionary == {
+        (SW1_ID, None): [LOW] * 4,
+        (SW2_ID, None): [HIGH] * 4,
+        (OR1_ID, None): [HIGH] * 4}
 
 
 def test_get_margin(new_monitors):
@@ -197,3 +266,88 @@ def test_display_signals(capsys, new_monitors):
             "Clock1: -__--__--__--__--__-" in traces)
 
     assert "" in traces  # additional empty line at the end
+
+
+def test_monitors_in_trace_store(tmp_path):
+    """Test if monitors record the same signals in a trace store."""
+    recorded = []
+    for trace_store in [None, TraceStore(str(tmp_path / "traces.bin"), 8)]:
+        random.seed(1)
+        network = make_counter()
+        devices = network.devices
+        monitors = Monitors(devices.names, devices, network,
+                            trace_store=trace_store)
+        [SW1_ID, D1_ID, NOR1_ID] = devices.names.lookup(["Sw1", "D1",
+                                                         "Nor1"])
+        monitors.make_monitor(NOR1_ID, None)
+        monitors.make_monitor(SW1_ID, None)
+        devices.cold_startup()
+        network.run(20, monitors, skip_idle=True)
+        assert monitors.remove_monitor(SW1_ID, None)
+        monitors.make_monitor(D1_ID, devices.Q_ID, 20)
+        devices.set_switch(SW1_ID, devices.HIGH)
+        network.run(30, monitors, fast_forward=True)
+        recorded.append(dict(monitors.monitors_dictionary))
+
+    assert recorded[0] == recorded[1]
+    # The removed monitor's column is reused
+    assert recorded[1][(D1_ID, devices.Q_ID)].column == 1
+    trace_store.close()
+    assert TraceStore.open(trace_store.path).get_traces() == {
+        "Nor1": recorded[0][(NOR1_ID, None)],
+        "D1.Q": recorded[0][(D1_ID, devices.Q_ID)],
+    }
+
+
+@pytest.mark.parametrize("window", [1, 3, 10, 100])
+def test_monitors_with_window(window):
+    """Test if windowed monitors keep the last signals of a full run."""
+    recorded = []
+    for monitor_window in [None, window]:
+        random.seed(1)
+        network = make_counter()
+        devices = network.devices
+        monitors = Monitors(devices.names, devices, network)
+        [SW1_ID, D1_ID, NOR1_ID] = devices.names.lookup(["Sw1", "D1",
+                                                         "Nor1"])
+        monitors.make_monitor(NOR1_ID, None, window=monitor_window)
+        devices.cold_startup()
+        network.run(20, monitors, skip_idle=True)
+        monitors.make_monitor(D1_ID, devices.Q_ID, 20, monitor_window)
+        devices.set_switch(SW1_ID, devices.HIGH)
+        network.run(3, monitors)
+        devices.set_switch(SW1_ID, devices.LOW)
+        network.run(50, monitors, fast_forward=True)
+        recorded.append(dict(monitors.monitors_dictionary))
+
+    for key, trace in recorded[0].items():
+        assert recorded[1][key] == trace[-window:]
+        assert recorded[1][key].first_cycle == len(trace) - min(window, 73)
+
+
+@pytest.mark.parametrize("window", [2, 6, 10, 40])
+def test_monitors_with_window_after_transient(window):
+    """Test if windowed monitors drop the signals before a fast-forward.
+
+    The counter counts until Sw1 clears it, so the windows hold cycles
+    from before the network became periodic.
+    """
+    recorded = []
+    for monitor_window in [None, window]:
+        random.seed(1)
+        network = make_counter()
+        devices = network.devices
+        monitors = Monitors(devices.names, devices, network,
+                            window=monitor_window)
+        [SW1_ID, D1_ID, D2_ID] = devices.names.lookup(["Sw1", "D1", "D2"])
+        monitors.make_monitor(D1_ID, devices.Q_ID)
+        monitors.make_monitor(D2_ID, devices.Q_ID)
+        devices.cold_startup()
+        network.run(20, monitors)
+        devices.set_switch(SW1_ID, devices.HIGH)
+        network.run(50, monitors, fast_forward=True)
+        recorded.append(dict(monitors.monitors_dictionary))
+
+    for key, trace in recorded[0].items():
+        assert recorded[1][key] == trace[-window:]
+        assert recorded[1][key].first_cycle == len(trace) - window
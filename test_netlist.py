@@ -0,0 +1,124 @@
+"""Test the netlist module."""
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from netlist import Netlist
+
+
+@pytest.fixture
+def new_network():
+    """Return a Network class instance with a switch, a D-type and gates."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    network = Network(new_names, new_devices)
+
+    [SW1_ID, D1_ID, AND1_ID, NOT1_ID, CL_ID, I1, I2] = new_names.lookup(
+        ["Sw1", "D1", "And1", "Not1", "Clock1", "I1", "I2"])
+    new_devices.make_device(NOT1_ID, new_devices.NOT)
+    new_devices.make_device(AND1_ID, new_devices.AND, 2)
+    new_devices.make_device(D1_ID, new_devices.D_TYPE)
+    new_devices.make_device(SW1_ID, new_devices.SWITCH, 1)
+    new_devices.make_device(CL_ID, new_devices.CLOCK, 1)
+
+    network.make_connection(SW1_ID, None, AND1_ID, I1)
+    network.make_connection(D1_ID, new_devices.Q_ID, AND1_ID, I2)
+    network.make_connection(AND1_ID, None, NOT1_ID, I1)
+    network.make_connection(CL_ID, None, D1_ID, new_devices.CLK_ID)
+    network.make_connection(SW1_ID, None, D1_ID, new_devices.SET_ID)
+    network.make_connection(SW1_ID, None, D1_ID, new_devices.CLEAR_ID)
+    network.make_connection(NOT1_ID, None, D1_ID, new_devices.DATA_ID)
+    return network
+
+
+def test_elaborate(new_network):
+    """Test if nets are numbered in execution order and indexed by kind."""
+    network = new_network
+    devices = network.devices
+    [SW1_ID, D1_ID, AND1_ID, NOT1_ID, CL_ID] = devices.names.lookup(
+        ["Sw1", "D1", "And1", "Not1", "Clock1"])
+
+    netlist = Netlist(devices, network)
+    assert netlist.elaborate()
+
+    # Switches, D-types, clocks, then the gates kind by kind
+    assert netlist.net_outputs == [
+        (SW1_ID, None),
+        (D1_ID, devices.Q_ID),
+        (D1_ID, devices.QBAR_ID),
+        (CL_ID, None),
+        (AND1_ID, None),
+        (NOT1_ID, None),
+    ]
+    assert netlist.get_net(AND1_ID, None) == 4
+    assert netlist.get_net(AND1_ID, devices.Q_ID) is None
+
+    assert list(netlist.switch_nets) == [0]
+    assert list(netlist.clock_nets) == [3]
+    assert list(netlist.dtype_q_nets) == [1]
+    assert list(netlist.dtype_qbar_nets) == [2]
+    assert list(netlist.dtype_clock_inputs) == [3]
+    assert list(netlist.dtype_data_inputs) == [5]
+    assert list(netlist.dtype_set_inputs) == [0]
+    assert list(netlist.dtype_clear_inputs) == [0]
+
+    assert netlist.gate_ids == [AND1_ID, NOT1_ID]
+    assert list(netlist.gate_kinds) == [devices.AND, devices.NOT]
+    assert list(netlist.gate_nets) == [4, 5]
+    assert list(netlist.get_gate_inputs(0)) == [0, 1]
+    assert list(netlist.get_gate_inputs(1)) == [4]
+    assert netlist.gate_indices == {AND1_ID: 0, NOT1_ID: 1}
+
+
+def test_elaborate_unconnected():
+    """Test if networks with unconnected inputs are not elaborated."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    network = Network(new_names, new_devices)
+
+    [AND1] = new_names.lookup(["And1"])
+    new_devices.make_device(AND1, new_devices.AND, 2)
+
+    assert not Netlist(new_devices, network).elaborate()
+    assert network.get_netlist() is None
+
+
+def test_load_and_store(new_network):
+    """Test if signals are copied between the netlist and the devices."""
+    network = new_network
+    devices = network.devices
+    [SW1_ID, NOT1_ID] = devices.names.lookup(["Sw1", "Not1"])
+
+    netlist = network.get_netlist()
+    not_net = netlist.get_net(NOT1_ID, None)
+    assert netlist.signals[not_net] == devices.LOW
+
+    network.execute_network()
+    netlist.load()
+    assert list(netlist.signals) == [
+        network.get_output_signal(device_id, output_id)
+        for device_id, output_id in netlist.net_outputs
+    ]
+
+    netlist.signals[not_net] = devices.HIGH
+    netlist.store()
+    assert network.get_output_signal(NOT1_ID, None) == devices.HIGH
+
+
+def test_get_netlist_rebuilt(new_network):
+    """Test if the network keeps its netlist until the connections change."""
+    network = new_network
+    devices = network.devices
+    netlist = network.get_netlist()
+    assert network.get_netlist() is netlist
+
+    [SW2_ID, NOT1_ID, I1] = devices.names.lookup(["Sw2", "Not1", "I1"])
+    devices.make_device(SW2_ID, devices.SWITCH, 0)
+    network.replace_connection(NOT1_ID, I1, SW2_ID, None)
+
+    new_netlist = network.get_netlist()
+    assert new_netlist is not netlist
+    assert list(new_netlist.get_gate_inputs(1)) == [
+        new_netlist.get_net(SW2_ID, None)
+    ]
@@ -1,9 +1,13 @@
 """Test the network module."""
+import random
+
 import pytest
 
 from names import Names
 from devices import Devices
-from network import Network
+from network import Network, RunStatus
+from monitors import Monitors
+from test_compiler import make_counter
 
 
 @pytest.fixture
@@ -139,6 +143,41 @@ def test_make_connection(network_with_devices):
                           I2: (SW2_ID, None)}
 
 
+def test_fanout_and_fanin(network_with_devices):
+    """Test if the connection indexes follow connections as they change."""
+    network = network_with_devices
+    devices = network.devices
+    names = devices.names
+
+    [SW1_ID, SW2_ID, OR1_ID, I1, I2] = names.lookup(["Sw1", "Sw2", "Or1", "I1",
+                                                     "I2"])
+    connections = network.get_all_connections()
+    assert dict(connections) == {}
+    assert list(network.iter_fanout(SW1_ID, None)) == []
+    assert list(network.iter_fanin(OR1_ID)) == []
+
+    network.make_connection(SW1_ID, None, OR1_ID, I1)
+    network.make_connection(OR1_ID, I2, SW1_ID, None)
+
+    assert list(network.iter_fanout(SW1_ID, None)) == [(OR1_ID, I1),
+                                                       (OR1_ID, I2)]
+    assert list(network.iter_fanin(OR1_ID)) == [(I1, (SW1_ID, None)),
+                                                (I2, (SW1_ID, None))]
+    # The view returned earlier follows the new connections
+    assert dict(connections) == {(OR1_ID, I1): (SW1_ID, None),
+                                 (OR1_ID, I2): (SW1_ID, None)}
+
+    network.replace_connection(OR1_ID, I2, SW2_ID, None)
+
+    assert list(network.iter_fanout(SW1_ID, None)) == [(OR1_ID, I1)]
+    assert list(network.iter_fanout(SW2_ID, None)) == [(OR1_ID, I2)]
+    assert connections[(OR1_ID, I2)] == (SW2_ID, None)
+    assert list(network.iter_fanin(SW1_ID)) == []
+
+    with pytest.raises(TypeError):
+        connections[(OR1_ID, I1)] = (SW2_ID, None)
+
+
 @pytest.mark.parametrize("function_args, error", [
     # I1 is not a valid device id
     ("(I1, I1, OR1_ID, I2)", "network.DEVICE_ABSENT"),
@@ -334,6 +373,43 @@ def test_execute_non_gates(new_network):
                 HIGH, LOW, HIGH, HIGH, LOW, HIGH]
 
 
+def test_register_evaluator(new_network):
+    """Test if devices of a registered kind are executed after the gates."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+
+    [BUFFER, SW1_ID, BUF1_ID, NOT1_ID, I1] = names.lookup(
+        ["BUFFER", "Sw1", "Buf1", "Not1", "I1"])
+
+    def execute_buffer(device_id, input_id):
+        signal = network.get_input_signal(device_id, input_id)
+        updated_signal = network.update_signal(
+            network.get_output_signal(device_id, None), signal)
+        if updated_signal is None:
+            return False
+        devices.get_device(device_id).outputs[None] = updated_signal
+        return True
+
+    devices.make_device(SW1_ID, devices.SWITCH, 0)
+    devices.make_device(NOT1_ID, devices.NOT)
+    devices.add_device(BUF1_ID, BUFFER)
+    devices.add_input(BUF1_ID, I1)
+    devices.add_output(BUF1_ID, None)
+    network.make_connection(SW1_ID, None, NOT1_ID, I1)
+    network.make_connection(NOT1_ID, None, BUF1_ID, I1)
+    network.register_evaluator(BUFFER, execute_buffer, [I1])
+
+    assert network.get_execution_order()[-1].device_id == BUF1_ID
+    assert not network.set_engine(network.COMPILED)
+    assert network.execute_network()
+    assert network.get_output_signal(BUF1_ID, None) == devices.HIGH
+
+    devices.set_switch(SW1_ID, devices.HIGH)
+    assert network.execute_network()
+    assert network.get_output_signal(BUF1_ID, None) == devices.LOW
+
+
 def test_oscillating_network(new_network):
     """Test if the execute_network returns False for oscillating networks."""
     network = new_network
@@ -348,3 +424,447 @@ def test_oscillating_network(new_network):
     network.make_connection(NOR1, None, NOR1, I1)
 
     assert not network.execute_network()
+
+
+def test_run(new_network):
+    """Test if run executes many cycles and records the monitors."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    monitors = Monitors(names, devices, network)
+
+    [CL_ID, NOT1, NOR1, I1] = names.lookup(["Clock1", "Not1", "Nor1", "I1"])
+    devices.make_device(CL_ID, devices.CLOCK, 1)
+    devices.make_device(NOT1, devices.NOT)
+    network.make_connection(CL_ID, None, NOT1, I1)
+    monitors.make_monitor(CL_ID, None)
+    monitors.make_monitor(NOT1, None)
+
+    status = network.run(6, monitors)
+    assert status == RunStatus(6, None, [])
+    assert status.cycles_completed == 6
+    clock_trace = monitors.monitors_dictionary[(CL_ID, None)]
+    not_trace = monitors.monitors_dictionary[(NOT1, None)]
+    # The clock changes every cycle
+    assert len(clock_trace) == 6
+    assert all(clock_trace[cycle] != clock_trace[cycle + 1]
+               for cycle in range(5))
+    assert not_trace == [network.invert_signal(signal)
+                         for signal in clock_trace]
+
+    # Add a NOR gate connected to itself, which oscillates
+    devices.make_device(NOR1, devices.NOR, 1)
+    network.make_connection(NOR1, None, NOR1, I1)
+    status = network.run(6, monitors)
+    assert status == RunStatus(0, 0, [NOR1])
+    assert len(clock_trace) == 6
+
+
+def test_run_fast_forward():
+    """Test if fast-forwarding a periodic network gives the same signals."""
+    traces = []
+    final_states = []
+    for fast_forward in [False, True]:
+        # Start both networks in the same random state
+        random.seed(0)
+        new_names = Names()
+        new_devices = Devices(new_names)
+        network = Network(new_names, new_devices)
+        monitors = Monitors(new_names, new_devices, network)
+
+        [CL1_ID, CL2_ID, XOR1, D1, I1, I2] = new_names.lookup(
+            ["Clock1", "Clock2", "Xor1", "D1", "I1", "I2"])
+        new_devices.make_device(CL1_ID, new_devices.CLOCK, 2)
+        new_devices.make_device(CL2_ID, new_devices.CLOCK, 3)
+        new_devices.make_device(XOR1, new_devices.XOR)
+        new_devices.make_device(D1, new_devices.D_TYPE)
+        network.make_connection(CL1_ID, None, XOR1, I1)
+        network.make_connection(CL2_ID, None, XOR1, I2)
+        network.make_connection(XOR1, None, D1, new_devices.CLK_ID)
+        network.make_connection(D1, new_devices.QBAR_ID, D1,
+                                new_devices.DATA_ID)
+        network.make_connection(CL1_ID, None, D1, new_devices.SET_ID)
+        network.make_connection(CL1_ID, None, D1, new_devices.CLEAR_ID)
+        for device_id, output_id in [(XOR1, None), (D1, new_devices.Q_ID)]:
+            monitors.make_monitor(device_id, output_id)
+
+        assert network.run(1000, monitors, fast_forward) == \
+            RunStatus(1000, None, [])
+        traces.append(dict(monitors.monitors_dictionary))
+        final_states.append([
+            (device.outputs, device.dtype_memory, device.clock_counter)
+            for device in new_devices.devices_list
+        ])
+
+    assert traces[0] == traces[1]
+    assert final_states[0] == final_states[1]
+
+
+def test_run_skip_idle(monkeypatch):
+    """Test if skipping idle cycles gives the same signals."""
+    traces = []
+    final_states = []
+    for skip_idle in [False, True]:
+        random.seed(0)
+        new_names = Names()
+        new_devices = Devices(new_names)
+        network = Network(new_names, new_devices)
+        monitors = Monitors(new_names, new_devices, network)
+
+        [CL1_ID, CL2_ID, XOR1, D1, I1, I2] = new_names.lookup(
+            ["Clock1", "Clock2", "Xor1", "D1", "I1", "I2"])
+        new_devices.make_device(CL1_ID, new_devices.CLOCK, 50)
+        new_devices.make_device(CL2_ID, new_devices.CLOCK, 70)
+        new_devices.make_device(XOR1, new_devices.XOR)
+        new_devices.make_device(D1, new_devices.D_TYPE)
+        network.make_connection(CL1_ID, None, XOR1, I1)
+        network.make_connection(CL2_ID, None, XOR1, I2)
+        network.make_connection(XOR1, None, D1, new_devices.CLK_ID)
+        network.make_connection(D1, new_devices.QBAR_ID, D1,
+                                new_devices.DATA_ID)
+        network.make_connection(CL2_ID, None, D1, new_devices.SET_ID)
+        network.make_connection(CL2_ID, None, D1, new_devices.CLEAR_ID)
+        for device_id, output_id in [(XOR1, None), (D1, new_devices.Q_ID)]:
+            monitors.make_monitor(device_id, output_id)
+
+        # Count the cycles that are executed
+        executed = []
+        update_clocks = network.update_clocks
+
+        def count_cycle():
+            executed.append(None)
+            return update_clocks()
+
+        monkeypatch.setattr(network, "update_clocks", count_cycle)
+
+        assert network.run(1000, monitors, skip_idle=skip_idle) == \
+            RunStatus(1000, None, [])
+        traces.append(dict(monitors.monitors_dictionary))
+        final_states.append([
+            (device.outputs, device.dtype_memory, device.clock_counter)
+            for device in new_devices.devices_list
+        ])
+
+    assert traces[0] == traces[1]
+    assert final_states[0] == final_states[1]
+    # Only the first cycle and the cycles with clock edges are executed
+    assert len(executed) < 40
+
+
+def test_snapshot_and_restore():
+    """Test if restoring a snapshot repeats the same simulation."""
+    network = make_counter()
+    devices = network.devices
+    [SW1_ID] = devices.names.lookup(["Sw1"])
+
+    def get_state():
+        return [
+            (dict(device.outputs), device.dtype_memory, device.clock_counter,
+             device.switch_state)
+            for device in devices.devices_list
+        ]
+
+    for cycle in range(5):
+        assert network.execute_network()
+    snapshot = network.snapshot()
+    assert isinstance(snapshot, bytes)
+    state = get_state()
+    random_number = random.random()
+
+    traces = []
+    for repeat in range(2):
+        assert network.restore(snapshot)
+        assert get_state() == state
+        # The random state used by cold start-up is restored too
+        assert random.random() == random_number
+        devices.set_switch(SW1_ID, devices.HIGH)
+        trace = []
+        for cycle in range(10):
+            assert network.execute_network()
+            trace.append(get_state())
+        traces.append(trace)
+    assert traces[0] == traces[1]
+
+    # Snapshots only fit networks with the same devices
+    assert not Network(Names(), Devices(Names())).restore(snapshot)
+
+
+def test_oscillation_found_on_repeated_state(new_network, monkeypatch):
+    """Test if oscillation is found once the signals repeat."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+
+    [SW1_ID, AND1, NOT1, I1, I2] = names.lookup(["Sw1", "And1", "Not1",
+                                                 "I1", "I2"])
+    devices.make_device(SW1_ID, devices.SWITCH, 1)
+    devices.make_device(AND1, devices.AND, 2)
+    devices.make_device(NOT1, devices.NOT)
+    # Ring oscillator enabled by the switch
+    network.make_connection(SW1_ID, None, AND1, I1)
+    network.make_connection(NOT1, None, AND1, I2)
+    network.make_connection(AND1, None, NOT1, I1)
+
+    executed = []
+    execute_gate = network.execute_gate
+
+    def counting_execute_gate(device_id, *arguments):
+        executed.append(device_id)
+        return execute_gate(device_id, *arguments)
+
+    monkeypatch.setattr(network, "execute_gate", counting_execute_gate)
+    network.get_execution_order()  # build the schedule with the wrapper
+
+    assert not network.execute_network()
+    assert network.oscillating_devices == [AND1, NOT1]
+    # Far fewer executions than the 20 iterations allowed
+    assert len(executed) < 20
+
+    devices.set_switch(SW1_ID, devices.LOW)
+    while not network.execute_network():
+        pass
+    assert network.oscillating_devices == []
+
+
+def test_find_feedback_loops(new_network):
+    """Test if loops of gates not broken by D-types are found."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+
+    [SW1_ID, NAND1, NAND2, NOR1, AND1, D1, I1, I2] = names.lookup(
+        ["Sw1", "Nand1", "Nand2", "Nor1", "And1", "D1", "I1", "I2"])
+    devices.make_device(SW1_ID, devices.SWITCH, 1)
+    devices.make_device(NAND1, devices.NAND, 2)
+    devices.make_device(NAND2, devices.NAND, 2)
+    devices.make_device(NOR1, devices.NOR, 1)
+    devices.make_device(AND1, devices.AND, 1)
+    devices.make_device(D1, devices.D_TYPE)
+
+    # Cross-coupled NAND latch, and a NOR gate connected to itself
+    network.make_connection(SW1_ID, None, NAND1, I1)
+    network.make_connection(SW1_ID, None, NAND2, I1)
+    network.make_connection(NAND2, None, NAND1, I2)
+    network.make_connection(NAND1, None, NAND2, I2)
+    network.make_connection(NOR1, None, NOR1, I1)
+    # A loop through a D-type is not a feedback loop of gates
+    network.make_connection(D1, devices.Q_ID, AND1, I1)
+    network.make_connection(AND1, None, D1, devices.DATA_ID)
+
+    assert network.find_feedback_loops() == [[NAND1, NAND2], [NOR1]]
+
+
+def test_execute_network_skips_idle_devices(new_network):
+    """Test if execute_network only executes devices whose inputs change."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+
+    [SW1_ID, I1] = names.lookup(["Sw1", "I1"])
+    not_ids = names.lookup(["Not1", "Not2", "Not3", "Not4"])
+
+    # Make a switch driving a chain of four NOT gates
+    devices.make_device(SW1_ID, devices.SWITCH, 0)
+    previous_id = SW1_ID
+    for not_id in not_ids:
+        devices.make_device(not_id, devices.NOT)
+        network.make_connection(previous_id, None, not_id, I1)
+        previous_id = not_id
+
+    executed_gates = []
+    execute_gate = network.execute_gate
+
+    def counting_execute_gate(device_id, x=None, y=None):
+        executed_gates.append(device_id)
+        return execute_gate(device_id, x, y)
+
+    network.execute_gate = counting_execute_gate
+
+    assert network.execute_network()
+    assert network.get_output_signal(not_ids[-1], None) == devices.LOW
+
+    # Nothing has changed, so no gates need to be executed
+    executed_gates.clear()
+    assert network.execute_network()
+    assert executed_gates == []
+
+    # Setting the switch propagates down the whole chain in one cycle
+    devices.set_switch(SW1_ID, devices.HIGH)
+    assert network.execute_network()
+    assert set(executed_gates) == set(not_ids)
+    assert [network.get_output_signal(not_id, None)
+            for not_id in not_ids] == [devices.LOW, devices.HIGH,
+                                       devices.LOW, devices.HIGH]
+
+
+def test_execute_network_skips_idle_clocks():
+    """Test if the clocks that do not switch state are not visited."""
+
+    class CountingOutputs(dict):
+        """Count the reads of a device's outputs."""
+
+        reads = 0
+
+        def __getitem__(self, output_id):
+            CountingOutputs.reads += 1
+            return dict.__getitem__(self, output_id)
+
+    for idle_clocks in [10, 1000]:
+        new_names = Names()
+        new_devices = Devices(new_names)
+        network = Network(new_names, new_devices)
+        [CL1_ID, NOT1, I1] = new_names.lookup(["Clock1", "Not1", "I1"])
+        new_devices.make_device(CL1_ID, new_devices.CLOCK, 1)
+        new_devices.make_device(NOT1, new_devices.NOT)
+        network.make_connection(CL1_ID, None, NOT1, I1)
+        for clock_id in new_names.lookup(
+                ["Idle" + str(number) for number in range(idle_clocks)]):
+            new_devices.make_device(clock_id, new_devices.CLOCK, 10 ** 6)
+        assert network.execute_network()
+
+        idle_devices = [new_devices.get_device(device_id) for device_id
+                        in new_devices.find_devices(new_devices.CLOCK)
+                        if device_id != CL1_ID]
+        for device in idle_devices:
+            device.outputs = CountingOutputs(device.outputs)
+        signals = []
+        for cycle in range(20):
+            assert network.execute_network()
+            signals.append(network.get_output_signal(NOT1, None))
+        assert signals == [new_devices.HIGH, new_devices.LOW] * 10 or \
+            signals == [new_devices.LOW, new_devices.HIGH] * 10
+        assert CountingOutputs.reads == 0
+
+
+def test_execute_network_after_cold_startup(new_network):
+    """Test if execute_network picks up the state set by cold_startup."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+
+    [SW1_ID, CL_ID, D_ID] = names.lookup(["Sw1", "Clock1", "D1"])
+    devices.make_device(SW1_ID, devices.SWITCH, 0)
+    devices.make_device(CL_ID, devices.CLOCK, 10)
+    devices.make_device(D_ID, devices.D_TYPE)
+    for input_id in devices.dtype_input_ids:
+        if input_id == devices.CLK_ID:
+            network.make_connection(CL_ID, None, D_ID, input_id)
+        else:
+            network.make_connection(SW1_ID, None, D_ID, input_id)
+
+    for memory in [devices.LOW, devices.HIGH, devices.LOW]:
+        devices.cold_startup()
+        device = devices.get_device(D_ID)
+        device.dtype_memory = memory
+        # Keep the clock away from its rising edge
+        devices.get_device(CL_ID).clock_counter = 0
+        assert network.execute_network()
+        assert network.get_output_signal(D_ID, devices.Q_ID) == memory
+
+
+def test_levelize(new_network):
+    """Test if levelize sorts gates into levels and detects feedback loops."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+
+    [SW1_ID, SW2_ID, AND1_ID, NOT1_ID, NOR1_ID, I1,
+     I2] = names.lookup(["Sw1", "Sw2", "And1", "Not1", "Nor1", "I1", "I2"])
+    devices.make_device(NOT1_ID, devices.NOT)
+    devices.make_device(AND1_ID, devices.AND, 2)
+    devices.make_device(SW1_ID, devices.SWITCH, 0)
+    devices.make_device(SW2_ID, devices.SWITCH, 0)
+
+    network.make_connection(SW1_ID, None, AND1_ID, I1)
+    network.make_connection(SW2_ID, None, AND1_ID, I2)
+    network.make_connection(AND1_ID, None, NOT1_ID, I1)
+
+    assert network.levelize()
+    assert network.levels == [[AND1_ID], [NOT1_ID]]
+
+    # A NOR gate connected to itself cannot be levelized
+    devices.make_device(NOR1_ID, devices.NOR, 1)
+    network.make_connection(NOR1_ID, None, NOR1_ID, I1)
+    assert not network.levelize()
+    assert not network.set_engine(network.LEVELIZED)
+    assert network.engine == network.EVENT_DRIVEN
+
+
+def test_levelized_dtype_inputs():
+    """Test if levelized execution is refused for D-types it cannot execute.
+
+    Levelized execution only gives the same results as the event-driven
+    engine if every D-type is clocked by a clock, and set and cleared by
+    switches.
+    """
+    network = make_counter()
+    devices = network.devices
+    [D1_ID, D2_ID] = devices.names.lookup(["D1", "D2"])
+    assert network.set_engine(network.LEVELIZED)
+
+    # D2 is clocked by D1
+    network.replace_connection(D2_ID, devices.CLK_ID, D1_ID, devices.Q_ID)
+    assert network.set_engine(network.EVENT_DRIVEN)
+    assert not network.set_engine(network.LEVELIZED)
+    assert network.engine == network.EVENT_DRIVEN
+
+    # D1 is cleared by D2
+    network = make_counter()
+    devices = network.devices
+    [D1_ID, D2_ID] = devices.names.lookup(["D1", "D2"])
+    assert network.set_engine(network.LEVELIZED)
+    network.replace_connection(D1_ID, devices.CLEAR_ID, D2_ID, devices.Q_ID)
+    # The engine falls back to event-driven execution, and says so
+    assert network._get_cycle_function() == network._execute_event_driven
+    assert network.engine == network.EVENT_DRIVEN
+
+
+def test_levelized_dtype_check_cached(monkeypatch):
+    """Test if the D-types are only checked when the network is levelized."""
+    network = make_counter()
+    assert network.set_engine(network.LEVELIZED)
+    assert network.dtypes_levelizable
+
+    def fail_check():
+        raise AssertionError("the D-types are checked again")
+
+    monkeypatch.setattr(network, "_check_dtype_inputs", fail_check)
+    for cycle in range(5):
+        network.execute_network()
+    assert network.engine == network.LEVELIZED
+
+
+def test_execute_levelized_deep_chain(new_network):
+    """Test if levelized execution settles chains deeper than 20 gates."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+
+    [SW1_ID, I1] = names.lookup(["Sw1", "I1"])
+    not_ids = names.lookup(["Not" + str(i) for i in range(1, 31)])
+
+    # Make the gates from the end of the chain, so that each gate is
+    # executed before the gate driving it
+    devices.make_device(SW1_ID, devices.SWITCH, 0)
+    for not_id in reversed(not_ids):
+        devices.make_device(not_id, devices.NOT)
+    previous_id = SW1_ID
+    for not_id in not_ids:
+        network.make_connection(previous_id, None, not_id, I1)
+        previous_id = not_id
+
+    while not network.execute_network():
+        pass  # let the chain settle over several cycles
+
+    # Each gate in the chain takes an iteration to see its input change
+    devices.set_switch(SW1_ID, devices.HIGH)
+    assert not network.execute_network()
+
+    assert network.set_engine(network.LEVELIZED)
+    assert len(network.levels) == 30
+    assert network.execute_network()
+    devices.set_switch(SW1_ID, devices.LOW)
+    assert network.execute_network()
+    for i, not_id in enumerate(not_ids):
+        expected_signal = devices.HIGH if i % 2 == 0 else devices.LOW
+        assert network.get_output_signal(not_id, None) == expected_signal
@@ -458,3 +458,11 @@ def test_parser_incorrect_section_ordering(capfd):
         + "      ^\n"
         + "incorrect ordering of sections"
     )
+
+
+def test_parser_feedback_loop_warning(capfd):
+    """Parser test for a warning about a feedback loop of gates."""
+    parser = dummy_parser(str(Path("test_files/parser_test31.txt")))
+    assert parser.parse_network() is True
+    out, _ = capfd.readouterr()
+    assert out == "Warning: feedback loop without a D-type: NAND1, NAND2\n\n"
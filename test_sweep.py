@@ -0,0 +1,61 @@
+"""Test the sweep module."""
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("wx")
+
+from sweep import Sweep  # noqa: E402
+
+
+@pytest.fixture
+def new_sweep():
+    """Return a parsed Sweep instance for a circuit of three switches."""
+    sweep = Sweep(str(Path("test_files/sweep_test1.txt")), 3, processes=2)
+    assert sweep.parse()
+    return sweep
+
+
+def test_enumerate_configurations(new_sweep):
+    """Test if every configuration of the switches is listed."""
+    assert new_sweep.get_switch_names() == ["SW1", "SW2", "SW3"]
+    assert new_sweep.enumerate_configurations(["SW1", "SW2"]) == [
+        {"SW1": 0, "SW2": 0},
+        {"SW1": 0, "SW2": 1},
+        {"SW1": 1, "SW2": 0},
+        {"SW1": 1, "SW2": 1},
+    ]
+    assert len(new_sweep.enumerate_configurations()) == 8
+
+
+def test_sample_configurations(new_sweep):
+    """Test if random configurations are repeatable with a seed."""
+    samples = new_sweep.sample_configurations(5, seed=1)
+    assert len(samples) == 5
+    assert all(set(sample) == {"SW1", "SW2", "SW3"} for sample in samples)
+    assert samples == new_sweep.sample_configurations(5, seed=1)
+
+
+def test_run(new_sweep):
+    """Test if every configuration is run in the process pool."""
+    configurations = new_sweep.enumerate_configurations(["SW1", "SW2"])
+    results = new_sweep.run(configurations)
+
+    assert [result.configuration for result in results] == configurations
+    for result in results:
+        assert result.status.cycles_completed == 3
+        assert result.status.oscillation_cycle is None
+        and_level = result.configuration["SW1"] & result.configuration["SW2"]
+        assert result.traces["AND1"] == [and_level] * 3
+        # SW3 keeps the level given in the file
+        assert result.traces["OR1"] == [1] * 3
+
+    # A configuration run in this process gives the same result
+    assert new_sweep.run_configuration(configurations[3]) == results[3]
+
+
+def test_run_unknown_switch(new_sweep):
+    """Test if configurations of unknown switches are rejected."""
+    assert new_sweep.run([{"SW4": 1}]) is None
+    assert new_sweep.run([{"AND1": 1}]) is None
+    assert new_sweep.run([]) == []
@@ -0,0 +1,162 @@
+"""Test the traces module."""
+import pytest
+
+from traces import Trace, RunTrace, TraceStore, RingTrace
+
+
+def test_trace_compares_with_lists():
+    """Test if a trace compares equal to a list of the same signals."""
+    trace = Trace([0, 1, 4])
+    assert trace == [0, 1, 4]
+    assert trace == Trace([0, 1, 4])
+    assert trace != [0, 1]
+    assert trace != [0, 1, 2]
+    assert trace.tolist() == [0, 1, 4]
+    assert repr(trace) == "Trace([0, 1, 4])"
+
+
+def test_trace_acts_as_list():
+    """Test if a trace can be extended, indexed and sliced like a list."""
+    trace = Trace()
+    trace.append(1)
+    trace.extend([0, 2])
+    trace[1] = 3
+    assert len(trace) == 3
+    assert trace[-1] == 2
+    assert list(trace[-2:]) == [3, 2]
+    assert list(trace) == [1, 3, 2]
+
+
+def test_run_trace_merges_runs():
+    """Test if appending the last signal extends the last run."""
+    trace = RunTrace()
+    for signal in [0, 0, 0, 1, 1, 0]:
+        trace.append(signal)
+    trace.append_run(0, 1000)
+    assert list(trace.runs()) == [(0, 3), (1, 2), (0, 1001)]
+    assert len(trace) == 1006
+    assert trace == RunTrace([0, 0, 0, 1, 1] + [0] * 1001)
+    assert trace == Trace([0, 0, 0, 1, 1] + [0] * 1001)
+    assert list(Trace([0, 0, 0, 1, 1, 0]).runs()) == [(0, 3), (1, 2), (0, 1)]
+
+    # Repeating a trace keeps its runs once
+    repeated = RunTrace([0, 0, 1]) * 10 ** 9
+    assert len(repeated) == 3 * 10 ** 9 and repeated.repeats == [
+        (3, 3, 10 ** 9 - 1)]
+    assert list(repeated.runs(2, 6)) == [(1, 1), (0, 2), (1, 1)]
+
+
+def test_run_trace_random_access():
+    """Test if a run trace is indexed, sliced and edited like a list."""
+    signals = [4, 4, 0, 0, 0, 1, 0, 1, 1]
+    trace = RunTrace(signals)
+    assert [trace[cycle] for cycle in range(-9, 9)] == signals + signals
+    with pytest.raises(IndexError):
+        trace[9]
+    assert trace[3:8] == signals[3:8]
+    assert trace[::2] == signals[::2]
+    assert trace[-4:] * 3 == signals[-4:] * 3
+
+    # Setting a signal splits its run, or merges it with its neighbours
+    trace[3] = 1
+    trace[6] = 1
+    signals[3] = signals[6] = 1
+    assert trace == signals
+    assert list(trace.runs()) == [(4, 2), (0, 1), (1, 1), (0, 1), (1, 4)]
+
+
+def test_trace_truncate(tmp_path):
+    """Test if truncating a trace keeps the signals of the first cycles."""
+    store = TraceStore(str(tmp_path / "traces.bin"), 4)
+    signals = [4, 4, 0, 0, 0, 1, 0, 1, 1]
+    for length in [12, 9, 7, 5, 3, 0]:
+        mapped_trace = store.add_trace("Sw1")
+        for trace in [Trace(), RunTrace(), RingTrace(20), mapped_trace]:
+            trace.extend(signals)
+            trace.truncate(length)
+            assert trace == signals[:length]
+            trace.append_run(0, 2)
+            assert trace == signals[:length] + [0, 0]
+        store.remove_trace(mapped_trace)
+    store.close()
+
+
+@pytest.mark.parametrize("trace_type", [Trace, RunTrace])
+def test_repeat_signals_are_not_stored(trace_type):
+    """Test if repeated cycles are read like recorded ones, but not stored."""
+    trace = trace_type([1, 0, 4, 0, 1])
+    trace.repeat_signals(2, 10 ** 9 + 1)
+    assert len(trace) == 10 ** 9 + 6
+    assert trace.repeats == [(5, 2, 5 * 10 ** 8)]
+    assert trace[-1] == 0 and trace[10 ** 8] == 1 and trace[10 ** 8 + 1] == 0
+    assert list(trace.runs(3, 9)) == [(0, 1), (1, 1), (0, 1), (1, 1),
+                                      (0, 1), (1, 1)]
+    assert trace[4:9] == [1, 0, 1, 0, 1]
+
+    # Cycles recorded after a repeat follow it, and can be repeated again
+    trace.append_run(4, 3)
+    trace.repeat_signals(3, 6)
+    assert list(trace.runs(len(trace) - 10)) == [(0, 1), (4, 9)]
+    trace.truncate(10)
+    assert trace == [1, 0, 4, 0, 1, 0, 1, 0, 1, 0]
+    trace[5] = 4
+    assert trace == [1, 0, 4, 0, 1, 4, 1, 0, 1, 0] and trace.repeats == []
+
+
+def test_trace_store_reopens(tmp_path):
+    """Test if traces in a store grow, and can be opened by a new store."""
+    path = str(tmp_path / "traces.bin")
+    store = TraceStore(path, capacity=4)
+    first = store.add_trace("Sw1")
+    second = store.add_trace("D1.QBAR")
+    third = store.add_trace("Clock1")
+    first.extend([0, 1, 1])
+    second.append_run(4, 2)
+    third.append(1)
+    assert store.remove_trace(third)
+    # The columns are moved when the capacity is doubled twice
+    first.append_run(0, 10)
+    second.extend(Trace([0, 1, 0]))
+    assert store.capacity == 16
+    assert first == [0, 1, 1] + [0] * 10
+    assert second == [4, 4, 0, 1, 0]
+    assert list(first.runs(2, 5)) == [(1, 1), (0, 2)]
+    assert first[-1] == 0 and first[1:3] == [1, 1]
+    store.close()
+
+    store = TraceStore.open(path)
+    assert list(store.get_traces()) == ["Sw1", "D1.QBAR"]
+    assert store.get_traces()["D1.QBAR"] == [4, 4, 0, 1, 0]
+    # The free column is given to the next trace
+    assert store.add_trace("Not1").column == 2
+    store.close()
+
+    with open(path, "wb") as file:
+        file.write(b"not a trace store" * 10)
+    assert TraceStore.open(path) is None
+
+
+def test_ring_trace_keeps_recent_cycles():
+    """Test if a ring trace only keeps the signals of its window."""
+    trace = RingTrace(4, [0, 1])
+    assert trace == [0, 1] and trace.first_cycle == 0
+    trace.extend([4, 4, 1])
+    assert trace == [1, 4, 4, 1] and trace.first_cycle == 1
+    trace.append(0)
+    trace[0] = 0
+    assert trace == [0, 4, 1, 0]
+    assert list(trace.runs(1, 4)) == [(4, 1), (1, 1), (0, 1)]
+    trace.append_run(1, 1000)
+    assert trace == [1, 1, 1, 1] and trace.first_cycle == 1002
+
+    # The signals before the last period are not repeated
+    trace = RingTrace(6, [1, 1, 1, 0, 0, 0])
+    trace.repeat_signals(1, 6)
+    assert trace == [0] * 6 and trace.first_cycle == 6
+    trace = RingTrace(3, [0, 1, 1, 0, 1])
+    trace.repeat_signals(2, 10)
+    assert trace == [1, 0, 1] and trace.first_cycle == 12
+    trace.repeat_signals(2, 5)
+    assert trace == [0, 1, 0] and trace.first_cycle == 17
+    trace.clear()
+    assert trace == [] and trace.first_cycle == 0
@@ -0,0 +1,106 @@
+"""Test the truthtable module."""
+import io
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from truthtable import TruthTable
+
+
+@pytest.fixture
+def new_monitors():
+    """Return a Monitors class instance monitoring a gate and a D-type.
+
+    Three switches drive an AND gate and a XOR gate, and the last switch
+    sets a D-type whose clock never rises.
+    """
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+    monitors = Monitors(new_names, new_devices, new_network)
+
+    [SW1_ID, SW2_ID, SW3_ID, AND1_ID, XOR1_ID, D1_ID, I1,
+     I2] = new_names.lookup(["Sw1", "Sw2", "Sw3", "And1", "Xor1", "D1",
+                             "I1", "I2"])
+    new_devices.make_device(SW1_ID, new_devices.SWITCH, 1)
+    new_devices.make_device(SW2_ID, new_devices.SWITCH, 1)
+    new_devices.make_device(SW3_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(AND1_ID, new_devices.AND, 2)
+    new_devices.make_device(XOR1_ID, new_devices.XOR)
+    new_devices.make_device(D1_ID, new_devices.D_TYPE)
+    new_devices.get_device(D1_ID).dtype_memory = new_devices.LOW
+
+    new_network.make_connection(SW1_ID, None, AND1_ID, I1)
+    new_network.make_connection(SW2_ID, None, AND1_ID, I2)
+    new_network.make_connection(AND1_ID, None, XOR1_ID, I1)
+    new_network.make_connection(SW3_ID, None, XOR1_ID, I2)
+    new_network.make_connection(SW3_ID, None, D1_ID, new_devices.SET_ID)
+    new_network.make_connection(SW3_ID, None, D1_ID, new_devices.DATA_ID)
+    for input_id in [new_devices.CLK_ID, new_devices.CLEAR_ID]:
+        new_network.make_connection(AND1_ID, None, D1_ID, input_id)
+    new_network.execute_network()
+
+    monitors.make_monitor(XOR1_ID, None)
+    monitors.make_monitor(D1_ID, new_devices.Q_ID)
+    return monitors
+
+
+@pytest.mark.parametrize("lanes", [1, 2, 64])
+def test_write_csv(new_monitors, lanes):
+    """Test if every switch setting is written with its settled outputs."""
+    monitors = new_monitors
+    truth_table = TruthTable(monitors.devices, monitors.network, monitors,
+                             lanes=lanes)
+    assert truth_table.get_header() == ["Sw1", "Sw2", "Sw3", "Xor1", "D1.Q"]
+
+    table_file = io.StringIO()
+    assert truth_table.write_csv(table_file)
+    assert table_file.getvalue().splitlines() == [
+        "Sw1,Sw2,Sw3,Xor1,D1.Q",
+        "0,0,0,0,0",
+        "0,0,1,1,1",
+        "0,1,0,0,0",
+        "0,1,1,1,1",
+        "1,0,0,0,0",
+        "1,0,1,1,1",
+        "1,1,0,1,0",
+        "1,1,1,0,0",
+    ]
+
+    # The devices keep the switch levels and state they had
+    devices = monitors.devices
+    [SW3_ID, D1_ID] = devices.names.lookup(["Sw3", "D1"])
+    assert devices.get_device(SW3_ID).switch_state == devices.LOW
+    assert devices.get_device(D1_ID).dtype_memory == devices.LOW
+
+
+def test_write_binary(new_monitors):
+    """Test if the monitors of every row are packed into bytes."""
+    monitors = new_monitors
+    truth_table = TruthTable(monitors.devices, monitors.network, monitors,
+                             lanes=4)
+
+    table_file = io.BytesIO()
+    assert truth_table.write_binary(table_file)
+    assert list(table_file.getvalue()) == [0, 3, 0, 3, 0, 3, 1, 0]
+
+
+def test_write_oscillating_network():
+    """Test if no table is written when the signals do not settle."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+    monitors = Monitors(new_names, new_devices, new_network)
+
+    [SW1_ID, NAND1_ID, I1, I2] = new_names.lookup(["Sw1", "Nand1", "I1",
+                                                   "I2"])
+    new_devices.make_device(SW1_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(NAND1_ID, new_devices.NAND, 2)
+    new_network.make_connection(SW1_ID, None, NAND1_ID, I1)
+    new_network.make_connection(NAND1_ID, None, NAND1_ID, I2)
+
+    truth_table = TruthTable(new_devices, new_network, monitors)
+    assert not truth_table.write_csv(io.StringIO())
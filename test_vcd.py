@@ -0,0 +1,83 @@
+"""Test the vcd module."""
+import io
+import random
+
+import pytest
+
+from monitors import Monitors
+from vcd import VcdWriter
+from test_compiler import make_counter
+
+
+def read_vcd(text):
+    """Return the {signal_name: [signal_list]} dictionary of a VCD file."""
+    names = {}
+    values = {}
+    traces = {}
+    cycle = None
+    for line in text.splitlines():
+        words = line.split()
+        if words[0] == "$var":
+            names[words[3]] = words[4]
+            traces[words[4]] = []
+        elif line.startswith("#"):
+            new_cycle = int(line[1:])
+            if cycle is not None:
+                for identifier, name in names.items():
+                    traces[name].extend([values[identifier]]
+                                        * (new_cycle - cycle))
+            cycle = new_cycle
+        elif line[0] in "01x":
+            values[line[1:]] = {"0": 0, "1": 1, "x": 4}[line[0]]
+    return traces
+
+
+def run_counter(fast_forward, skip_idle, file=None):
+    """Run the counter and return its monitors, or write them to file."""
+    random.seed(1)
+    network = make_counter()
+    devices = network.devices
+    monitors = Monitors(devices.names, devices, network)
+    for device_id in devices.find_devices():
+        for output_id in devices.get_device(device_id).outputs:
+            monitors.make_monitor(device_id, output_id)
+    devices.cold_startup()
+    recorder = monitors
+    if file is not None:
+        recorder = VcdWriter(devices, network, monitors, file)
+    network.run(50, recorder, fast_forward, skip_idle)
+    SW1_ID = devices.names.query("Sw1")
+    devices.set_switch(SW1_ID, devices.HIGH)
+    network.run(3, recorder)
+    if file is not None:
+        recorder.close()
+    return monitors
+
+
+@pytest.mark.parametrize("fast_forward, skip_idle", [
+    (False, False), (True, False), (False, True), (True, True)])
+def test_vcd_matches_monitors(fast_forward, skip_idle):
+    """Test if the VCD file holds the same signals as the monitors."""
+    monitors = run_counter(False, False)
+    file = io.StringIO()
+    run_counter(fast_forward, skip_idle, file)
+
+    expected = {
+        monitors.devices.get_signal_name(device_id, output_id): trace
+        for (device_id, output_id), trace
+        in monitors.monitors_dictionary.items()
+    }
+    assert read_vcd(file.getvalue()) == expected
+
+
+def test_vcd_writes_changes_only():
+    """Test if cycles in which no signal changes are not written."""
+    file = io.StringIO()
+    run_counter(False, True, file)
+    text = file.getvalue()
+    assert "$var wire 1 ! Sw1 $end" in text
+    assert "#0\n$dumpvars\n" in text
+    # The clock has a half period of two cycles, so the signals change in
+    # at most every other cycle
+    assert text.count("\n#") < 30
+    assert text.endswith("\n#53\n")
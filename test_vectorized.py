@@ -0,0 +1,93 @@
+"""Test the vectorized module."""
+import random
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from vectorized import VectorizedNetwork
+from test_compiler import make_counter, run_and_record
+
+pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_vectorized_matches_event_driven(seed):
+    """Test if the vectorized engine gives the same signals as the default."""
+    random.seed(seed)
+    event_network = make_counter()
+    random.seed(seed)
+    vectorized_network = make_counter()
+    assert vectorized_network.set_engine(vectorized_network.VECTORIZED)
+
+    assert run_and_record(vectorized_network, 30) == \
+        run_and_record(event_network, 30)
+
+
+def test_gates_in_waves():
+    """Test if gates see the gates before them in the same iteration.
+
+    And2 comes after And1, which it drives, and before And3, which drives
+    it, so And1 and And2 are in different waves.
+    """
+    traces = []
+    for vectorize in [False, True]:
+        new_names = Names()
+        new_devices = Devices(new_names)
+        new_network = Network(new_names, new_devices)
+        [SW1, AND1, AND2, AND3, I1, I2] = new_names.lookup(
+            ["Sw1", "And1", "And2", "And3", "I1", "I2"])
+        new_devices.make_device(SW1, new_devices.SWITCH, 1)
+        for device_id in [AND1, AND2, AND3]:
+            new_devices.make_device(device_id, new_devices.AND, 2)
+        for input_id in [I1, I2]:
+            new_network.make_connection(SW1, None, AND1, input_id)
+            new_network.make_connection(SW1, None, AND3, input_id)
+        new_network.make_connection(AND1, None, AND2, I1)
+        new_network.make_connection(AND3, None, AND2, I2)
+        if vectorize:
+            assert new_network.set_engine(new_network.VECTORIZED)
+
+        trace = []
+        for cycle in range(3):
+            assert new_network.execute_network()
+            trace.append([dict(device.outputs)
+                          for device in new_devices.devices_list])
+        traces.append(trace)
+
+    assert traces[0] == traces[1]
+    # The AND gates follow the D-types and clocks
+    device_kind, old_nets, waves = new_network.vectorized_network.kinds[2]
+    assert device_kind == new_devices.AND
+    assert len(waves) == 2
+
+
+def test_vectorized_oscillating_network():
+    """Test if the vectorized engine detects oscillating networks."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+
+    [NOR1, I1] = new_names.lookup(["Nor1", "I1"])
+    new_devices.make_device(NOR1, new_devices.NOR, 1)
+    new_network.make_connection(NOR1, None, NOR1, I1)
+
+    assert new_network.set_engine(new_network.VECTORIZED)
+    assert not new_network.execute_network()
+
+
+def test_build_unconnected():
+    """Test if networks with unconnected inputs are not vectorized."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+
+    [AND1, SW1, I1] = new_names.lookup(["And1", "Sw1", "I1"])
+    new_devices.make_device(AND1, new_devices.AND, 2)
+    new_devices.make_device(SW1, new_devices.SWITCH, 1)
+    new_network.make_connection(SW1, None, AND1, I1)
+
+    assert not VectorizedNetwork(new_devices, new_network).build()
+    assert not new_network.set_engine(new_network.VECTORIZED)
+    assert new_network.engine == new_network.EVENT_DRIVEN
@@ -0,0 +1,1235 @@
+"""Store the signal traces recorded by the monitors.
+
+Used in the Logic Simulator project to keep long signal traces compact. A
+trace stores one byte per simulation cycle instead of one list entry, which
+is a pointer to an int object. A run-length-encoded trace stores one entry
+per run of cycles at the same signal level, so long flat regions cost
+nothing. Traces can also be kept in a memory-mapped file, or be limited to
+the most recent cycles.
+
+Classes
+-------
+Trace - stores the signal levels of one monitor, one byte per cycle.
+RunTrace - stores the signal levels of one monitor as runs of equal levels.
+MappedTrace - stores the signal levels of one monitor in a TraceStore.
+TraceStore - stores signal traces in the columns of a memory-mapped file.
+RingTrace - stores the signal levels of the most recent cycles.
+"""
+import bisect
+import itertools
+import mmap
+import os
+import re
+import struct
+from array import array
+
+# run_pattern matches a run of equal bytes
+run_pattern = re.compile(rb"(.)\1*", re.DOTALL)
+
+
+def _find_runs(buffer, start, stop):
+    """Return an iterator over the (signal, length) runs in the buffer.
+
+    The runs are searched for in the bytes from position start to stop, so
+    a window of a long buffer can be read without copying it.
+    """
+    return (
+        (match.group(1)[0], match.end() - match.start())
+        for match in run_pattern.finditer(buffer, start, stop)
+    )
+
+
+def _has_repeats(signals):
+    """Return True if the signals are a trace holding repeated cycles.
+
+    The repeated cycles are not in the buffer of such a trace, so they must
+    be read as runs.
+    """
+    return isinstance(signals, _RepeatedCycles) and bool(signals.repeats)
+
+
+class _RepeatedCycles:
+    """Let a trace repeat its last cycles without storing them again.
+
+    The cycles skipped by a fast-forwarded run repeat the last period cycles
+    recorded. Instead of being stored, they are kept as repeats: (position,
+    period, count) entries, each meaning that the period stored cycles
+    before the stored cycle at position are repeated count more times at
+    that point. The repeats are only expanded when their cycles are read,
+    so a fast-forward costs the same however many cycles it skips.
+
+    The classes using this store the recorded cycles, and give access to
+    them through the non-public methods below. The trace cycles, which
+    include the repeats, are read through the public methods.
+
+    Public methods
+    --------------
+    repeat_signals(self, period, cycles): Appends the given number of cycles
+                                          that repeat the last period
+                                          signals.
+
+    runs(self, start=0, stop=None): Returns an iterator over the (signal,
+                                    length) runs of equal signals from
+                                    cycle start to stop.
+
+    tolist(self): Returns the signal levels as a list.
+
+    truncate(self, length): Removes the signals after the first length
+                            cycles.
+
+    Non-public methods
+    ------------------
+    _get_pieces(self, start, stop): Returns the pieces of the stored cycles
+                                    that make up the cycles from start to
+                                    stop.
+
+    _expand_repeats(self): Stores the repeated cycles.
+
+    _get_stored_length(self): Returns the number of stored cycles.
+
+    _get_stored_signal(self, index): Returns the signal of a stored cycle.
+
+    _set_stored_signal(self, index, signal): Sets the signal of a stored
+                                             cycle.
+
+    _get_stored_runs(self, start, stop): Returns an iterator over the runs
+                                         of the stored cycles from start to
+                                         stop.
+
+    _truncate_stored(self, length): Removes the stored cycles after the
+                                    first length.
+    """
+
+    def __len__(self):
+        """Return the number of cycles in the trace."""
+        return self._get_stored_length() + sum(
+            period * count for position, period, count in self.repeats
+        )
+
+    def __iter__(self):
+        """Return an iterator over the signals, one per cycle."""
+        return itertools.chain.from_iterable(
+            itertools.repeat(signal, length)
+            for signal, length in self.runs()
+        )
+
+    def __getitem__(self, index):
+        """Return the signal at the cycle, or a trace for a slice."""
+        length = len(self)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(length)
+            if step != 1:
+                return self.__class__(
+                    [self[cycle] for cycle in range(start, stop, step)]
+                )
+            new_trace = self.__class__()
+            for signal, run_length in self.runs(start, stop):
+                new_trace.append_run(signal, run_length)
+            return new_trace
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("trace index out of range")
+        if not self.repeats:
+            return self._get_stored_signal(index)
+        stored_start, stored_stop, count = next(
+            self._get_pieces(index, index + 1))
+        return self._get_stored_signal(stored_start)
+
+    def __setitem__(self, index, signal):
+        """Set the signal at the cycle.
+
+        Setting a signal stores the repeated cycles first.
+        """
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("trace index out of range")
+        self._expand_repeats()
+        self._set_stored_signal(index, signal)
+
+    def _get_pieces(self, start, stop):
+        """Return the pieces of stored cycles making up cycles start to stop.
+
+        Each piece is (stored_start, stored_stop, count): the stored cycles
+        from stored_start to stored_stop, repeated count times.
+        """
+        cycle = 0  # first cycle of the next stored cycles
+        stored_cycle = 0  # first of the next stored cycles
+        for position, period, count in self.repeats + [
+            (self._get_stored_length(), 1, 0)
+        ]:
+            # The stored cycles up to position, then the repeats
+            end = cycle + position - stored_cycle
+            if start < end and cycle < stop:
+                yield (stored_cycle + max(start - cycle, 0),
+                       stored_cycle + min(stop, end) - cycle, 1)
+            cycle = end
+            end = cycle + period * count
+            if start < end and cycle < stop:
+                first = max(start, cycle) - cycle
+                last = min(stop, end) - cycle
+                pattern = position - period
+                if first % period:
+                    # The end of a pattern
+                    piece_stop = min(last, first - first % period + period)
+                    yield (pattern + first % period,
+                           pattern + piece_stop - first // period * period,
+                           1)
+                    first = piece_stop
+                if last - first >= period:
+                    yield (pattern, position, (last - first) // period)
+                    first += (last - first) // period * period
+                if first < last:
+                    # The start of a pattern
+                    yield (pattern, pattern + last - first, 1)
+            cycle = end
+            stored_cycle = position
+
+    def _expand_repeats(self):
+        """Store the repeated cycles, so that every cycle is stored."""
+        if not self.repeats:
+            return
+        runs = list(self.runs())
+        self.repeats = []
+        self._truncate_stored(0)
+        for signal, length in runs:
+            self.append_run(signal, length)
+
+    def repeat_signals(self, period, cycles):
+        """Append the given number of cycles that repeat the last period.
+
+        Whole periods are kept as a repeat of the stored cycles. If the last
+        period cycles are not all stored since the last repeat, one period
+        is stored first.
+        """
+        length = len(self)
+        if cycles <= 0 or length == 0:
+            return
+        period = min(period, length)
+        repeats, remainder = divmod(cycles, period)
+        remainder_runs = list(self.runs(length - period,
+                                        length - period + remainder))
+        stored_length = self._get_stored_length()
+        last_position = self.repeats[-1][0] if self.repeats else 0
+        if repeats and stored_length - last_position < period:
+            for signal, run_length in list(self.runs(length - period,
+                                                     length)):
+                self.append_run(signal, run_length)
+            repeats -= 1
+            stored_length = self._get_stored_length()
+        if repeats:
+            if self.repeats and self.repeats[-1][:2] == (
+                stored_length, period
+            ):
+                repeats += self.repeats.pop()[2]
+            self.repeats.append((stored_length, period, repeats))
+        for signal, run_length in remainder_runs:
+            self.append_run(signal, run_length)
+
+    def runs(self, start=0, stop=None):
+        """Return an iterator over the (signal, length) runs of the trace.
+
+        Only the runs from cycle start to stop are returned, cut to fit.
+        Neighbouring runs with the same signal are merged.
+        """
+        if stop is None or stop > len(self):
+            stop = len(self)
+        start = max(start, 0)
+        if not self.repeats:
+            return self._get_stored_runs(start, stop)
+        return self._merge_runs(start, stop)
+
+    def _merge_runs(self, start, stop):
+        """Return an iterator over the merged runs from start to stop."""
+        signal = None
+        length = 0
+        for stored_start, stored_stop, count in self._get_pieces(start,
+                                                                 stop):
+            piece_runs = list(self._get_stored_runs(stored_start,
+                                                    stored_stop))
+            if len(piece_runs) == 1:
+                # A flat piece repeats as a single run
+                piece_runs = [(piece_runs[0][0], piece_runs[0][1] * count)]
+                count = 1
+            for repeat in range(count):
+                for run_signal, run_length in piece_runs:
+                    if run_signal == signal:
+                        length += run_length
+                        continue
+                    if length:
+                        yield signal, length
+                    signal = run_signal
+                    length = run_length
+        if length:
+            yield signal, length
+
+    def tolist(self):
+        """Return the signal levels as a list."""
+        return list(self)
+
+    def truncate(self, length):
+        """Remove the signals after the first length cycles.
+
+        A repeat holding the last cycle kept is cut to its whole periods,
+        and the rest of that cycle's period is stored.
+        """
+        length = max(length, 0)
+        if length >= len(self):
+            return
+        cycle = 0
+        stored_cycle = 0
+        for index, (position, period, count) in enumerate(self.repeats):
+            end = cycle + position - stored_cycle
+            if length <= end:
+                del self.repeats[index:]
+                self._truncate_stored(stored_cycle + length - cycle)
+                return
+            cycle = end
+            end = cycle + period * count
+            if length < end:
+                kept, remainder = divmod(length - cycle, period)
+                del self.repeats[index:]
+                if kept:
+                    self.repeats.append((position, period, kept))
+                self._truncate_stored(position)
+                for signal, run_length in list(self._get_stored_runs(
+                    position - period, position - period + remainder
+                )):
+                    self.append_run(signal, run_length)
+                return
+            cycle = end
+            stored_cycle = position
+        self._truncate_stored(stored_cycle + length - cycle)
+
+
+class Trace(_RepeatedCycles, bytearray):
+    """Store the signal levels of one monitor, one byte per cycle.
+
+    A trace is a bytearray, so appending a signal stores a single byte and
+    does not create any object. Traces can be indexed, sliced, iterated and
+    extended like the lists of signals they replace, and they compare equal
+    to lists of the same signals. Repeated cycles are not stored, so the
+    bytes of a trace are only its recorded cycles.
+
+    Parameters
+    ----------
+    signals: iterable of signal levels, or bytes, to start the trace with.
+
+    Public methods
+    --------------
+    append_run(self, signal, cycles): Appends the signal for the given
+                                      number of cycles.
+
+    extend(self, signals): Appends the signals, one per cycle.
+
+    repeat_signals(self, period, cycles): Appends the given number of cycles
+                                          that repeat the last period
+                                          signals.
+
+    runs(self, start=0, stop=None): Returns an iterator over the (signal,
+                                    length) runs of equal signals from
+                                    cycle start to stop.
+
+    tolist(self): Returns the signal levels as a list.
+
+    truncate(self, length): Removes the signals after the first length
+                            cycles.
+    """
+
+    def __init__(self, signals=()):
+        """Initialise the bytes and the repeats."""
+        bytearray.__init__(self)
+        # repeats stores [(position, period, count)] of repeated cycles
+        self.repeats = []
+        self.extend(signals)
+
+    def __len__(self):
+        """Return the number of cycles in the trace."""
+        if not self.repeats:
+            return bytearray.__len__(self)
+        return _RepeatedCycles.__len__(self)
+
+    def __iter__(self):
+        """Return an iterator over the signals, one per cycle."""
+        if not self.repeats:
+            return bytearray.__iter__(self)
+        return _RepeatedCycles.__iter__(self)
+
+    def __getitem__(self, index):
+        """Return the signal at the cycle, or a Trace for a slice."""
+        if not self.repeats:
+            if isinstance(index, slice):
+                return Trace(bytearray.__getitem__(self, index))
+            return bytearray.__getitem__(self, index)
+        return _RepeatedCycles.__getitem__(self, index)
+
+    def __setitem__(self, index, signal):
+        """Set the signal at the cycle."""
+        if not self.repeats:
+            bytearray.__setitem__(self, index, signal)
+            return
+        _RepeatedCycles.__setitem__(self, index, signal)
+
+    def __eq__(self, other):
+        """Return True if the trace has the same signals as other."""
+        if _has_repeats(self) or _has_repeats(other) or isinstance(
+            other, (list, tuple, RunTrace, MappedTrace)
+        ):
+            return len(self) == len(other) and list(self) == list(other)
+        return bytearray.__eq__(self, other)
+
+    def __ne__(self, other):
+        """Return True if the trace does not have the same signals."""
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    __hash__ = None
+
+    # first_cycle is the cycle of the first signal kept. All the cycles are
+    # kept, so it is always 0.
+    first_cycle = 0
+
+    def __repr__(self):
+        """Return the representation of the trace as a list of signals."""
+        return "Trace({!r})".format(self.tolist())
+
+    def append_run(self, signal, cycles):
+        """Append the signal for the given number of cycles."""
+        if cycles > 0:
+            bytearray.extend(self, bytes([signal]) * cycles)
+
+    def extend(self, signals):
+        """Append the signals, one per cycle."""
+        if _has_repeats(signals) or isinstance(signals,
+                                               (RunTrace, MappedTrace)):
+            for signal, length in signals.runs():
+                self.append_run(signal, length)
+            return
+        bytearray.extend(self, signals)
+
+    def _get_stored_length(self):
+        """Return the number of stored cycles."""
+        return bytearray.__len__(self)
+
+    def _get_stored_signal(self, index):
+        """Return the signal of the stored cycle."""
+        return bytearray.__getitem__(self, index)
+
+    def _set_stored_signal(self, index, signal):
+        """Set the signal of the stored cycle."""
+        bytearray.__setitem__(self, index, signal)
+
+    def _get_stored_runs(self, start, stop):
+        """Return an iterator over the runs of the stored cycles."""
+        return _find_runs(self, start, stop)
+
+    def _truncate_stored(self, length):
+        """Remove the stored cycles after the first length."""
+        bytearray.__delitem__(self, slice(length, None))
+
+
+class RunTrace(_RepeatedCycles):
+    """Store the signal levels of one monitor as runs of equal levels.
+
+    The trace is a list of (signal, length) runs, held in two arrays: the
+    signal of each run, and the cumulative end of each run, which is the
+    cycle after its last cycle. The signal at any cycle is found by a binary
+    search of the ends. Appending the signal of the last run extends that
+    run instead of adding a new one. Runs are always merged, so two traces
+    with the same signals and repeats have the same runs.
+
+    RunTraces can be indexed, sliced, iterated and extended like the lists
+    of signals they replace, and they compare equal to lists of the same
+    signals. Repeated cycles are not stored, so repeating a trace costs
+    the same however many times it is repeated.
+
+    Parameters
+    ----------
+    signals: iterable of signal levels to start the trace with.
+
+    Public methods
+    --------------
+    append(self, signal): Appends the signal for one cycle.
+
+    append_run(self, signal, cycles): Appends the signal for the given
+                                      number of cycles.
+
+    extend(self, signals): Appends the signals, one per cycle.
+
+    repeat_signals(self, period, cycles): Appends the given number of cycles
+                                          that repeat the last period
+                                          signals.
+
+    runs(self, start=0, stop=None): Returns an iterator over the (signal,
+                                    length) runs of equal signals from
+                                    cycle start to stop.
+
+    tolist(self): Returns the signal levels as a list.
+
+    truncate(self, length): Removes the signals after the first length
+                            cycles.
+
+    Non-public methods
+    ------------------
+    _replace_runs(self, first, last, runs): Replaces the runs from first up
+                                            to last with the given runs.
+    """
+
+    def __init__(self, signals=()):
+        """Initialise the run arrays."""
+        # run_signals stores the signal of each run, and run_ends stores the
+        # cycle after the end of each run
+        self.run_signals = bytearray()
+        self.run_ends = array("q")
+        # repeats stores [(position, period, count)] of repeated cycles
+        self.repeats = []
+        self.extend(signals)
+
+    def __mul__(self, count):
+        """Return a RunTrace with the signals repeated count times.
+
+        The runs are stored once, and repeated count - 1 times.
+        """
+        new_trace = RunTrace()
+        if count <= 0:
+            return new_trace
+        new_trace.extend(self)
+        new_trace.repeat_signals(len(self), len(self) * (count - 1))
+        return new_trace
+
+    def __eq__(self, other):
+        """Return True if the trace has the same signals as other."""
+        if (isinstance(other, RunTrace) and not self.repeats
+                and not other.repeats):
+            return (self.run_signals == other.run_signals
+                    and self.run_ends == other.run_ends)
+        if isinstance(other, (list, tuple, Trace, MappedTrace, RunTrace)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        """Return True if the trace does not have the same signals."""
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    __hash__ = None
+
+    # first_cycle is the cycle of the first signal kept. All the cycles are
+    # kept, so it is always 0.
+    first_cycle = 0
+
+    def __repr__(self):
+        """Return the representation of the trace as a list of runs."""
+        return "RunTrace(runs={!r})".format(list(self.runs()))
+
+    def append(self, signal):
+        """Append the signal for one cycle."""
+        run_signals = self.run_signals
+        if run_signals and run_signals[-1] == signal:
+            self.run_ends[-1] += 1
+        else:
+            self.run_ends.append(self._get_stored_length() + 1)
+            run_signals.append(signal)
+
+    def append_run(self, signal, cycles):
+        """Append the signal for the given number of cycles."""
+        if cycles <= 0:
+            return
+        if self.run_signals and self.run_signals[-1] == signal:
+            self.run_ends[-1] += cycles
+        else:
+            self.run_ends.append(self._get_stored_length() + cycles)
+            self.run_signals.append(signal)
+
+    def extend(self, signals):
+        """Append the signals, one per cycle."""
+        if isinstance(signals, RunTrace):
+            runs = list(signals.runs())
+        elif isinstance(signals, (Trace, MappedTrace)):
+            runs = signals.runs()
+        else:
+            runs = (
+                (signal, sum(1 for repeat in group))
+                for signal, group in itertools.groupby(signals)
+            )
+        for signal, length in runs:
+            self.append_run(signal, length)
+
+    def _get_stored_length(self):
+        """Return the number of stored cycles."""
+        if self.run_ends:
+            return self.run_ends[-1]
+        return 0
+
+    def _get_stored_signal(self, index):
+        """Return the signal of the stored cycle."""
+        return self.run_signals[bisect.bisect_right(self.run_ends, index)]
+
+    def _set_stored_signal(self, index, signal):
+        """Set the signal of the stored cycle, splitting its run if needed."""
+        run = bisect.bisect_right(self.run_ends, index)
+        if self.run_signals[run] == signal:
+            return
+        # Rebuild the run and its neighbours, which it may merge with
+        first = max(run - 1, 0)
+        last = min(run + 1, len(self.run_ends) - 1)
+        runs = []
+        for other_run in range(first, last + 1):
+            run_start = self.run_ends[other_run - 1] if other_run else 0
+            run_signal = self.run_signals[other_run]
+            run_end = self.run_ends[other_run]
+            if other_run == run:
+                runs.extend([(run_signal, index - run_start), (signal, 1),
+                             (run_signal, run_end - index - 1)])
+            else:
+                runs.append((run_signal, run_end - run_start))
+        self._replace_runs(first, last, runs)
+
+    def _get_stored_runs(self, start, stop):
+        """Return an iterator over the runs of the stored cycles.
+
+        The first and last runs are cut to fit.
+        """
+        if start >= stop:
+            return iter(())
+        first = bisect.bisect_right(self.run_ends, start)
+        last = bisect.bisect_left(self.run_ends, stop)
+        if first == 0 and start == 0 and last == len(self.run_ends) - 1 \
+                and stop == self.run_ends[-1]:
+            return zip(
+                self.run_signals,
+                map(int.__sub__, self.run_ends,
+                    itertools.chain([0], self.run_ends)),
+            )
+        return (
+            (self.run_signals[run],
+             min(self.run_ends[run], stop)
+             - max(self.run_ends[run - 1] if run else 0, start))
+            for run in range(first, last + 1)
+        )
+
+    def _truncate_stored(self, length):
+        """Remove the stored cycles after the first length.
+
+        The run holding the last cycle kept is cut to end there.
+        """
+        if length >= self._get_stored_length():
+            return
+        run = bisect.bisect_right(self.run_ends, length)
+        run_start = self.run_ends[run - 1] if run else 0
+        if run_start < length:
+            self.run_ends[run] = length
+            run += 1
+        del self.run_signals[run:]
+        del self.run_ends[run:]
+
+    def _replace_runs(self, first, last, runs):
+        """Replace the runs from first up to last with the given runs.
+
+        Empty runs are dropped and neighbouring runs with the same signal
+        are merged.
+        """
+        run_start = self.run_ends[first - 1] if first else 0
+        new_signals = bytearray()
+        new_ends = array("q")
+        for signal, length in runs:
+            if length <= 0:
+                continue
+            run_start += length
+            if new_signals and new_signals[-1] == signal:
+                new_ends[-1] = run_start
+            else:
+                new_signals.append(signal)
+                new_ends.append(run_start)
+        self.run_signals[first:last + 1] = new_signals
+        self.run_ends[first:last + 1] = new_ends
+
+
+class MappedTrace:
+    """Store the signal levels of one monitor in a column of a TraceStore.
+
+    The signals are held one byte per cycle in the column of the memory
+    mapped file given to the trace by its store, so only the parts of the
+    trace being read or written are paged into memory. MappedTraces can be
+    indexed, iterated and extended like the lists of signals they replace,
+    and they compare equal to lists of the same signals. Slices are read
+    into Traces.
+
+    Parameters
+    ----------
+    store: the TraceStore holding the column.
+    column: index of the column in the store.
+    name: name of the monitored signal.
+    length: number of cycles already stored in the column.
+
+    Public methods
+    --------------
+    append(self, signal): Appends the signal for one cycle.
+
+    append_run(self, signal, cycles): Appends the signal for the given
+                                      number of cycles.
+
+    extend(self, signals): Appends the signals, one per cycle.
+
+    clear(self): Removes all the signals.
+
+    repeat_signals(self, period, cycles): Appends the given number of cycles
+                                          that repeat the last period
+                                          signals.
+
+    runs(self, start=0, stop=None): Returns an iterator over the (signal,
+                                    length) runs of equal signals from
+                                    cycle start to stop.
+
+    tolist(self): Returns the signal levels as a list.
+
+    truncate(self, length): Removes the signals after the first length
+                            cycles.
+    """
+
+    def __init__(self, store, column, name, length=0):
+        """Initialise the column of the trace."""
+        self.store = store
+        self.column = column
+        self.name = name
+        self.length = length
+        # offset is the position of the first cycle in the file. It is
+        # updated by the store when the columns are moved.
+        self.offset = store.get_column_offset(column)
+
+    def __len__(self):
+        """Return the number of cycles in the trace."""
+        return self.length
+
+    def __iter__(self):
+        """Return an iterator over the signals, one per cycle."""
+        block = self.store.block_size
+        for start in range(0, self.length, block):
+            yield from self[start:start + block]
+
+    def __getitem__(self, index):
+        """Return the signal at the cycle, or a Trace for a slice."""
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            if start >= stop:
+                return Trace()
+            return Trace(self.store.map[self.offset + start:
+                                        self.offset + stop][::step])
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("trace index out of range")
+        return self.store.map[self.offset + index]
+
+    def __setitem__(self, index, signal):
+        """Set the signal at the cycle."""
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("trace index out of range")
+        self.store.map[self.offset + index] = signal
+
+    def __eq__(self, other):
+        """Return True if the trace has the same signals as other."""
+        if isinstance(other, (list, tuple, Trace, RunTrace, MappedTrace)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        """Return True if the trace does not have the same signals."""
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    __hash__ = None
+
+    # first_cycle is the cycle of the first signal kept. All the cycles are
+    # kept, so it is always 0.
+    first_cycle = 0
+
+    def __repr__(self):
+        """Return the representation of the trace."""
+        return "MappedTrace({!r}, length={})".format(self.name, self.length)
+
+    def append(self, signal):
+        """Append the signal for one cycle."""
+        if self.length == self.store.capacity:
+            self.store.reserve(self.length + 1)
+        self.store.map[self.offset + self.length] = signal
+        self.length += 1
+
+    def append_run(self, signal, cycles):
+        """Append the signal for the given number of cycles."""
+        if cycles <= 0:
+            return
+        self.store.reserve(self.length + cycles)
+        block = self.store.block_size
+        run = bytes([signal]) * min(cycles, block)
+        position = self.offset + self.length
+        end = position + cycles
+        # Write long runs a block at a time
+        while position < end:
+            count = min(block, end - position)
+            self.store.map[position:position + count] = run[:count]
+            position += count
+        self.length += cycles
+
+    def extend(self, signals):
+        """Append the signals, one per cycle."""
+        if _has_repeats(signals) or isinstance(signals,
+                                               (RunTrace, MappedTrace)):
+            for signal, length in signals.runs():
+                self.append_run(signal, length)
+            return
+        signals = bytes(signals)
+        self.store.reserve(self.length + len(signals))
+        position = self.offset + self.length
+        self.store.map[position:position + len(signals)] = signals
+        self.length += len(signals)
+
+    def clear(self):
+        """Remove all the signals."""
+        self.length = 0
+
+    def repeat_signals(self, period, cycles):
+        """Append the given number of cycles that repeat the last period.
+
+        The cycles are written to the file a block at a time, so only a
+        block is held in memory.
+        """
+        if cycles <= 0 or self.length == 0:
+            return
+        pattern = bytes(self[-period:])
+        repeats, remainder = divmod(cycles, len(pattern))
+        block_repeats = max(self.store.block_size // len(pattern), 1)
+        while repeats:
+            count = min(repeats, block_repeats)
+            self.extend(pattern * count)
+            repeats -= count
+        self.extend(pattern[:remainder])
+
+    def runs(self, start=0, stop=None):
+        """Return an iterator over the (signal, length) runs of the trace.
+
+        Only the runs from cycle start to stop are returned, cut to fit.
+        Only that window of the file is read.
+        """
+        if stop is None or stop > self.length:
+            stop = self.length
+        return _find_runs(self.store.map, self.offset + max(start, 0),
+                          self.offset + stop)
+
+    def tolist(self):
+        """Return the signal levels as a list."""
+        return list(self)
+
+    def truncate(self, length):
+        """Remove the signals after the first length cycles."""
+        self.length = min(self.length, max(length, 0))
+
+
+class TraceStore:
+    """Store signal traces in the columns of a memory-mapped file.
+
+    The file starts with a fixed-size header, followed by one column per
+    trace. Every column has room for the same number of cycles, the
+    capacity, so the signal at a cycle of any trace is at a fixed offset.
+    When a trace outgrows the capacity, the capacity is doubled and the
+    columns are moved in place. The name and length of every trace are
+    written after the last column when the store is flushed, so that a
+    closed store can be opened again by another process.
+
+    Parameters
+    ----------
+    path: path of the file.
+    capacity: number of cycles each column has room for at first.
+    create: if True, a new store replaces any existing file, else the
+            store saved in the file is opened.
+
+    Public methods
+    --------------
+    open(cls, path): Returns the store saved in an existing file.
+
+    add_trace(self, name): Returns a new MappedTrace in a free column.
+
+    remove_trace(self, trace): Frees the column of the trace.
+
+    get_traces(self): Returns the {name: trace} dictionary of the traces.
+
+    get_column_offset(self, column): Returns the position of the column in
+                                     the file.
+
+    reserve(self, cycles): Makes room for the given number of cycles in
+                           every column.
+
+    flush(self): Writes the names and lengths of the traces and flushes the
+                 file.
+
+    close(self): Flushes and closes the file.
+
+    Non-public methods
+    ------------------
+    _resize(self, columns, capacity): Resizes the file and moves the columns
+                                      to fit the columns and capacity.
+    """
+
+    def __init__(self, path, capacity=65536, create=True):
+        """Create or open the file and map it into memory.
+
+        If create is False, the store saved in the file is opened, and a
+        ValueError is raised if the file is not a trace store.
+        """
+        self.path = path
+        # header stores the magic bytes, capacity and number of columns
+        self.header = struct.Struct("<8sqq")
+        self.header_size = 64
+        self.magic = b"LOGSIMTR"
+        # table_entry stores the length and name size of each trace
+        self.table_entry = struct.Struct("<qH")
+        self.block_size = 1 << 20
+
+        # traces stores [trace] in column order, with None for free columns
+        self.traces = []
+        if create:
+            self.file = open(path, "w+b")
+            self.file.truncate(self.header_size)
+        else:
+            self.file = open(path, "r+b")
+            if os.fstat(self.file.fileno()).st_size < self.header_size:
+                self.file.close()
+                raise ValueError("not a trace store")
+        self.map = mmap.mmap(self.file.fileno(), 0)
+
+        if create:
+            self.capacity = max(capacity, 1)
+            self.header.pack_into(self.map, 0, self.magic, self.capacity, 0)
+            return
+        magic, self.capacity, columns = self.header.unpack_from(self.map)
+        if magic != self.magic:
+            self.map.close()
+            self.file.close()
+            raise ValueError("not a trace store")
+        position = self.get_column_offset(columns)
+        for column in range(columns):
+            length, name_size = self.table_entry.unpack_from(self.map,
+                                                             position)
+            position += self.table_entry.size
+            name = self.map[position:position + name_size].decode()
+            position += name_size
+            trace = None
+            if name_size:
+                trace = MappedTrace(self, column, name, length)
+            self.traces.append(trace)
+
+    @classmethod
+    def open(cls, path):
+        """Return the store saved in an existing file.
+
+        Return None if the file is not a trace store.
+        """
+        try:
+            return cls(path, create=False)
+        except ValueError:
+            return None
+
+    def get_column_offset(self, column):
+        """Return the position of the first cycle of the column."""
+        return self.header_size + column * self.capacity
+
+    def add_trace(self, name):
+        """Return a new MappedTrace for the named signal.
+
+        The trace is given the first free column, or a new column.
+        """
+        if None in self.traces:
+            column = self.traces.index(None)
+        else:
+            column = len(self.traces)
+            self._resize(column + 1, self.capacity)
+            self.traces.append(None)
+        trace = MappedTrace(self, column, name)
+        self.traces[column] = trace
+        return trace
+
+    def remove_trace(self, trace):
+        """Free the column of the trace, so it can be given to a new trace.
+
+        Return True if successful.
+        """
+        if self.traces[trace.column] is not trace:
+            return False
+        self.traces[trace.column] = None
+        return True
+
+    def get_traces(self):
+        """Return the {name: trace} dictionary of the traces, in order."""
+        return {
+            trace.name: trace for trace in self.traces if trace is not None
+        }
+
+    def reserve(self, cycles):
+        """Make room for the given number of cycles in every column."""
+        if cycles <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < cycles:
+            capacity *= 2
+        self._resize(len(self.traces), capacity)
+
+    def _resize(self, columns, capacity):
+        """Resize the file and move the columns to fit.
+
+        Columns are moved from the last to the first, so no column is
+        overwritten before it has been moved.
+        """
+        old_capacity = self.capacity
+        self.map.resize(self.header_size + columns * capacity)
+        self.capacity = capacity
+        if capacity != old_capacity:
+            for trace in reversed(self.traces):
+                if trace is None:
+                    continue
+                new_offset = self.get_column_offset(trace.column)
+                if trace.length:
+                    self.map.move(new_offset, trace.offset, trace.length)
+                trace.offset = new_offset
+        self.header.pack_into(self.map, 0, self.magic, capacity, columns)
+
+    def flush(self):
+        """Write the names and lengths of the traces after the columns.
+
+        The file is flushed to the disk.
+        """
+        table = []
+        for trace in self.traces:
+            if trace is None:
+                table.append(self.table_entry.pack(0, 0))
+            else:
+                name = trace.name.encode()
+                table.append(self.table_entry.pack(trace.length, len(name)))
+                table.append(name)
+        table = b"".join(table)
+        position = self.get_column_offset(len(self.traces))
+        self.map.resize(position + len(table))
+        self.map[position:] = table
+        self.map.flush()
+
+    def close(self):
+        """Flush the store and close the file."""
+        self.flush()
+        self.map.close()
+        self.file.close()
+
+
+class RingTrace:
+    """Store the signal levels of the most recent cycles of one monitor.
+
+    The signals are held one byte per cycle in a ring buffer with room for
+    a fixed number of cycles, the window. Once the buffer is full, every
+    new signal replaces the oldest one, so the trace never grows beyond the
+    window however long the simulation runs. first_cycle is the number of
+    cycles dropped, which is the cycle of the first signal kept. RingTraces
+    can be indexed, iterated and extended like the lists of signals they
+    replace, and they compare equal to lists of the signals they keep.
+    Slices are read into Traces.
+
+    Parameters
+    ----------
+    window: number of cycles kept.
+    signals: iterable of signal levels to start the trace with.
+
+    Public methods
+    --------------
+    append(self, signal): Appends the signal for one cycle.
+
+    append_run(self, signal, cycles): Appends the signal for the given
+                                      number of cycles.
+
+    extend(self, signals): Appends the signals, one per cycle.
+
+    clear(self): Removes all the signals.
+
+    repeat_signals(self, period, cycles): Appends the given number of cycles
+                                          that repeat the last period
+                                          signals.
+
+    runs(self, start=0, stop=None): Returns an iterator over the (signal,
+                                    length) runs of equal signals from
+                                    cycle start to stop of the kept cycles.
+
+    tolist(self): Returns the signal levels as a list.
+
+    truncate(self, length): Removes the signals after the first length
+                            kept cycles.
+
+    Non-public methods
+    ------------------
+    _get_signals(self): Returns the kept signals in order as bytes.
+
+    _write(self, signals): Appends the bytes of signals, dropping the
+                           oldest signals to make room.
+    """
+
+    def __init__(self, window, signals=()):
+        """Initialise the ring buffer."""
+        self.window = max(window, 1)
+        self.buffer = bytearray(self.window)
+        # head is the position in the buffer of the oldest signal kept
+        self.head = 0
+        self.length = 0
+        self.first_cycle = 0
+        self.extend(signals)
+
+    def __len__(self):
+        """Return the number of cycles kept."""
+        return self.length
+
+    def __iter__(self):
+        """Return an iterator over the kept signals, one per cycle."""
+        return iter(self._get_signals())
+
+    def __getitem__(self, index):
+        """Return the signal at the kept cycle, or a Trace for a slice."""
+        if isinstance(index, slice):
+            return Trace(self._get_signals()[index])
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("trace index out of range")
+        return self.buffer[(self.head + index) % self.window]
+
+    def __setitem__(self, index, signal):
+        """Set the signal at the kept cycle."""
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("trace index out of range")
+        self.buffer[(self.head + index) % self.window] = signal
+
+    def __eq__(self, other):
+        """Return True if the trace keeps the same signals as other."""
+        if isinstance(other, (list, tuple, Trace, RunTrace, MappedTrace,
+                              RingTrace)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        """Return True if the trace does not keep the same signals."""
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        """Return the representation of the trace."""
+        return "RingTrace({}, {!r}, first_cycle={})".format(
+            self.window, self.tolist(), self.first_cycle)
+
+    def _get_signals(self):
+        """Return the kept signals in order as bytes."""
+        end = self.head + self.length
+        if end <= self.window:
+            return bytes(self.buffer[self.head:end])
+        return bytes(self.buffer[self.head:] + self.buffer[:end - self.window])
+
+    def _write(self, signals):
+        """Append the bytes of signals, dropping the oldest signals.
+
+        Only the last window signals can be kept.
+        """
+        dropped = max(self.length + len(signals) - self.window, 0)
+        self.first_cycle += dropped
+        if len(signals) >= self.window:
+            self.buffer[:] = signals[-self.window:]
+            self.head = 0
+            self.length = self.window
+            return
+        tail = (self.head + self.length) % self.window
+        first_part = min(len(signals), self.window - tail)
+        self.buffer[tail:tail + first_part] = signals[:first_part]
+        self.buffer[:len(signals) - first_part] = signals[first_part:]
+        self.length = min(self.length + len(signals), self.window)
+        self.head = (self.head + dropped) % self.window
+
+    def append(self, signal):
+        """Append the signal for one cycle."""
+        if self.length < self.window:
+            self.buffer[(self.head + self.length) % self.window] = signal
+            self.length += 1
+        else:
+            self.buffer[self.head] = signal
+            self.head = (self.head + 1) % self.window
+            self.first_cycle += 1
+
+    def append_run(self, signal, cycles):
+        """Append the signal for the given number of cycles."""
+        if cycles <= 0:
+            return
+        kept = min(cycles, self.window)
+        self.first_cycle += cycles - kept
+        self._write(bytes([signal]) * kept)
+
+    def extend(self, signals):
+        """Append the signals, one per cycle."""
+        if _has_repeats(signals) or isinstance(signals,
+                                               (RunTrace, MappedTrace)):
+            for signal, length in signals.runs():
+                self.append_run(signal, length)
+            return
+        self._write(bytes(signals))
+
+    def clear(self):
+        """Remove all the signals."""
+        self.head = 0
+        self.length = 0
+        self.first_cycle = 0
+
+    def repeat_signals(self, period, cycles):
+        """Append the given number of cycles that repeat the last period.
+
+        Only the signals that are kept are written. The signals before the
+        last period need not repeat, so the window is rebuilt from the last
+        period. Only a full window that lies inside the last period is left
+        as it is by whole periods, and the last period need not be kept
+        then; otherwise the trace must keep the last period signals.
+        """
+        if (self.length == self.window and self.window <= period
+                and cycles % period == 0):
+            self.first_cycle += cycles
+            return
+        pattern = bytes(self[-period:])
+        kept = min(cycles, self.window)
+        skipped = cycles - kept
+        self.first_cycle += skipped
+        # The kept cycles start part way through a period
+        offset = skipped % len(pattern)
+        pattern = pattern[offset:] + pattern[:offset]
+        self._write((pattern * (kept // len(pattern) + 1))[:kept])
+
+    def runs(self, start=0, stop=None):
+        """Return an iterator over the (signal, length) runs of the trace.
+
+        The cycles are counted from the first cycle kept. Only the runs
+        from cycle start to stop are returned, cut to fit.
+        """
+        signals = self._get_signals()
+        if stop is None or stop > len(signals):
+            stop = len(signals)
+        return _find_runs(signals, max(start, 0), stop)
+
+    def tolist(self):
+        """Return the signal levels as a list."""
+        return list(self)
+
+    def truncate(self, length):
+        """Remove the signals after the first length kept cycles."""
+        self.length = min(self.length, max(length, 0))
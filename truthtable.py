@@ -0,0 +1,169 @@
+"""Write the truth table of a circuit for every setting of its switches.
+
+Used in the Logic Simulator project to tabulate the monitored signals of a
+circuit for all 2^k settings of its k switches, evaluating whole batches of
+settings at once with the bit-parallel simulator.
+
+Classes
+-------
+TruthTable - writes the truth table of the monitored signals to a file.
+"""
+import csv
+
+from bitparallel import BitParallelNetwork
+
+
+class TruthTable:
+    """Write the truth table of the monitored signals to a file.
+
+    Row i of the table holds the switch setting whose binary digits are i,
+    with the first switch as the most significant digit, followed by the
+    settled levels of the monitored signals. The settings are simulated in
+    batches, one setting per lane of a BitParallelNetwork, and every batch
+    is written before the next is simulated, so the table never needs to be
+    held in memory.
+
+    Clocks and D-type memories are held at the state they have when the
+    table is written: each row shows the signals settled from that state,
+    with the switches set and the D-type SET and CLEAR inputs applied, but
+    without any clock edges.
+
+    Parameters
+    ----------
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+    monitors: instance of the monitors.Monitors() class.
+    lanes: largest number of switch settings simulated at once. Rounded
+           down to a power of two.
+
+    Public methods
+    --------------
+    get_header(self): Returns the column names: the switches, then the
+                      monitored signals.
+
+    write_csv(self, file): Writes the table to a text file as CSV. Returns
+                           True if successful.
+
+    write_binary(self, file): Writes the monitored signals of every row to a
+                              binary file. Returns True if successful.
+
+    Non-public methods
+    ------------------
+    _iter_batches(self): Simulates the switch settings batch by batch and
+                         yields the switch and monitor words of each batch.
+    """
+
+    def __init__(self, devices, network, monitors, lanes=1024):
+        """Initialise the batch size and the switches."""
+        self.devices = devices
+        self.network = network
+        self.monitors = monitors
+
+        self.batch_bits = max(lanes, 1).bit_length() - 1
+        self.switch_ids = self.devices.find_devices(self.devices.SWITCH)
+        self.error = False  # True if the last table could not be written
+
+    def get_header(self):
+        """Return the column names: the switches, then the monitored signals.
+
+        Each signal is named as in the circuit definition file.
+        """
+        header = [
+            self.devices.get_signal_name(switch_id, None)
+            for switch_id in self.switch_ids
+        ]
+        for device_id, output_id in self.monitors.monitors_dictionary:
+            header.append(self.devices.get_signal_name(device_id, output_id))
+        return header
+
+    def _iter_batches(self):
+        """Simulate the switch settings batch by batch.
+
+        Yield (lanes, switch_words, monitor_words) for each batch, in row
+        order, where lane i of every word belongs to row base + i. Yield
+        nothing more, and set self.error, if the network does not settle.
+        """
+        switch_count = len(self.switch_ids)
+        batch_bits = min(self.batch_bits, switch_count)
+        lanes = 1 << batch_bits
+        simulator = BitParallelNetwork(self.devices, self.network, lanes)
+        if not simulator.reset():
+            self.error = True
+            return
+        initial_words = list(simulator.words)
+        initial_memory = list(simulator.memory)
+
+        # Switch j, counting from the last, is bit j of the row number. The
+        # low bits change within a batch and give a fixed pattern of lanes;
+        # the high bits are the same in every lane of a batch.
+        lane_patterns = []
+        for bit in range(batch_bits):
+            word = 0
+            for lane in range(lanes):
+                if lane >> bit & 1:
+                    word |= 1 << lane
+            lane_patterns.append(word)
+
+        for base in range(0, 1 << switch_count, lanes):
+            simulator.words[:] = initial_words
+            simulator.memory[:] = initial_memory
+            switch_words = []
+            for column, switch_id in enumerate(self.switch_ids):
+                bit = switch_count - 1 - column
+                if bit < batch_bits:
+                    word = lane_patterns[bit]
+                elif base >> bit & 1:
+                    word = simulator.mask
+                else:
+                    word = 0
+                simulator.set_switch(switch_id, word)
+                switch_words.append(word)
+
+            if not simulator.settle_network():
+                self.error = True
+                return
+            monitor_words = [
+                simulator.get_output_word(device_id, output_id)
+                for device_id, output_id in self.monitors.monitors_dictionary
+            ]
+            yield lanes, switch_words, monitor_words
+
+    def write_csv(self, file):
+        """Write the table to a text file as CSV, one row per switch setting.
+
+        The first row holds the column names. Return True if successful, or
+        False if some inputs are unconnected or the signals do not settle.
+        """
+        writer = csv.writer(file)
+        writer.writerow(self.get_header())
+        self.error = False
+        for lanes, switch_words, monitor_words in self._iter_batches():
+            # Spell each word out as one character per lane, lane 0 first
+            columns = [
+                format(word, "0{}b".format(lanes))[::-1]
+                for word in switch_words + monitor_words
+            ]
+            writer.writerows(zip(*columns))
+        return not self.error
+
+    def write_binary(self, file):
+        """Write the monitored signals of every row to a binary file.
+
+        Each row is an unsigned little-endian integer whose bit i is the
+        level of monitor i, in (number of monitors + 7) // 8 bytes. The
+        switch settings are not written, as row i always holds setting i.
+        Return True if successful, or False if some inputs are unconnected
+        or the signals do not settle.
+        """
+        row_bytes = (len(self.monitors.monitors_dictionary) + 7) // 8
+        self.error = False
+        for lanes, switch_words, monitor_words in self._iter_batches():
+            rows = [0] * lanes
+            for index, word in enumerate(monitor_words):
+                for lane in range(lanes):
+                    if word >> lane & 1:
+                        rows[lane] |= 1 << index
+            file.write(b"".join(
+                row.to_bytes(row_bytes, "little") for row in rows
+            ))
+        return not self.error
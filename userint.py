@@ -247,12 +247,19 @@ class UserInterface:
 
         Return True if successful.
         """
-        for _ in range(cycles):
-            if self.network.execute_network():
-                self.monitors.record_signals()
-            else:
-                print("Error! Network oscillating.")
-                return False
+        engine = self.network.engine
+        status = self.network.run(cycles, self.monitors, skip_idle=True)
+        if self.network.engine != engine:
+            print(_("Error: cannot use the simulation engine on this "
+                    "circuit, using the default engine."))
+        if status.oscillation_cycle is not None:
+            print("Error! Network oscillating.")
+            if status.oscillating_devices:
+                print("Oscillating devices: " + ", ".join(
+                    self.names.get_name_string(device_id)
+                    for device_id in status.oscillating_devices
+                ))
+            return False
         self.monitors.display_signals()
         return True
 
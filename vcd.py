@@ -0,0 +1,227 @@
+"""Write monitored signals to a Value Change Dump (VCD) file.
+
+Used in the Logic Simulator project to stream the monitored signals of long
+simulations to a file that standard waveform viewers can open, without
+keeping the signal traces in memory.
+
+Classes
+-------
+VcdWriter - writes the changes of the monitored signals to a VCD file.
+"""
+import collections
+
+
+class VcdWriter:
+    """Write the changes of the monitored signals to a VCD file.
+
+    A VcdWriter is passed to network.Network.run in place of a
+    monitors.Monitors() instance. It records the same signals as the
+    monitors, but instead of adding them to the traces, it writes the
+    signals that changed since the previous cycle to the file, after a
+    #cycle timestamp. The lines are buffered and written in blocks. Only
+    the last state_history_limit cycles of changes are kept, so that the
+    periods skipped by a fast-forwarded run can be written too; the memory
+    used does not grow with the length of the simulation.
+
+    HIGH and RISING signals are written as 1, LOW and FALLING signals as 0,
+    and BLANK signals as x.
+
+    Parameters
+    ----------
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+    monitors: instance of the monitors.Monitors() class, whose monitored
+              signals are written.
+    file: text file the VCD is written to.
+    timescale: duration of one simulation cycle in the VCD.
+
+    Public methods
+    --------------
+    write_header(self): Writes the declarations of the signals.
+
+    record_signals(self): Writes the changes of the monitored signals for
+                          one cycle.
+
+    make_recorder(self): Returns a function that writes the changes of the
+                         monitored signals for one cycle.
+
+    record_repeat(self, cycles): Records the given number of cycles in which
+                                 no signal changes.
+
+    repeat_signals(self, period, cycles): Writes the changes of the last
+                                          period cycles again, for the given
+                                          number of cycles.
+
+    flush(self): Writes the buffered lines to the file.
+
+    close(self): Writes the end time of the simulation and flushes.
+
+    Non-public methods
+    ------------------
+    _get_identifier(self, index): Returns the VCD identifier code of the
+                                  monitored signal with the given index.
+
+    _write(self, line): Adds a line to the buffer, writing the buffer to the
+                        file when it is full.
+
+    _write_changes(self, changes): Writes the timestamp and (index, value)
+                                   changes of one cycle and moves to the
+                                   next cycle.
+    """
+
+    def __init__(self, devices, network, monitors, file, timescale="1 ns"):
+        """Initialise the monitored signals and the write buffer."""
+        self.devices = devices
+        self.network = network
+        self.file = file
+        self.timescale = timescale
+
+        # signals stores [(device_id, output_id)] of the monitored signals
+        self.signals = list(monitors.monitors_dictionary)
+        self.identifiers = [
+            self._get_identifier(index) for index in range(len(self.signals))
+        ]
+        # values dictionary stores {signal: VCD value character}
+        self.values = {
+            self.devices.LOW: "0",
+            self.devices.HIGH: "1",
+            self.devices.RISING: "1",
+            self.devices.FALLING: "0",
+            self.devices.BLANK: "x",
+        }
+
+        # cycle is the timestamp of the next cycle recorded
+        self.cycle = 0
+        # last_values stores the VCD value last written for each signal
+        self.last_values = [None] * len(self.signals)
+        # recent_changes stores [changes] of the most recent cycles, where
+        # changes is the list of (index, value) changes in that cycle
+        self.recent_changes = collections.deque(
+            maxlen=self.network.state_history_limit
+        )
+
+        self.buffer = []
+        self.buffer_limit = 4096
+        self.header_written = False
+
+    def _get_identifier(self, index):
+        """Return the VCD identifier code of the monitored signal.
+
+        Identifier codes are numbers in base 94, written with the printable
+        ASCII characters from ! to ~.
+        """
+        identifier = ""
+        while True:
+            index, digit = divmod(index, 94)
+            identifier += chr(33 + digit)
+            if index == 0:
+                return identifier
+            index -= 1
+
+    def _write(self, line):
+        """Add a line to the buffer, writing the buffer when it is full."""
+        self.buffer.append(line)
+        if len(self.buffer) >= self.buffer_limit:
+            self.flush()
+
+    def write_header(self):
+        """Write the declarations of the monitored signals.
+
+        This is called by the first recorded cycle if it has not been
+        called before.
+        """
+        self._write("$version Logic Simulator $end\n")
+        self._write("$timescale {} $end\n".format(self.timescale))
+        self._write("$scope module logsim $end\n")
+        for (device_id, output_id), identifier in zip(self.signals,
+                                                      self.identifiers):
+            signal_name = self.devices.get_signal_name(device_id, output_id)
+            self._write("$var wire 1 {} {} $end\n".format(
+                identifier, signal_name))
+        self._write("$upscope $end\n")
+        self._write("$enddefinitions $end\n")
+        self.header_written = True
+
+    def _write_changes(self, changes):
+        """Write the timestamp and changes of one cycle.
+
+        The changes are (index, value) pairs of the monitored signals that
+        changed. Nothing is written for a cycle in which no signal changes.
+        The values of the first cycle are written as the initial values.
+        """
+        if changes:
+            lines = ["#{}\n".format(self.cycle)]
+            for index, value in changes:
+                self.last_values[index] = value
+                lines.append(value + self.identifiers[index] + "\n")
+            if self.cycle == 0:
+                lines[1:] = ["$dumpvars\n"] + lines[1:] + ["$end\n"]
+            self._write("".join(lines))
+        self.recent_changes.append(changes)
+        self.cycle += 1
+
+    def record_signals(self):
+        """Write the changes of the monitored signals for one cycle."""
+        self.make_recorder()()
+
+    def make_recorder(self):
+        """Return a function that writes the changes for one cycle.
+
+        The function does the same as record_signals, with the monitored
+        outputs looked up once in advance.
+        """
+        if not self.header_written:
+            self.write_header()
+        bindings = [
+            (index, self.devices.get_device(device_id).outputs, output_id)
+            for index, (device_id, output_id) in enumerate(self.signals)
+        ]
+        values = self.values
+        last_values = self.last_values
+
+        def record():
+            changes = []
+            for index, outputs, output_id in bindings:
+                value = values[outputs[output_id]]
+                if value != last_values[index]:
+                    changes.append((index, value))
+            self._write_changes(changes)
+
+        return record
+
+    def record_repeat(self, cycles):
+        """Record the given number of cycles in which no signal changes.
+
+        Nothing is written, the timestamp of the next cycle moves on.
+        """
+        self.recent_changes.extend([[]] * min(
+            cycles, self.network.state_history_limit))
+        self.cycle += cycles
+
+    def repeat_signals(self, period, cycles):
+        """Write the changes of the last period cycles again.
+
+        The changes recorded in the last period cycles are repeated for the
+        given number of cycles, as if they had been recorded.
+        """
+        pattern = list(self.recent_changes)[-period:]
+        if not any(pattern):
+            self.record_repeat(cycles)
+            return
+        for cycle in range(cycles):
+            self._write_changes(pattern[cycle % period])
+
+    def flush(self):
+        """Write the buffered lines to the file."""
+        self.file.write("".join(self.buffer))
+        self.buffer = []
+
+    def close(self):
+        """Write the end time of the simulation and flush the buffer.
+
+        The file itself is left open.
+        """
+        if not self.header_written:
+            self.write_header()
+        self._write("#{}\n".format(self.cycle))
+        self.flush()
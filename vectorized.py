@@ -0,0 +1,359 @@
+"""Execute the network with NumPy array operations.
+
+Used in the Logic Simulator project to execute large networks quickly: the
+signals are held in a NumPy array, and all the gates of a kind are
+evaluated together by a few array operations instead of one Python call
+per gate.
+
+Classes
+-------
+VectorizedNetwork - executes a network with vectorised array operations.
+"""
+import operator
+
+try:
+    import numpy as np
+except ImportError:  # the other engines do not need NumPy
+    np = None
+
+
+class VectorizedNetwork:
+    """Execute a network with vectorised array operations.
+
+    The signal of every net is held in one NumPy array. Each iteration
+    executes the switches, D-types, clocks and the gates kind by kind, in
+    the same order as network.Network.execute_network, with the same result
+    in every cycle.
+
+    When devices are executed one by one, a device sees the new outputs of
+    the devices before it in the execution order, and the old outputs of
+    the devices after it. To do the same with array operations, the devices
+    of each kind are split into waves: a device is placed in the wave after
+    the last wave holding a device of the same kind that drives it and comes
+    before it. Each wave is evaluated at once, by gathering the input
+    signals of its devices into a matrix with one row per device. Inputs
+    driven by devices of the same kind that come later are gathered from a
+    copy of the signals taken before the kind is executed.
+
+    The Device objects stay the reference copy of the signals: they are
+    loaded at the start of every cycle, and the signals that changed are
+    stored back at the end.
+
+    Parameters
+    ----------
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+
+    Public methods
+    --------------
+    build(self): Builds the index arrays of the network. Returns False if
+                 some inputs are unconnected or NumPy is not installed.
+
+    execute_network(self): Executes the network for one simulation cycle.
+                           Returns True if the signals settle.
+
+    Non-public methods
+    ------------------
+    _split_waves(self, device_nets, device_inputs): Splits the devices of a
+                 kind into waves and returns the gather indices of their
+                 inputs.
+
+    _update(self, nets, targets): Updates the signals of the nets towards
+                                  the targets. Returns True if none change.
+    """
+
+    def __init__(self, devices, network):
+        """Initialise the signal array and the index arrays."""
+        self.devices = devices
+        self.network = network
+
+        # netlist.Netlist the index arrays are built from
+        self.netlist = None
+        self.net_count = 0
+        # signals stores the signal of every net, followed by the old
+        # signals of the kind being executed
+        self.signals = None
+        # transitions[signal, target] is the signal after update_signal
+        self.transitions = None
+
+        # output_dicts and output_ids store the outputs dictionary and the
+        # output ID of every net, to load and store the signals
+        self.output_dicts = []
+        self.output_ids = []
+        self.switch_devices = []
+        self.dtype_devices = []
+        self.switch_nets = None
+        self.clock_nets = None
+        # memory stores the D-type memories, indexed like the D-types in the
+        # netlist
+        self.memory = None
+
+        # kinds stores [(device_kind, old_nets, [wave])] in execution order,
+        # where old_nets are the nets copied before the kind is executed.
+        # D-type waves store (dtype_indices, q_nets, qbar_nets, [clock,
+        # data, set, clear gather indices]), and gate waves store
+        # [(output_nets, input_matrix)], one entry per number of inputs.
+        # Clocks have no waves.
+        self.kinds = []
+        self.iteration_limit = 20
+
+    def build(self):
+        """Build the index arrays of the network.
+
+        Return False if some inputs are unconnected or NumPy is not
+        installed.
+        """
+        if np is None:
+            return False
+        self.netlist = self.network.get_netlist()
+        if self.netlist is None:
+            return False
+        netlist = self.netlist
+        devices = self.devices
+
+        self.net_count = len(netlist.net_outputs)
+        self.output_dicts = [owner.outputs for owner in netlist.owners]
+        self.output_ids = [
+            output_id for device_id, output_id in netlist.net_outputs
+        ]
+        self.switch_devices = [
+            devices.get_device(device_id) for device_id in netlist.switch_ids
+        ]
+        self.dtype_devices = [
+            devices.get_device(device_id) for device_id in netlist.dtype_ids
+        ]
+        self.switch_nets = np.array(netlist.switch_nets, dtype=np.intp)
+        self.clock_nets = np.array(netlist.clock_nets, dtype=np.intp)
+
+        LOW = devices.LOW
+        HIGH = devices.HIGH
+        RISING = devices.RISING
+        FALLING = devices.FALLING
+        self.transitions = np.zeros((len(devices.signal_types), 2),
+                                    dtype=np.int8)
+        self.transitions[LOW] = [LOW, RISING]
+        self.transitions[FALLING] = [LOW, RISING]
+        self.transitions[HIGH] = [FALLING, HIGH]
+        self.transitions[RISING] = [FALLING, HIGH]
+
+        self.kinds = []
+        old_count = 0  # largest number of old signals kept for a kind
+
+        # D-types read CLK, DATA, SET and CLEAR, and drive Q and QBAR
+        device_nets = [
+            [netlist.dtype_q_nets[index], netlist.dtype_qbar_nets[index]]
+            for index in range(len(netlist.dtype_ids))
+        ]
+        device_inputs = [
+            [netlist.dtype_clock_inputs[index],
+             netlist.dtype_data_inputs[index],
+             netlist.dtype_set_inputs[index],
+             netlist.dtype_clear_inputs[index]]
+            for index in range(len(netlist.dtype_ids))
+        ]
+        old_nets, waves = self._split_waves(device_nets, device_inputs)
+        old_count = max(old_count, len(old_nets))
+        self.kinds.append((devices.D_TYPE, old_nets, [
+            (np.array(wave, dtype=np.intp),
+             np.array(netlist.dtype_q_nets, dtype=np.intp)[wave],
+             np.array(netlist.dtype_qbar_nets, dtype=np.intp)[wave],
+             list(np.array(
+                 [gather_inputs[index] for index in wave], dtype=np.intp
+             ).T))
+            for wave, gather_inputs in waves
+        ]))
+        # Clocks are executed after the D-types
+        self.kinds.append((devices.CLOCK, np.array([], dtype=np.intp), []))
+
+        # Gates are executed kind by kind, in netlist order
+        kind_starts = [
+            index for index in range(len(netlist.gate_ids))
+            if index == 0
+            or netlist.gate_kinds[index] != netlist.gate_kinds[index - 1]
+        ]
+        kind_starts.append(len(netlist.gate_ids))
+        for start, end in zip(kind_starts, kind_starts[1:]):
+            gate_indices = range(start, end)
+            old_nets, waves = self._split_waves(
+                [[netlist.gate_nets[index]] for index in gate_indices],
+                [list(netlist.get_gate_inputs(index))
+                 for index in gate_indices],
+            )
+            old_count = max(old_count, len(old_nets))
+            kind_waves = []
+            for wave, gather_inputs in waves:
+                # arity_groups dictionary stores {number of inputs:
+                # [positions in the wave]}
+                arity_groups = {}
+                for position, index in enumerate(wave):
+                    arity_groups.setdefault(
+                        len(gather_inputs[index]), []
+                    ).append(position)
+                kind_waves.append([
+                    (np.array([netlist.gate_nets[start + wave[position]]
+                               for position in positions], dtype=np.intp),
+                     np.array([gather_inputs[wave[position]]
+                               for position in positions], dtype=np.intp))
+                    for positions in arity_groups.values()
+                ])
+            self.kinds.append(
+                (netlist.gate_kinds[start], old_nets, kind_waves)
+            )
+
+        self.signals = np.zeros(self.net_count + old_count, dtype=np.int8)
+        self.memory = np.zeros(len(self.dtype_devices), dtype=np.int8)
+        return True
+
+    def _split_waves(self, device_nets, device_inputs):
+        """Split the devices of a kind into waves.
+
+        device_nets and device_inputs store the output and input nets of
+        each device, in execution order. Return (old_nets, waves), where
+        old_nets must be copied after the signals, and waves stores
+        [(device_positions, gather_inputs)]: gather_inputs stores the
+        indices to gather the inputs of each device from, by position.
+        """
+        # owners dictionary stores {net: position of the device driving it}
+        owners = {}
+        for position, nets in enumerate(device_nets):
+            for net in nets:
+                owners[net] = position
+
+        old_nets = []
+        # old_indices dictionary stores {net: index of its old signal}
+        old_indices = {}
+        wave_numbers = []
+        gather_inputs = []
+        for position, inputs in enumerate(device_inputs):
+            wave_number = 0
+            gather = []
+            for net in inputs:
+                owner = owners.get(net)
+                if owner is None:
+                    gather.append(net)
+                elif owner < position:
+                    # The driving device is executed first
+                    wave_number = max(wave_number,
+                                      wave_numbers[owner] + 1)
+                    gather.append(net)
+                else:
+                    if net not in old_indices:
+                        old_indices[net] = self.net_count + len(old_nets)
+                        old_nets.append(net)
+                    gather.append(old_indices[net])
+            wave_numbers.append(wave_number)
+            gather_inputs.append(gather)
+
+        waves = []
+        for position, wave_number in enumerate(wave_numbers):
+            if wave_number == len(waves):
+                waves.append([])
+            waves[wave_number].append(position)
+        return (np.array(old_nets, dtype=np.intp),
+                [(wave, gather_inputs) for wave in waves])
+
+    def _update(self, nets, targets):
+        """Update the signals of the nets towards the targets.
+
+        The targets are LOW or HIGH, or False or True for LOW or HIGH.
+        Return True if no signal changes.
+        """
+        if targets.dtype == bool:
+            targets = targets.view(np.int8)
+        signals = self.signals
+        old_signals = signals[nets]
+        new_signals = self.transitions[old_signals, targets]
+        if np.array_equal(old_signals, new_signals):
+            return True
+        signals[nets] = new_signals
+        return False
+
+    def execute_network(self):
+        """Execute the network for one simulation cycle.
+
+        Return True if the signals settle, like
+        network.Network.execute_network.
+        """
+        devices = self.devices
+        LOW = devices.LOW
+        HIGH = devices.HIGH
+        RISING = devices.RISING
+        FALLING = devices.FALLING
+        net_count = self.net_count
+        signals = self.signals
+
+        # This sets clock signals to RISING or FALLING, where necessary
+        self.network.update_clocks()
+        loaded = np.fromiter(
+            map(operator.getitem, self.output_dicts, self.output_ids),
+            dtype=np.int8, count=net_count,
+        )
+        signals[:net_count] = loaded
+        memory = self.memory
+        memory[:] = [device.dtype_memory for device in self.dtype_devices]
+        loaded_memory = memory.copy()
+        switch_targets = np.array(
+            [device.switch_state for device in self.switch_devices],
+            dtype=np.intp,
+        )
+
+        steady = False
+        iterations = 0
+        while iterations < self.iteration_limit:
+            iterations += 1
+            steady = self._update(self.switch_nets, switch_targets)
+
+            for device_kind, old_nets, waves in self.kinds:
+                if len(old_nets):
+                    signals[net_count:net_count + len(old_nets)] = \
+                        signals[old_nets]
+                if device_kind == devices.D_TYPE:
+                    for dtypes, q_nets, qbar_nets, gather in waves:
+                        clock, data, set_signal, clear = [
+                            signals[indices] for indices in gather
+                        ]
+                        wave_memory = memory[dtypes]
+                        latch = clock == RISING
+                        wave_memory[latch] = (
+                            (data[latch] == HIGH) | (data[latch] == FALLING)
+                        )
+                        wave_memory[set_signal == HIGH] = HIGH
+                        wave_memory[clear == HIGH] = LOW
+                        memory[dtypes] = wave_memory
+                        steady &= self._update(q_nets, wave_memory)
+                        steady &= self._update(qbar_nets, HIGH - wave_memory)
+
+                elif device_kind == devices.CLOCK:
+                    # RISING and FALLING clocks become HIGH and LOW
+                    clocks = signals[self.clock_nets]
+                    steady &= self._update(
+                        self.clock_nets, (clocks == HIGH) | (clocks == RISING)
+                    )
+
+                elif device_kind == devices.XOR:
+                    for wave in waves:
+                        for output_nets, input_matrix in wave:
+                            inputs = signals[input_matrix]
+                            steady &= self._update(
+                                output_nets, inputs[:, 0] != inputs[:, 1]
+                            )
+
+                else:
+                    x, y = self.network.gate_rules[device_kind]
+                    for wave in waves:
+                        for output_nets, input_matrix in wave:
+                            targets = (signals[input_matrix] == x).all(axis=1)
+                            if y == LOW:
+                                targets = ~targets
+                            steady &= self._update(output_nets, targets)
+            if steady:
+                break
+
+        # Store the signals and memories that changed
+        output_dicts = self.output_dicts
+        output_ids = self.output_ids
+        for net in np.flatnonzero(signals[:net_count] != loaded).tolist():
+            output_dicts[net][output_ids[net]] = int(signals[net])
+        for index in np.flatnonzero(memory != loaded_memory).tolist():
+            self.dtype_devices[index].dtype_memory = int(memory[index])
+        return steady